@@ -0,0 +1,7 @@
+"""
+Benchmarks for the agent, filtering and crawl extraction hot paths.
+
+Run from backend/:
+
+    python -m benchmarks.run
+"""
@@ -0,0 +1,70 @@
+"""
+Deterministic synthetic product catalogs shaped like the rows crawl.py stores.
+"""
+import random
+import uuid
+from typing import List
+
+CATALOG_SIZES = [100, 1_000, 10_000, 100_000]
+
+COLORS = ['Black', 'White', 'Red', 'Blue', 'Green', 'Gray', 'Brown', 'Navy', 'Olive', 'Vintage']
+
+# (category, product nouns, price range)
+PRODUCT_TYPES = [
+    ('Shirts & Tops', ['Tee', 'T-Shirt', 'Polo', 'Button-Up Shirt', 'Tank'], (15, 60)),
+    ('Hoodies & Sweatshirts', ['Hoodie', 'Crewneck Sweatshirt', 'Zip-Up Hoodie', 'Pullover'], (40, 120)),
+    ('Pants', ['Cargo Pant', 'Chino', 'Jogger', 'Trouser'], (35, 110)),
+    ('Jeans', ['Slim Jean', 'Relaxed Denim', 'Straight Jean'], (50, 160)),
+    ('Shorts', ['Board Short', 'Chino Short', 'Sweat Short'], (20, 70)),
+    ('Jackets & Coats', ['Puffer Jacket', 'Windbreaker', 'Chore Coat', 'Parka'], (80, 350)),
+    ('Shoes', ['Sneaker', 'Skate Shoe', 'Chelsea Boot', 'Runner'], (50, 220)),
+    ('Accessories', ['Beanie', 'Snapback Cap', 'Tote Bag', 'Leather Belt', 'Backpack'], (10, 90)),
+    ('Skateboards', ['Skateboard Deck', 'Complete Skateboard', 'Longboard'], (45, 200)),
+    ('Coffee & Tea', ['Whole Bean Coffee', 'Espresso Blend', 'Coffee Pods', 'Loose Leaf Tea'], (8, 40)),
+]
+
+ADJECTIVES = ['Classic', 'Heavyweight', 'Organic', 'Essential', 'Washed', 'Premium', 'Everyday', 'Retro', 'Heritage', 'Light']
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+
+
+def make_product(rng: random.Random, business_id: str, idx: int) -> dict:
+    category, nouns, (low, high) = rng.choice(PRODUCT_TYPES)
+    color = rng.choice(COLORS)
+    name = f"{rng.choice(ADJECTIVES)} {color} {rng.choice(nouns)}"
+    slug = f"{name.lower().replace(' ', '-')}-{idx}"
+    return {
+        'id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'business_id': business_id,
+        'name': name,
+        'description': f"{name} from our {category.lower()} collection.",
+        'price': round(rng.uniform(low, high), 2),
+        'category': category,
+        'colors': [color],
+        'sizes': rng.sample(SIZES, k=rng.randint(1, len(SIZES))),
+        'image_url': f"https://cdn.example.com/images/{slug}.jpg",
+        'url': f"https://shop.example.com/products/{slug}",
+        'in_stock': rng.random() > 0.1,
+    }
+
+
+def make_catalog(size: int, business_id: str = 'bench-business', seed: int = 42) -> List[dict]:
+    """Same size and seed always give the same catalog so runs stay comparable"""
+    rng = random.Random(seed)
+    return [make_product(rng, business_id, i) for i in range(size)]
+
+
+# Questions shoppers ask the widget, covering each filter branch in extract_filters
+QUERIES = [
+    "do you have black hoodies under $80",
+    "show me t-shirts",
+    "jeans between $50 and $100",
+    "anything over $200",
+    "white sneakers",
+    "what coffee pods do you sell",
+    "looking for a gift",
+    "red or blue shirts below 30",
+    "vintage jacket",
+    "skateboard decks less than $60",
+    "whole bean coffee",
+    "green cap",
+]
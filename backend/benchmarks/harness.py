@@ -0,0 +1,131 @@
+"""
+Timing, result storage and baseline comparison for the benchmark runner.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+@dataclass
+class Result:
+    name: str
+    params: dict = field(default_factory=dict)
+    # Seconds per call: best, median and mean over the samples
+    best: float = 0.0
+    median: float = 0.0
+    mean: float = 0.0
+    samples: int = 0
+    calls_per_sample: int = 0
+    # Work items handled per call (products, pages, queries, requests)
+    items: int = 1
+    extra: dict = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        if not self.params:
+            return self.name
+        return f"{self.name}[" + ",".join(f"{k}={v}" for k, v in self.params.items()) + "]"
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.median if self.median else 0.0
+
+
+def measure(name: str, fn: Callable[[], object], params: Optional[dict] = None, items: int = 1,
+            repeat: int = 5, min_sample_time: float = 0.2) -> Result:
+    """
+    timeit-style measurement: pick a call count so one sample takes at least
+    min_sample_time, then report per-call times over `repeat` samples
+    """
+    fn()  # warm up caches and lazy imports
+
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_sample_time or number >= 1_000_000:
+            break
+        number *= 2 if elapsed > min_sample_time / 10 else 10
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+
+    return Result(
+        name=name,
+        params=params or {},
+        best=min(samples),
+        median=statistics.median(samples),
+        mean=statistics.fmean(samples),
+        samples=len(samples),
+        calls_per_sample=number,
+        items=items,
+    )
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def save_results(results: List[Result], path: Optional[str] = None) -> str:
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, datetime.utcnow().strftime('%Y%m%dT%H%M%SZ') + '.json')
+    payload = {
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': {r.key: {**asdict(r), 'items_per_second': r.items_per_second} for r in results},
+    }
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+
+def load_results(path: str) -> Dict[str, dict]:
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def compare(results: List[Result], baseline: Dict[str, dict], threshold: float) -> List[dict]:
+    """Median time of each benchmark relative to the baseline run; ratio > 1 means slower"""
+    rows = []
+    for r in results:
+        base = baseline.get(r.key)
+        if not base or not base.get('median'):
+            continue
+        ratio = r.median / base['median']
+        rows.append({
+            'key': r.key,
+            'baseline': base['median'],
+            'current': r.median,
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold,
+        })
+    return rows
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} us"
@@ -0,0 +1,170 @@
+"""
+HTML for the extraction benchmarks and the local crawl site.
+
+The saved pages in fixtures/ follow the markup of stock Shopify (Dawn-style
+product cards) and WooCommerce (storefront loop) themes. Regenerate them with:
+
+    python -m benchmarks.pages
+"""
+import html
+import os
+from typing import List, Optional
+
+from benchmarks.catalog import make_catalog
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+FIXTURE_PAGES = ['shopify_collection.html', 'woocommerce_shop.html']
+
+_HEAD = """<!doctype html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <meta name="viewport" content="width=device-width,initial-scale=1">
+  <title>{title}</title>
+  <link rel="stylesheet" href="/assets/base.css">
+  <style>
+    .grid {{ display: grid; grid-template-columns: repeat(4, 1fr); gap: 1rem; }}
+    .product-card__title, .woocommerce-loop-product__title {{ font-size: 1rem; }}
+  </style>
+  <script>window.Shop = window.Shop || {{}}; Shop.currency = {{"active": "USD", "rate": "1.0"}};</script>
+</head>
+<body>
+  <a class="skip-to-content-link" href="#MainContent">Skip to content</a>
+  <header class="header">
+    <a href="/" class="header__heading-link"><span class="h2">{shop_name}</span></a>
+    <nav class="header__inline-menu">
+      <ul class="list-menu">
+        <li><a href="/collections/all">Shop all</a></li>
+        <li><a href="/collections/new">New arrivals</a></li>
+        <li><a href="/pages/about">About</a></li>
+        <li><a href="/pages/contact">Contact</a></li>
+      </ul>
+    </nav>
+  </header>
+"""
+
+_FOOT = """  <footer class="footer">
+    <ul class="footer-block__details-content">
+      <li><a href="/pages/shipping">Shipping</a></li>
+      <li><a href="/pages/returns">Returns</a></li>
+      <li><a href="mailto:hello@shop.example.com">Email us</a></li>
+    </ul>
+    <small class="copyright__content">&copy; 2025, {shop_name}</small>
+  </footer>
+  <script src="/assets/theme.js" defer></script>
+</body>
+</html>
+"""
+
+
+def _slug(product: dict) -> str:
+    return product['url'].rstrip('/').rsplit('/', 1)[-1]
+
+
+def shopify_card(product: dict) -> str:
+    name = html.escape(product['name'])
+    slug = _slug(product)
+    image = f"//cdn.shopify.com/s/files/1/0001/products/{slug}.jpg"
+    return f"""      <li class="grid__item">
+        <div class="product-card">
+          <a href="/products/{slug}" class="product-card__link" aria-label="{name}">
+            <div class="product-card__media">
+              <img src="{image}?v=1&width=360" srcset="{image}?v=1&width=360 360w, {image}?v=1&width=720 720w" alt="{name}" loading="lazy" width="360" height="360">
+            </div>
+            <div class="product-card__info">
+              <h3 class="product-card__title">{name}</h3>
+              <div class="price"><span class="price-item price-item--regular money">${product['price']:.2f} USD</span></div>
+            </div>
+          </a>
+        </div>
+      </li>
+"""
+
+
+def render_shopify_collection(products: List[dict], shop_name: str = 'Bench Supply Co', next_url: Optional[str] = None) -> str:
+    cards = "".join(shopify_card(p) for p in products)
+    pagination = f'    <nav class="pagination"><a href="{next_url}" rel="next">Next</a></nav>\n' if next_url else ''
+    return (
+        _HEAD.format(title=f"Shop all &ndash; {shop_name}", shop_name=shop_name)
+        + '  <main id="MainContent">\n    <h1 class="collection-hero__title">Shop all</h1>\n'
+        + '    <ul id="product-grid" class="grid product-grid">\n' + cards + '    </ul>\n'
+        + pagination
+        + '  </main>\n'
+        + _FOOT.format(shop_name=shop_name)
+    )
+
+
+def woocommerce_item(product: dict, post_id: int) -> str:
+    name = html.escape(product['name'])
+    slug = _slug(product)
+    category = product['category'].lower().split(' ')[0]
+    image = f"https://shop.example.com/wp-content/uploads/2025/01/{slug}-300x300.jpg"
+    stock = 'instock' if product['in_stock'] else 'outofstock'
+    return f"""      <li class="product type-product post-{post_id} status-publish {stock} product_cat-{category} has-post-thumbnail shipping-taxable purchasable product-type-simple">
+        <a href="https://shop.example.com/product/{slug}/" class="woocommerce-LoopProduct-link woocommerce-loop-product__link">
+          <img width="300" height="300" src="{image}" class="attachment-woocommerce_thumbnail size-woocommerce_thumbnail" alt="" decoding="async">
+          <h2 class="woocommerce-loop-product__title">{name}</h2>
+          <span class="price"><span class="woocommerce-Price-amount amount"><bdi><span class="woocommerce-Price-currencySymbol">&#36;</span>{product['price']:.2f}</bdi></span></span>
+        </a>
+        <a href="?add-to-cart={post_id}" data-quantity="1" class="button product_type_simple add_to_cart_button ajax_add_to_cart" data-product_id="{post_id}" rel="nofollow">Add to cart</a>
+      </li>
+"""
+
+
+def render_woocommerce_shop(products: List[dict], shop_name: str = 'Bench Supply Co') -> str:
+    items = "".join(woocommerce_item(p, 1000 + i) for i, p in enumerate(products))
+    return (
+        _HEAD.format(title=f"Shop &ndash; {shop_name}", shop_name=shop_name)
+        + '  <main id="MainContent" class="site-main">\n'
+        + '    <header class="woocommerce-products-header"><h1 class="page-title">Shop</h1></header>\n'
+        + f'    <p class="woocommerce-result-count">Showing all {len(products)} results</p>\n'
+        + '    <ul class="products columns-4">\n' + items + '    </ul>\n'
+        + '  </main>\n'
+        + _FOOT.format(shop_name=shop_name)
+    )
+
+
+def render_product_page(product: dict, shop_name: str = 'Bench Supply Co') -> str:
+    name = html.escape(product['name'])
+    sizes = "".join(f'<option value="{s}">{s}</option>' for s in product['sizes'])
+    return (
+        _HEAD.format(title=f"{name} &ndash; {shop_name}", shop_name=shop_name)
+        + '  <main id="MainContent" class="product">\n'
+        + f'    <h1 class="product__title">{name}</h1>\n'
+        + f'    <div class="price"><span class="money">${product["price"]:.2f}</span></div>\n'
+        + f'    <div class="product__description rte"><p>{html.escape(product["description"])}</p>'
+        + '<p>Free shipping on orders over $75. Easy 30-day returns.</p></div>\n'
+        + f'    <select name="size">{sizes}</select>\n'
+        + '  </main>\n'
+        + _FOOT.format(shop_name=shop_name)
+    )
+
+
+def render_text_page(title: str, paragraphs: List[str], shop_name: str = 'Bench Supply Co') -> str:
+    body = "".join(f"    <p>{html.escape(p)}</p>\n" for p in paragraphs)
+    return (
+        _HEAD.format(title=f"{html.escape(title)} &ndash; {shop_name}", shop_name=shop_name)
+        + f'  <main id="MainContent">\n    <h1>{html.escape(title)}</h1>\n' + body + '  </main>\n'
+        + _FOOT.format(shop_name=shop_name)
+    )
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def main():
+    products = make_catalog(48, seed=7)
+    pages = {
+        'shopify_collection.html': render_shopify_collection(products, next_url='/collections/all?page=2'),
+        'woocommerce_shop.html': render_woocommerce_shop(products),
+    }
+    for name, content in pages.items():
+        with open(os.path.join(FIXTURES_DIR, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+        print(f"Wrote fixtures/{name} ({len(content) // 1024} KB)")
+
+
+if __name__ == '__main__':
+    main()
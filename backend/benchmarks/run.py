@@ -0,0 +1,330 @@
+"""
+Benchmark runner.
+
+    python -m benchmarks.run                      # full suite, saved to benchmarks/results/
+    python -m benchmarks.run --quick              # smaller catalogs and fewer requests
+    python -m benchmarks.run --only filter --only ask
+    python -m benchmarks.run --save-baseline      # also write results/baseline.json
+    python -m benchmarks.run --baseline results/baseline.json --threshold 0.15
+
+The app runs on its offline backends (DATABASE_BACKEND=sqlite with an in-memory
+database, LLM_BACKEND=fake) and crawl_site runs against a local HTTP server, so
+no network access is needed.
+Exits with status 1 when any benchmark is slower than the baseline by more than
+the threshold.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.catalog import CATALOG_SIZES, QUERIES, make_catalog
+from benchmarks.harness import RESULTS_DIR, Result, compare, format_seconds, load_results, measure, save_results
+from benchmarks.pages import FIXTURE_PAGES, load_fixture
+
+BENCH_BUSINESS_ID = 'bench-business'
+BENCH_TIER = {'id': 'bench-tier', 'name': 'Benchmark', 'max_products': 1_000_000, 'max_conversations': 1_000_000_000}
+
+
+def configure_environment(args):
+    """Settings are read when src modules are first imported, so this runs before any benchmark"""
+    os.environ.setdefault('DATABASE_BACKEND', 'sqlite')
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    os.environ.setdefault('LLM_BACKEND', 'fake')
+    os.environ['FAKE_LLM_LATENCY_MS'] = str(args.llm_latency_ms)
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    os.environ.setdefault('WARM_UP_CLIENTS', 'false')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('QUERY_LOG_DIR', os.path.join(tempfile.gettempdir(), 'bench_query_logs'))
+    os.environ.setdefault('CRAWL_ARCHIVE_DIR', os.path.join(tempfile.gettempdir(), 'bench_crawl_archive'))
+
+
+def seed_business(products: List[dict]):
+    """Load a tier with effectively no limits, the business and its catalog into the local store"""
+    from src.database.supabase_client import get_supabase_client
+
+    supabase = get_supabase_client()
+    supabase.table('pricing_tiers').upsert(BENCH_TIER).execute()
+    supabase.table('businesses').upsert({'id': BENCH_BUSINESS_ID, 'name': 'Bench Supply Co', 'tier_id': BENCH_TIER['id']}).execute()
+    supabase.table('products').delete().eq('business_id', BENCH_BUSINESS_ID).execute()
+    supabase.table('products').insert(products).execute()
+
+
+def bench_extract_filters(args) -> List[Result]:
+    from src.api.routes.agent import extract_filters
+
+    def run():
+        for q in QUERIES:
+            extract_filters(q)
+
+    return [measure('extract_filters', run, items=len(QUERIES))]
+
+
+def bench_filter_products(args) -> List[Result]:
+    from src.api.routes.agent import filter_products
+
+    results = []
+    for size in args.sizes:
+        catalog = make_catalog(size)
+        for label, query in [('filtered', 'do you have black hoodies under $80'), ('broad', 'looking for a gift')]:
+            results.append(measure(
+                'filter_products',
+                lambda: filter_products(catalog, query),
+                params={'size': size, 'query': label},
+                items=size,
+                repeat=3 if size >= 100_000 else 5,
+            ))
+    return results
+
+
+def bench_extract_product_data(args) -> List[Result]:
+    """Every card of a fixture page, probing all selectors vs. a learned per-site template"""
+    from bs4 import BeautifulSoup
+    from src.crawlers.product_extraction import extract_product_data, find_product_elements, learn_template
+
+    results = []
+    for page in FIXTURE_PAGES:
+        soup = BeautifulSoup(load_fixture(page), 'html.parser')
+        elements, container = find_product_elements(soup)
+
+        for label, template in (('none', None), ('learned', learn_template(elements, container))):
+            def run():
+                for idx, element in enumerate(elements):
+                    extract_product_data(element, 'https://shop.example.com/collections/all', idx, template)
+
+            results.append(measure(
+                'extract_product_data',
+                run,
+                params={'page': page.split('.')[0], 'template': label},
+                items=len(elements),
+            ))
+    return results
+
+
+def bench_extract_text(args) -> List[Result]:
+    from src.crawlers.web_crawler import extract_text
+
+    results = []
+    for page in FIXTURE_PAGES:
+        content = load_fixture(page)
+        result = measure('extract_text', lambda: extract_text(content), params={'page': page.split('.')[0]})
+        result.extra['bytes'] = len(content)
+        results.append(result)
+    return results
+
+
+def bench_crawl_site(args) -> List[Result]:
+    """Link-following crawl vs. one seeded from robots.txt and the sitemap index"""
+    from benchmarks.site_server import LocalShop
+    from src.crawlers.seeding import is_product_url
+    from src.crawlers.web_crawler import crawl_site
+
+    max_pages = 20 if args.quick else 50
+    results = []
+    for sitemap in (False, True):
+        with LocalShop(product_count=96, sitemap=sitemap) as shop:
+            pages = crawl_site(shop.url, max_pages=max_pages)
+            result = measure(
+                'crawl_site',
+                lambda: crawl_site(shop.url, max_pages=max_pages),
+                params={'max_pages': max_pages, 'sitemap': sitemap},
+                items=len(pages),
+                repeat=3,
+                min_sample_time=0,
+            )
+        result.extra['pages_crawled'] = len(pages)
+        result.extra['product_pages'] = sum(1 for url, _text in pages if is_product_url(url))
+        results.append(result)
+    return results
+
+
+def bench_extract_products(args) -> List[Result]:
+    """Tiered, paginated listing extraction: Shopify JSON fast path vs. HTML product cards"""
+    from benchmarks.site_server import LocalShop
+    from src.crawlers.product_sources import extract_products
+    from src.integrations.clients import close_clients
+
+    async def run_once(url: str):
+        try:
+            return await extract_products(url, max_products=100_000)
+        finally:
+            # The shared client is bound to the event loop asyncio.run() creates
+            await close_clients()
+
+    results = []
+    for product_count in ([96] if args.quick else [96, 1_000]):
+        for products_json in (True, False):
+            with LocalShop(product_count=product_count, products_json=products_json) as shop:
+                url = shop.url + 'collections/all'
+                extraction = asyncio.run(run_once(url))
+                result = measure(
+                    'extract_products',
+                    lambda: asyncio.run(run_once(url)),
+                    params={'source': extraction.source, 'catalog': product_count},
+                    items=extraction.product_count,
+                    repeat=3,
+                    min_sample_time=0,
+                )
+            result.extra['pages'] = extraction.pages
+            results.append(result)
+    return results
+
+
+def bench_crawl_products(args) -> List[Result]:
+    """crawl_and_extract's best-first crawl: products found per page fetched, with and without a sitemap"""
+    from benchmarks.site_server import LocalShop
+    from src.api.routes.product_crawl import crawl_and_extract
+    from src.integrations.clients import close_clients
+
+    async def run_once(url: str, max_pages: int) -> dict:
+        try:
+            return await crawl_and_extract(url, max_pages, 'bench-crawl')
+        finally:
+            await close_clients()
+
+    max_pages = 20 if args.quick else 50
+    results = []
+    for sitemap in (False, True):
+        with LocalShop(product_count=96, sitemap=sitemap) as shop:
+            summary = asyncio.run(run_once(shop.url, max_pages))
+            result = measure(
+                'crawl_products',
+                lambda: asyncio.run(run_once(shop.url, max_pages)),
+                params={'max_pages': max_pages, 'sitemap': sitemap},
+                items=summary['pages_crawled'],
+                repeat=3,
+                min_sample_time=0,
+            )
+        result.extra.update(pages_crawled=summary['pages_crawled'], products_found=summary['products_found'])
+        results.append(result)
+    return results
+
+
+async def _ask_round(client, total: int, concurrency: int) -> List[float]:
+    """Send `total` questions with at most `concurrency` in flight; returns per-request latencies"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post('/agent/ask', json={
+                'question': QUERIES[i % len(QUERIES)],
+                'business_id': BENCH_BUSINESS_ID,
+                'session_id': f"bench-{i % 50}",
+            })
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f"/agent/ask returned {response.status_code}: {response.text[:200]}")
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies
+
+
+def bench_agent_ask(args) -> List[Result]:
+    import httpx
+    from src.api.main import app
+
+    size = 1_000
+    seed_business(make_catalog(size, business_id=BENCH_BUSINESS_ID))
+    total = 50 if args.quick else 200
+
+    async def run(concurrency: int) -> Result:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            await _ask_round(client, min(total, 20), concurrency)  # warm up
+
+            rounds = []
+            latencies: List[float] = []
+            for _ in range(3):
+                started = time.perf_counter()
+                latencies.extend(await _ask_round(client, total, concurrency))
+                rounds.append((time.perf_counter() - started) / total)
+
+        latencies.sort()
+        return Result(
+            name='agent_ask',
+            params={'concurrency': concurrency, 'llm_latency_ms': args.llm_latency_ms},
+            best=min(rounds),
+            median=statistics.median(rounds),
+            mean=statistics.fmean(rounds),
+            samples=len(rounds),
+            calls_per_sample=total,
+            extra={
+                'p50_latency': latencies[len(latencies) // 2],
+                'p95_latency': latencies[int(len(latencies) * 0.95) - 1],
+                'catalog_size': size,
+            },
+        )
+
+    return [asyncio.run(run(concurrency)) for concurrency in (1, 8)]
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    'extract_filters': bench_extract_filters,
+    'filter_products': bench_filter_products,
+    'extract_product_data': bench_extract_product_data,
+    'extract_text': bench_extract_text,
+    'crawl_site': bench_crawl_site,
+    'extract_products': bench_extract_products,
+    'crawl_products': bench_crawl_products,
+    'agent_ask': bench_agent_ask,
+}
+
+
+def print_results(results: List[Result]):
+    print(f"\n{'benchmark':<66} {'median':>10} {'best':>10} {'items/s':>12}")
+    for r in results:
+        print(f"{r.key:<66} {format_seconds(r.median):>10} {format_seconds(r.best):>10} {r.items_per_second:>12,.0f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the agent, filtering and crawl hot paths")
+    parser.add_argument('--only', action='append', default=[], help="Run benchmarks whose name contains this (repeatable)")
+    parser.add_argument('--quick', action='store_true', help="Smaller catalogs, fewer pages and requests")
+    parser.add_argument('--sizes', type=int, nargs='+', help=f"Catalog sizes for filter_products (default {CATALOG_SIZES})")
+    parser.add_argument('--llm-latency-ms', type=float, default=0.0, help="Latency of the fake LLM backend for agent_ask")
+    parser.add_argument('--output', help="Results file (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--baseline', help="Results file to compare against (default results/baseline.json if present)")
+    parser.add_argument('--threshold', type=float, default=0.15, help="Allowed slowdown vs. baseline (0.15 = 15%%)")
+    parser.add_argument('--save-baseline', action='store_true', help="Also write these results to results/baseline.json")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    if args.sizes is None:
+        args.sizes = CATALOG_SIZES[:3] if args.quick else CATALOG_SIZES
+
+    selected = [name for name in BENCHMARKS if not args.only or any(o in name for o in args.only)]
+    results: List[Result] = []
+    for name in selected:
+        print(f"Running {name}...", file=sys.stderr)
+        results.extend(BENCHMARKS[name](args))
+
+    print_results(results)
+    path = save_results(results, args.output)
+    print(f"\nSaved {path}")
+
+    baseline_path = os.path.join(RESULTS_DIR, 'baseline.json')
+    if args.save_baseline:
+        save_results(results, baseline_path)
+        print(f"Saved {baseline_path}")
+        return 0
+
+    baseline_path = args.baseline or (baseline_path if os.path.exists(baseline_path) else None)
+    if not baseline_path:
+        return 0
+
+    rows = compare(results, load_results(baseline_path), args.threshold)
+    print(f"\nCompared with {baseline_path} (threshold {args.threshold:.0%})")
+    for row in rows:
+        flag = "REGRESSION" if row['regression'] else ""
+        print(f"{row['key']:<66} {format_seconds(row['baseline']):>10} -> {format_seconds(row['current']):>10} {row['ratio']:>6.2f}x {flag}")
+    return 1 if any(row['regression'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
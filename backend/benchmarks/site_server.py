@@ -0,0 +1,162 @@
+"""
+A small Shopify-shaped shop served from a local HTTP server for the crawl benchmarks.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.catalog import make_catalog
+from benchmarks.pages import render_product_page, render_shopify_collection, render_text_page
+
+PAGE_SIZE = 24
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+CONTENT_TYPES = {'.txt': 'text/plain', '.xml': 'application/xml'}
+
+TEXT_PAGES = {
+    '/pages/about': ('About us', ['We are a small independent shop selling clothing, skate goods and coffee.'] * 3),
+    '/pages/contact': ('Contact', ['Email hello@shop.example.com or visit us Tuesday to Saturday, 10am to 6pm.']),
+    '/pages/shipping': ('Shipping', ['Orders ship within two business days. Free shipping over $75.']),
+    '/pages/returns': ('Returns', ['Unworn items can be returned within 30 days of delivery.']),
+}
+
+
+def shopify_json(product: dict, idx: int) -> dict:
+    """A product as Shopify's storefront /products.json returns it"""
+    slug = urlparse(product['url']).path.rsplit('/', 1)[-1]
+    return {
+        'id': 1000 + idx,
+        'title': product['name'],
+        'handle': slug,
+        'body_html': f"<p>{product['description']}</p>",
+        'product_type': product['category'],
+        'options': [{'name': 'Size', 'values': product['sizes']}, {'name': 'Color', 'values': product['colors']}],
+        'variants': [
+            {'id': 5000 + idx * 10 + n, 'price': f"{product['price']:.2f}", 'available': product['in_stock'], 'option1': size}
+            for n, size in enumerate(product['sizes'])
+        ],
+        'images': [{'src': f"https://cdn.shopify.com/s/files/1/0001/products/{slug}.jpg"}],
+    }
+
+
+def build_sitemaps(site: Dict[str, str], origin: str) -> Dict[str, str]:
+    """robots.txt and a Shopify-style sitemap index (products, then everything else)"""
+    def urlset(paths):
+        entries = "".join(f"<url><loc>{origin}{path}</loc></url>" for path in paths)
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="{SITEMAP_NS}">{entries}</urlset>'
+
+    pages = [path for path in site if '?' not in path]
+    products = [path for path in pages if path.startswith('/products/')]
+    return {
+        '/robots.txt': f"User-agent: *\nDisallow: /cart\nDisallow: /checkout\n\nSitemap: {origin}/sitemap.xml\n",
+        '/sitemap.xml': (
+            f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="{SITEMAP_NS}">'
+            f"<sitemap><loc>{origin}/sitemap_pages_1.xml</loc></sitemap>"
+            f"<sitemap><loc>{origin}/sitemap_products_1.xml</loc></sitemap>"
+            "</sitemapindex>"
+        ),
+        '/sitemap_products_1.xml': urlset(products),
+        '/sitemap_pages_1.xml': urlset(p for p in pages if p not in products),
+    }
+
+
+def build_site(product_count: int) -> Dict[str, str]:
+    """path (with query) -> HTML for every page of the shop"""
+    products = make_catalog(product_count, seed=11)
+    site: Dict[str, str] = {}
+
+    pages = max(1, -(-len(products) // PAGE_SIZE))
+    for page in range(1, pages + 1):
+        chunk = products[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        next_url = f"/collections/all?page={page + 1}" if page < pages else None
+        content = render_shopify_collection(chunk, next_url=next_url)
+        site[f"/collections/all?page={page}"] = content
+        if page == 1:
+            site["/collections/all"] = content
+            site["/collections/new"] = content
+
+    for product in products:
+        path = urlparse(product['url']).path
+        site[path] = render_product_page(product)
+
+    for path, (title, paragraphs) in TEXT_PAGES.items():
+        site[path] = render_text_page(title, paragraphs)
+    site["/"] = render_text_page('Welcome', ['New arrivals every week.']).replace(
+        '<main id="MainContent">', '<main id="MainContent">\n    <a href="/collections/all">Browse the collection</a>'
+    )
+    return site
+
+
+class LocalShop:
+    """Serves build_site() on 127.0.0.1 from a background thread (use as a context manager)"""
+
+    def __init__(self, product_count: int = 96, products_json: bool = True, sitemap: bool = True):
+        self.site = build_site(product_count)
+        site = self.site
+        files: Dict[str, str] = {}
+        catalog = [shopify_json(p, i) for i, p in enumerate(make_catalog(product_count, seed=11))] if products_json else None
+        by_handle = {p['handle']: p for p in catalog or []}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+                if parsed.path.endswith('/products.json') and catalog is not None:
+                    limit = int(query.get('limit', ['30'])[0])
+                    page = int(query.get('page', ['1'])[0])
+                    chunk = catalog[(page - 1) * limit:page * limit]
+                    self._respond(json.dumps({'products': chunk}), 'application/json')
+                    return
+                if parsed.path.startswith('/products/') and parsed.path.endswith('.json') and catalog is not None:
+                    product = by_handle.get(parsed.path[len('/products/'):-len('.json')])
+                    if product is not None:
+                        self._respond(json.dumps({'product': product}), 'application/json')
+                        return
+
+                key = parsed.path
+                if query.get('page'):
+                    key = f"{parsed.path}?page={query['page'][0]}"
+                if key in files:
+                    self._respond(files[key], CONTENT_TYPES[key[key.rindex('.'):]])
+                    return
+                body = site.get(key)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header('Content-Type', 'text/plain')
+                    self.end_headers()
+                    return
+                self._respond(body, 'text/html; charset=utf-8')
+
+            def _respond(self, body: str, content_type: str):
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        if sitemap:
+            files.update(build_sitemaps(site, self.url.rstrip('/')))
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def paths(self) -> List[str]:
+        return list(self.site)
+
+    def __enter__(self) -> "LocalShop":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,136 @@
+"""
+Rebuild products and knowledge-base documents from the crawl archive.
+
+Reruns the current extraction code over the responses archived by each site's
+most recent crawl (CRAWL_ARCHIVE_DIR), in worker processes on every core and without any
+requests to the stores, then writes the products through ProductWriter (keyed
+on business_id,url, so unchanged rows are left alone). Each archived domain is
+matched to the business whose website_url is on it, unless --business-id is given;
+domains with several businesses are reported and skipped until one is picked.
+
+Usage (from backend/):
+    python scripts/reextract.py --dry-run
+    python scripts/reextract.py --domain shop.example.com --business-id <uuid>
+    python scripts/reextract.py --kb-out docs.jsonl --workers 8
+    python scripts/reextract.py --kb-collection site_docs --mark-missing
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.config.settings import get_settings  # noqa: E402
+from src.crawlers.archive import domain_key  # noqa: E402
+from src.crawlers.reextraction import BATCH_SIZE, DomainExtraction, reextract  # noqa: E402
+
+
+def business_ids_by_domain() -> dict:
+    """Archive domain -> ids of the businesses whose website URL is on it (each /api/crawl makes one)"""
+    from src.database.supabase_client import get_supabase_client
+
+    rows = get_supabase_client().table('businesses').select('id, website_url').execute().data or []
+    businesses = {}
+    for row in rows:
+        if row.get('website_url'):
+            businesses.setdefault(domain_key(row['website_url']), []).append(row['id'])
+    return businesses
+
+
+async def write_products(extraction: DomainExtraction, business_id: str, mark_missing: bool) -> dict:
+    from src.services.product_store import ProductWriter, product_row
+
+    tier, products = extraction.listing_products()
+    writer = ProductWriter(business_id)
+    # Product page rows first: the writer keeps the first row per URL
+    await writer.write(extraction.product_pages)
+    await writer.write([product_row(product, business_id) for product in products])
+    result = await writer.finish(mark_missing=mark_missing)
+    return {'source': tier, **result.as_dict()}
+
+
+def write_documents(extractions: list, kb_out: str = None, kb_collection: str = None) -> int:
+    docs = [doc for extraction in extractions for doc in extraction.documents]
+    if kb_out:
+        with open(kb_out, 'w') as out:
+            for url, text in docs:
+                out.write(json.dumps({'url': url, 'text': text}) + "\n")
+    if kb_collection:
+        # Embedding calls go to the embeddings API; nothing is fetched from the stores
+        from src.agents.knowledge_base import get_chroma_client, get_collection, upsert_documents
+
+        upsert_documents(get_collection(get_chroma_client(), kb_collection), docs)
+    return len(docs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--archive-dir", default=get_settings().crawl_archive_dir)
+    parser.add_argument("--domain", action="append", help="archived domain to rebuild (repeatable; default: all)")
+    parser.add_argument("--business-id", help="business to write to (only with a single --domain)")
+    parser.add_argument("--workers", type=int, default=None, help="extraction processes (default: one per core)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="extract and report, write nothing")
+    parser.add_argument("--mark-missing", action="store_true",
+                        help="mark stored products not found in the latest archived crawl out of stock "
+                             "(skipped for crawls that didn't finish or lost records)")
+    parser.add_argument("--kb-out", help="write knowledge-base documents to this JSONL file")
+    parser.add_argument("--kb-collection", help="upsert knowledge-base documents into this Chroma collection")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    if not args.archive_dir or not os.path.isdir(args.archive_dir):
+        raise SystemExit(f"No crawl archive at {args.archive_dir!r}")
+    if args.business_id and len(args.domain or []) != 1:
+        raise SystemExit("--business-id needs exactly one --domain")
+
+    started = time.perf_counter()
+    extractions = reextract(args.archive_dir, args.domain, workers=args.workers, batch_size=args.batch_size)
+    extract_seconds = time.perf_counter() - started
+
+    report = {}
+    businesses = {}
+    if not args.dry_run:
+        businesses = {args.domain[0]: [args.business_id]} if args.business_id else business_ids_by_domain()
+    for domain, extraction in extractions.items():
+        tier, products = extraction.listing_products()
+        entry = {
+            'records': extraction.records, 'failed': extraction.failed, 'source': tier,
+            'product_pages': len(extraction.product_pages), 'listing_products': len(products),
+            'documents': len(extraction.documents),
+        }
+        business_ids = businesses.get(domain) or []
+        # Several businesses on one site: which one the products belong to is the operator's call
+        business_id = business_ids[0] if len(business_ids) == 1 else None
+        mark_missing = args.mark_missing
+        if mark_missing and not extraction.crawl_complete:
+            # Products of unarchived pages would look gone
+            mark_missing = False
+            entry['mark_missing'] = (f"refused: {extraction.dropped} records dropped while archiving"
+                                     if extraction.dropped else "refused: the crawl didn't finish")
+        if business_id:
+            entry.update(asyncio.run(write_products(extraction, business_id, mark_missing)))
+            entry['business_id'] = business_id
+        elif len(business_ids) > 1:
+            entry['skipped'] = f"{len(business_ids)} businesses on this domain, pick one with --domain/--business-id"
+            entry['business_ids'] = business_ids
+        elif not args.dry_run:
+            entry['skipped'] = 'no business for this domain'
+        report[domain] = entry
+
+    documents = write_documents(list(extractions.values()), args.kb_out, args.kb_collection)
+
+    if args.json:
+        print(json.dumps({'domains': report, 'documents': documents, 'extract_seconds': round(extract_seconds, 2)}, indent=2))
+        return
+    print(f"{len(report)} domains, {documents} documents, extracted in {extract_seconds:.1f}s")
+    for domain, entry in report.items():
+        print(f"  {domain}: " + ", ".join(f"{k}={v}" for k, v in entry.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Startup time report for the API.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and prints
+the slowest imports, then (optionally) starts uvicorn and measures how long it
+takes until /health answers.
+
+Usage (from backend/):
+    python scripts/startup_report.py
+    python scripts/startup_report.py --top 40 --health
+    python scripts/startup_report.py --module src.api.routes.crawl --json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_imports(module: str) -> list:
+    """Return [{module, self_ms, cumulative_ms, depth}] parsed from -X importtime"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return rows
+
+
+def top_level_packages(rows: list) -> dict:
+    """Total self time per top-level package (anthropic, supabase, fastapi, ...)"""
+    totals = {}
+    for row in rows:
+        package = row["module"].split(".")[0]
+        totals[package] = totals.get(package, 0.0) + row["self_ms"]
+    return dict(sorted(totals.items(), key=lambda kv: kv[1], reverse=True))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_health(app: str, timeout: float = 60.0) -> float:
+    """Seconds from launching uvicorn until GET /health returns 200"""
+    port = free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.02)
+        raise SystemExit(f"/health did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="src.api.main", help="module to import (default: src.api.main)")
+    parser.add_argument("--top", type=int, default=25, help="number of imports to list")
+    parser.add_argument("--health", action="store_true", help="also measure time to first healthy /health")
+    parser.add_argument("--app", default="src.api.main:app", help="ASGI app for --health")
+    parser.add_argument("--json", action="store_true", help="print a JSON report")
+    args = parser.parse_args()
+
+    rows = measure_imports(args.module)
+    root = next((r for r in rows if r["module"] == args.module), None)
+    report = {
+        "module": args.module,
+        "total_ms": root["cumulative_ms"] if root else sum(r["self_ms"] for r in rows),
+        "slowest_cumulative": sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:args.top],
+        "slowest_self": sorted(rows, key=lambda r: r["self_ms"], reverse=True)[:args.top],
+        "by_package_ms": dict(list(top_level_packages(rows).items())[:args.top]),
+    }
+    if args.health:
+        report["time_to_healthy_s"] = round(measure_health(args.app), 3)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"import {args.module}: {report['total_ms']:.1f} ms\n")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for row in report["slowest_cumulative"]:
+        print(f"{row['cumulative_ms']:>14.1f} {row['self_ms']:>9.1f}  {'  ' * row['depth']}{row['module']}")
+    print("\nself time by top-level package:")
+    for package, ms in report["by_package_ms"].items():
+        print(f"{ms:>10.1f} ms  {package}")
+    if "time_to_healthy_s" in report:
+        print(f"\ntime to first healthy /health: {report['time_to_healthy_s']:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
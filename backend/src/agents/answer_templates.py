@@ -0,0 +1,74 @@
+"""
+Template answers for simple product lookups.
+
+/agent/ask only asks Claude for a one-line comment above the product cards
+("Here are our black shirts currently in stock."). For plain searches with
+recognised filters that sentence is built here from the parsed filters and the
+match count, with no LLM call; compare/recommend questions and questions
+without filters still go to the LLM.
+"""
+from typing import List, Optional, Tuple
+
+# First term of an extract_filters category -> (singular, plural)
+CATEGORY_LABELS = {
+    'shirt': ('shirt', 'shirts'),
+    'pants': ('pair of pants', 'pants'),
+    'shorts': ('pair of shorts', 'shorts'),
+    'hoodie': ('hoodie', 'hoodies'),
+    'jacket': ('jacket', 'jackets'),
+    'shoe': ('pair of shoes', 'shoes'),
+    'accessory': ('accessory', 'accessories'),
+    'skateboard': ('skateboard', 'skateboards'),
+    'pod': ('coffee pod', 'coffee pods'),
+    'bean': ('coffee', 'coffees'),
+    'tea': ('tea', 'teas'),
+    'coffee': ('coffee', 'coffees'),
+}
+DEFAULT_LABEL = ('product', 'products')
+
+
+def is_simple_lookup(intents: List[str], filters: tuple) -> bool:
+    """A plain search that named a category, color or price"""
+    min_price, max_price, category_keywords, color_keywords = filters
+    has_filters = bool(category_keywords or color_keywords or min_price > 0 or max_price != float('inf'))
+    return intents == ['search'] and has_filters
+
+
+def _price(value: float) -> str:
+    return f"${value:.0f}" if value == int(value) else f"${value:.2f}"
+
+
+def _price_phrase(min_price: float, max_price: float) -> str:
+    if min_price > 0 and max_price != float('inf'):
+        return f" between {_price(min_price)} and {_price(max_price)}"
+    if max_price != float('inf'):
+        return f" under {_price(max_price)}"
+    if min_price > 0:
+        return f" over {_price(min_price)}"
+    return ""
+
+
+def _color_phrase(colors: List[str]) -> str:
+    colors = list(dict.fromkeys('gray' if c == 'grey' else c for c in colors))
+    if len(colors) > 1:
+        return f"{', '.join(colors[:-1])} or {colors[-1]} "
+    return f"{colors[0]} " if colors else ""
+
+
+def _label(category_keywords: List[str]) -> Tuple[str, str]:
+    return CATEGORY_LABELS.get(category_keywords[0], DEFAULT_LABEL) if category_keywords else DEFAULT_LABEL
+
+
+def template_answer(filters: tuple, matched: int, shown: int) -> Optional[str]:
+    """One-sentence comment for `shown` of `matched` products found with `filters`"""
+    min_price, max_price, category_keywords, color_keywords = filters
+    if shown <= 0:
+        return None
+    singular, plural = _label(category_keywords)
+    description = f"{_color_phrase(color_keywords)}{{}}{_price_phrase(min_price, max_price)}"
+
+    if matched == 1:
+        return f"I found one {description.format(singular)} in stock."
+    if matched > shown:
+        return f"Here are {shown} of our {matched} {description.format(plural)} in stock."
+    return f"Here are our {description.format(plural)} currently in stock."
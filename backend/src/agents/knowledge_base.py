@@ -1,12 +1,14 @@
 from typing import List, Tuple, Dict, Any
 import os
 
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from openai import OpenAI
+from src.integrations.clients import get_openai_client
 
 
 def get_chroma_client(persist_dir: str = ".chroma"):
+    # chromadb is heavy to import; only pay for it when the knowledge base is used
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
     os.makedirs(persist_dir, exist_ok=True)
     client = chromadb.PersistentClient(path=persist_dir, settings=ChromaSettings(is_persistent=True))
     return client
@@ -19,7 +21,7 @@ def get_collection(client, name: str):
 def upsert_documents(collection, docs: List[Tuple[str, str]], embed_model: str = "text-embedding-3-small") -> int:
     if not docs:
         return 0
-    client = OpenAI()
+    client = get_openai_client()
     texts = [text for _url, text in docs]
     ids = [str(i) for i in range(collection.count(), collection.count() + len(docs))]
     metadatas = [{"source_url": url} for url, _ in docs]
@@ -37,7 +39,7 @@ def upsert_documents(collection, docs: List[Tuple[str, str]], embed_model: str =
 
 
 def query_similar(collection, query: str, k: int = 5, embed_model: str = "text-embedding-3-small") -> List[Dict[str, Any]]:
-    client = OpenAI()
+    client = get_openai_client()
     resp = client.embeddings.create(model=embed_model, input=[query])
     embedding = resp.data[0].embedding
     results = collection.query(query_embeddings=[embedding], n_results=k, include=["metadatas", "distances", "documents"])
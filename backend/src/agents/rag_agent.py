@@ -1,6 +1,12 @@
-from typing import Dict, List
-from openai import OpenAI
+from typing import Dict, List, Optional
+from src.agents.smart_agent import degraded_answer, detect_intent
+from src.config.settings import get_settings
 from src.database.supabase_client import get_supabase_client
+from src.integrations.clients import get_openai_client
+from src.services.metrics import degraded_answers
+from src.services.model_router import LatencyBudget, LLMUnavailable, Route, attempt_client, complete, estimate_tokens, route_model
+import asyncio
+import functools
 
 SYSTEM_PROMPT = (
     "You are a helpful AI assistant for a local business. "
@@ -22,19 +28,26 @@ def search_products(query: str, business_id: str = "4644670e-936f-4688-87ed-b38d
     
     return response.data if response.data else []
 
-def answer_question(question: str, k: int = 5, model: str = "gpt-4o-mini") -> Dict:
-    """Answer questions about products using Supabase data"""
-    client = OpenAI()
-    
-    # Extract keywords from question for better search
-    keywords = question.lower().split()
+def generate_rag_answer(messages: List[Dict], model: str, timeout: float) -> str:
+    chat = attempt_client(get_openai_client(), timeout).chat.completions.create(
+        model=model, messages=messages, temperature=0.2
+    )
+    return chat.choices[0].message.content
+
+def search_keywords(question: str, k: int) -> List[Dict]:
     products = []
-    
     # Try searching with different keywords
-    for keyword in keywords:
+    for keyword in question.lower().split():
         if len(keyword) > 3:  # Skip short words
-            results = search_products(keyword, k=k)
-            products.extend(results)
+            products.extend(search_products(keyword, k=k))
+    return products
+
+async def answer_question(question: str, k: int = 5, model: Optional[str] = None) -> Dict:
+    """Answer questions about products using Supabase data (model: skip routing and use this one)"""
+    budget = LatencyBudget(get_settings().assistant_latency_budget_ms / 1000)
+    
+    # Extract keywords from question for better search
+    products = await asyncio.to_thread(search_keywords, question, k)
     
     # Remove duplicates
     unique_products = {p['id']: p for p in products}.values()
@@ -63,8 +76,14 @@ def answer_question(question: str, k: int = 5, model: str = "gpt-4o-mini") -> Di
         {"role": "user", "content": f"PRODUCTS:\n{context}\n\nQUESTION: {question}"},
     ]
     
-    chat = client.chat.completions.create(model=model, messages=messages, temperature=0.2)
-    answer = chat.choices[0].message.content
+    route = route_model("openai", detect_intent(question), estimate_tokens(SYSTEM_PROMPT + context))
+    if model:
+        route = Route(tier=route.tier, model=model, fallback=route.fallback)
+    try:
+        answer = await complete(functools.partial(generate_rag_answer, messages), route, budget)
+    except LLMUnavailable as e:
+        degraded_answers.inc(agent="rag", reason=e.reason)
+        answer = degraded_answer(list(unique_products)[:k])
     
     return {
         "answer": answer,
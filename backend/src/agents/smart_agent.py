@@ -1,10 +1,12 @@
 from typing import Dict, List
-from anthropic import Anthropic
+from src.config.settings import get_settings
 from src.database.supabase_client import get_supabase_client
+from src.integrations.clients import get_anthropic_client
+from src.services.metrics import degraded_answers
+from src.services.model_router import LatencyBudget, LLMUnavailable, attempt_client, complete, estimate_tokens, route_model
+import asyncio
+import functools
 import re
-import os
-
-client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
 
 SMART_SYSTEM_PROMPT = """You are an intelligent shopping assistant for a local business.
 
@@ -118,10 +120,28 @@ def search_products_smart(query: str, filters: Dict, business_id: str, k: int =
     
     return filtered[:k]
 
-def answer_question_smart(question: str, business_id: str, k: int, conversation_history: List[Dict] = None) -> Dict:
+def generate_smart_answer(user_prompt: str, model: str, timeout: float) -> str:
+    message = attempt_client(get_anthropic_client(), timeout).messages.create(
+        model=model,
+        max_tokens=1024,
+        system=SMART_SYSTEM_PROMPT,
+        messages=[
+            {"role": "user", "content": user_prompt}
+        ]
+    )
+    return message.content[0].text
+
+def degraded_answer(products: List[Dict]) -> str:
+    """Products-only reply when no model answered within the latency budget"""
+    if not products:
+        return "I couldn't find any products matching that. Try adjusting your search."
+    return f"Here {'is 1 product' if len(products) == 1 else f'are {len(products)} products'} that match your question."
+
+async def answer_question_smart(question: str, business_id: str, k: int, conversation_history: List[Dict] = None) -> Dict:
+    budget = LatencyBudget(get_settings().assistant_latency_budget_ms / 1000)
     intents = detect_intent(question)
     filters = extract_filters(question)
-    products = search_products_smart(question, filters, business_id, k)
+    products = await asyncio.to_thread(search_products_smart, question, filters, business_id, k)
     
     if products:
         context_blocks = []
@@ -167,16 +187,13 @@ CURRENT QUESTION: {question}
 
 Remember context from previous messages and provide helpful, conversational responses."""
     
-    message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=1024,
-        system=SMART_SYSTEM_PROMPT,
-        messages=[
-            {"role": "user", "content": user_prompt}
-        ]
-    )
-    
-    answer = message.content[0].text
+    # Compare/recommend questions and long contexts get the standard model, plain searches the fast one
+    route = route_model("anthropic", intents, estimate_tokens(SMART_SYSTEM_PROMPT + user_prompt))
+    try:
+        answer = await complete(functools.partial(generate_smart_answer, user_prompt), route, budget)
+    except LLMUnavailable as e:
+        degraded_answers.inc(agent="smart", reason=e.reason)
+        answer = degraded_answer(products)
     
     return {
         "answer": answer,
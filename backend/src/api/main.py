@@ -1,86 +1,73 @@
 # Updated: Nov 18 2025
-print("=== STARTING APP ===", flush=True)
-import sys
-print(f"Python version: {sys.version}", flush=True)
-
-try:
-    print("Importing crawl_router...", flush=True)
-    from src.api.routes.crawl import router as crawl_router
-    print("✓ crawl_router imported", flush=True)
-except Exception as e:
-    print(f"✗ Failed to import crawl_router: {e}", flush=True)
-    import traceback
-    traceback.print_exc()
-    raise
-
-try:
-    print("Importing slowapi...", flush=True)
-    from slowapi import Limiter, _rate_limit_exceeded_handler
-    from slowapi.util import get_remote_address
-    from slowapi.errors import RateLimitExceeded
-    print("✓ slowapi imported", flush=True)
-except Exception as e:
-    print(f"✗ Failed to import slowapi: {e}", flush=True)
-    raise
-
-try:
-    print("Importing fastapi...", flush=True)
-    from fastapi import FastAPI
-    from fastapi.middleware.cors import CORSMiddleware
-    from fastapi.exceptions import RequestValidationError
-    from starlette.exceptions import HTTPException as StarletteHTTPException
-    print("✓ fastapi imported", flush=True)
-except Exception as e:
-    print(f"✗ Failed to import fastapi: {e}", flush=True)
-    raise
-
-try:
-    print("Importing settings...", flush=True)
-    from src.config.settings import get_settings
-    print("✓ settings imported", flush=True)
-except Exception as e:
-    print(f"✗ Failed to import settings: {e}", flush=True)
-    raise
-
-try:
-    print("Importing routers...", flush=True)
-    from src.api.routes.agent import router as agent_router
-    from src.api.routes.analytics import router as analytics_router
-    from src.api.routes.tiers import router as tiers_router
-    from src.api.routes.widget import router as widget_router
-    from src.api.routes.webhooks import router as webhooks_router
-    from src.api.routes.product_crawl import router as product_crawl_router
-    from src.api.routes.scheduled import router as scheduled_router
-    print("✓ routers imported", flush=True)
-except Exception as e:
-    print(f"✗ Failed to import routers: {e}", flush=True)
-    import traceback
-    traceback.print_exc()
-    raise
-
-try:
-    print("Importing middleware...", flush=True)
-    from src.middleware.error_handler import (
-        http_exception_handler,
-        validation_exception_handler,
-        general_exception_handler
-    )
-    print("✓ middleware imported", flush=True)
-except Exception as e:
-    print(f"✗ Failed to import middleware: {e}", flush=True)
-    raise
-
-print("Getting settings...", flush=True)
+import asyncio
+import importlib
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.exceptions import RequestValidationError
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from src.config.settings import get_settings
+from src.config.logging_config import setup_logging
+from src.middleware.error_handler import (
+    http_exception_handler,
+    validation_exception_handler,
+    general_exception_handler
+)
+from src.middleware.request_id import RequestIdMiddleware
+from src.middleware.timing import TimingMiddleware
+
+# Router modules only import light dependencies at module level; the heavy SDKs
+# (supabase, anthropic, openai, bs4, httpx, pyarrow) are imported on first use.
+# Run scripts/startup_report.py to see where import time goes.
+ROUTER_MODULES = [
+    "src.api.routes.agent",
+    "src.api.routes.analytics",
+    "src.api.routes.tiers",
+    "src.api.routes.widget",
+    "src.api.routes.webhooks",
+    "src.api.routes.product_crawl",
+    "src.api.routes.scheduled",
+    "src.api.routes.crawl",
+]
+
+# Smaller responses fit in a packet or two; compressing them costs more than it saves
+GZIP_MINIMUM_SIZE = 1024
+
 settings = get_settings()
-print("✓ settings loaded", flush=True)
+setup_logging(settings.log_level, settings.log_format, settings.log_debug_sample_rate)
+
 
-print("Creating FastAPI app...", flush=True)
-app = FastAPI(title="Local Business AI Agent Platform", debug=settings.debug)
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from src.crawlers.archive import shutdown_archive
+    from src.crawlers.parse_pool import shutdown_parse_pool
+    from src.integrations.clients import warm_up, close_clients
+    from src.services.crawl_service import shutdown_crawl_service
+    from src.services.query_log import get_query_log
+
+    # Create shared clients off the event loop so /health answers while they load
+    warm_up_task = None
+    if settings.warm_up_clients:
+        warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up))
+
+    yield
+
+    if warm_up_task is not None and not warm_up_task.done():
+        await asyncio.wait([warm_up_task], timeout=5)
+    await asyncio.to_thread(get_query_log().flush)
+    await shutdown_crawl_service()
+    await close_clients()
+    shutdown_parse_pool()
+    await asyncio.to_thread(shutdown_archive)
+
+
+app = FastAPI(title="Local Business AI Agent Platform", debug=settings.debug, lifespan=lifespan)
 
 # Add error handlers
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_exception_handler(StarletteHTTPException, http_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
 app.add_exception_handler(Exception, general_exception_handler)
@@ -91,20 +78,28 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Server-Timing"],
 )
+# Compresses larger JSON answers; responses that set Content-Encoding themselves (widget.js) pass through
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=5)
+app.add_middleware(TimingMiddleware)
+app.add_middleware(RequestIdMiddleware)
 
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
-# Register all routers
-app.include_router(agent_router)
-app.include_router(analytics_router)
-app.include_router(tiers_router)
-app.include_router(widget_router)
-app.include_router(webhooks_router)
-app.include_router(product_crawl_router)
-app.include_router(scheduled_router)
-app.include_router(crawl_router)
-
-print("✓ APP STARTED SUCCESSFULLY", flush=True)# Force restart
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of request and phase latency histograms"""
+    from fastapi.responses import PlainTextResponse
+    from src.services.metrics import render_metrics
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# Register all routers, keeping per-module import times for startup diagnostics
+app.state.router_import_ms = {}
+for module_name in ROUTER_MODULES:
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    app.state.router_import_ms[module_name] = round((time.perf_counter() - started) * 1000, 1)
+    app.include_router(module.router)
@@ -1,17 +1,83 @@
 from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import Optional, List
-import anthropic
-import os
+from src.agents.answer_templates import is_simple_lookup, template_answer
+from src.agents.smart_agent import detect_intent
 from src.database.supabase_client import get_supabase_client
+from src.config.settings import get_settings
+from src.integrations.clients import get_async_anthropic_client
+from src.services.metrics import agent_answers, degraded_answers
+from src.services.model_router import (
+    LatencyBudget, LLMUnavailable, attempt_client, complete, estimate_tokens, route_model,
+)
+from src.services.query_log import get_query_log, normalize_question
+from src.services.request_cancellation import CANCEL_REASONS, cancellable
+from src.services.single_flight import single_flight
+from src.services.usage import usage_tracker
+from src.middleware.rate_limit import rate_limiter, client_key, ASK_PER_BUSINESS, ASK_PER_IP, ASK_PER_SESSION
+from src.middleware.timing import span
+from fastapi.responses import ORJSONResponse
+import asyncio
+import functools
+import logging
 import re
+import time
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
+# Product fields returned by /agent/ask: what the widget renders, unless the caller asks for others
+DISPLAY_FIELDS = ('name', 'price', 'url', 'in_stock')
+OPTIONAL_FIELDS = ('id', 'category', 'description', 'images', 'colors', 'sizes', 'brand')
+# Columns filter_products and the prompt read
+FILTER_COLUMNS = ('name', 'price', 'category')
+# Answer when no model replied within the latency budget and no template fits
+DEGRADED_ANSWER = "Here's what I found."
+
 class AskRequest(BaseModel):
     question: str
     business_id: str
     k: Optional[int] = 10
+    session_id: Optional[str] = None
+    # Product fields to return (default DISPLAY_FIELDS)
+    fields: Optional[List[str]] = None
+
+    @field_validator('fields')
+    @classmethod
+    def known_fields(cls, fields: Optional[List[str]]) -> Optional[List[str]]:
+        if fields is None:
+            return None
+        unknown = [f for f in fields if f not in DISPLAY_FIELDS + OPTIONAL_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown product fields: {', '.join(unknown)}")
+        return list(dict.fromkeys(fields))
+
+def product_columns(fields: List[str]) -> str:
+    """select() column list: the requested fields plus whatever filtering needs"""
+    return ", ".join(dict.fromkeys([*FILTER_COLUMNS, *fields]))
+
+def compact_product(product: dict, fields: List[str]) -> dict:
+    return {f: product.get(f) for f in fields}
+
+def fetch_catalog(business_id: str, columns: str) -> List[dict]:
+    """In-stock products of a business (first 100), the columns /agent/ask needs"""
+    supabase = get_supabase_client()
+    response = supabase.table('products') \
+        .select(columns) \
+        .eq('business_id', business_id) \
+        .eq('in_stock', True) \
+        .limit(100) \
+        .execute()
+    return response.data if response.data else []
+
+async def generate_answer(prompt: str, model: str, timeout: float) -> str:
+    message = await attempt_client(get_async_anthropic_client(), timeout).messages.create(
+        model=model,
+        max_tokens=100,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    return message.content[0].text.strip()
 
 def extract_filters(query: str):
     """Extract price, color, and category filters from query"""
@@ -72,9 +138,9 @@ def extract_filters(query: str):
     
     return min_price, max_price, category_keywords, color_keywords
 
-def filter_products(products: List[dict], query: str) -> List[dict]:
+def filter_products(products: List[dict], query: str, filters: Optional[tuple] = None) -> List[dict]:
     """Filter products by price, category, and color"""
-    min_price, max_price, category_keywords, color_keywords = extract_filters(query)
+    min_price, max_price, category_keywords, color_keywords = filters or extract_filters(query)
     
     filtered = []
     for product in products:
@@ -101,55 +167,115 @@ def filter_products(products: List[dict], query: str) -> List[dict]:
     
     return filtered
 
+def log_query(req: AskRequest, filters: tuple, products_fetched: int, result_count: int, started: float,
+              answer_source: str):
+    """Record the parsed filters, counts, latency and answer source (llm, template, degraded, static) of an answered question"""
+    min_price, max_price, category_keywords, color_keywords = filters
+    agent_answers.inc(source=answer_source)
+    try:
+        get_query_log().record(
+            business_id=req.business_id,
+            question=req.question,
+            min_price=min_price,
+            max_price=max_price,
+            categories=category_keywords,
+            colors=color_keywords,
+            products_fetched=products_fetched,
+            result_count=result_count,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            answer_source=answer_source,
+        )
+    except Exception as e:
+        # Analytics must never break answering
+        logger.warning("Query log error: %s", e)
+
 @router.post("/ask")
 async def ask_agent(req: AskRequest, request: Request):
-    """AI agent for product questions"""
-    print(f"Agent question: {req.question} for business: {req.business_id}", flush=True)
+    """AI agent for product questions; the work stops if the client disconnects or cancels the request"""
+    return await cancellable.run(request, "/agent/ask", lambda: answer_ask(req, request))
+
+@router.post("/cancel/{request_id}")
+async def cancel_ask(request_id: str, request: Request, reason: str = "superseded"):
+    """Cancel this client's in-flight /agent/ask sent with this X-Request-ID; reason is superseded, closed or left"""
+    if reason not in CANCEL_REASONS:
+        raise HTTPException(status_code=400, detail=f"reason must be one of {', '.join(CANCEL_REASONS)}")
+    return {"request_id": request_id, "cancelled": cancellable.cancel(request, request_id, reason)}
+
+async def answer_ask(req: AskRequest, request: Request):
+    logger.info("Agent question", extra={"business_id": req.business_id, "question": req.question})
+    started = time.perf_counter()
+    # Past this the answer goes out with products only, whatever the LLM is doing
+    budget = LatencyBudget(get_settings().agent_latency_budget_ms / 1000, started)
+    filters = extract_filters(req.question)
+    
+    # One site's traffic can't starve other tenants, one visitor can't starve their site. The per-IP
+    # bucket comes first: new session ids don't get around it, and rejected calls don't drain the site's bucket
+    await rate_limiter.enforce(f"ask:{client_key(request)}", ASK_PER_IP)
+    await rate_limiter.enforce(f"ask:business:{req.business_id}:{client_key(request, req.session_id)}", ASK_PER_SESSION)
+    await rate_limiter.enforce(f"ask:business:{req.business_id}", ASK_PER_BUSINESS)
+    
+    # In-memory tier/usage check; counts are re-read from Supabase (in a thread) every few minutes
+    await usage_tracker.refresh(req.business_id)
+    usage_tracker.enforce_conversation_limit(req.business_id)
+    usage_tracker.record_conversation(req.business_id)
+    
+    fields = req.fields or list(DISPLAY_FIELDS)
     
     try:
-        supabase = get_supabase_client()
-        
-        response = supabase.table('products') \
-            .select('*') \
-            .eq('business_id', req.business_id) \
-            .eq('in_stock', True) \
-            .limit(100) \
-            .execute()
-        
-        all_products = response.data if response.data else []
+        columns = product_columns(fields)
+        with span("db"):
+            # Concurrent questions to the same business share one catalog fetch, dropped if they all go away
+            all_products = await single_flight.run(
+                req.business_id, "catalog", columns,
+                lambda: asyncio.to_thread(fetch_catalog, req.business_id, columns),
+                cancel_abandoned=True,
+            )
         
         if not all_products:
-            return {
+            log_query(req, filters, 0, 0, started, "static")
+            return ORJSONResponse({
                 "answer": "I don't have any product information yet.",
                 "products": []
-            }
-        
-        print(f"Retrieved {len(all_products)} total products", flush=True)
+            })
         
         # Filter products
-        filtered_products = filter_products(all_products, req.question)
+        with span("filter"):
+            filtered_products = filter_products(all_products, req.question, filters)
         
-        print(f"After filtering: {len(filtered_products)} products", flush=True)
+        logger.debug(
+            "Filtered products",
+            extra={"business_id": req.business_id, "fetched": len(all_products), "matched": len(filtered_products)}
+        )
         
         if not filtered_products:
-            return {
+            log_query(req, filters, len(all_products), 0, started, "static")
+            return ORJSONResponse({
                 "answer": "I couldn't find any products matching that. Try adjusting your search.",
                 "products": []
-            }
+            })
         
         # Take top matches
         products_for_display = filtered_products[:req.k]
         
-        # Format for AI (just basic info, no full descriptions)
-        products_summary = "\n".join([
-            f"- {p['name']}: ${p['price']:.2f}"
-            for p in products_for_display[:5]  # Only show AI first 5
-        ])
-        
-        # Call Claude with SHORT response requirement
-        client = anthropic.Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+        answer = None
+        answer_source = "llm"
+        intents = detect_intent(req.question)
+        # Plain searches with filters get a sentence built from them; compare/recommend questions go to Claude
+        if usage_tracker.answer_mode(req.business_id) == "auto" and is_simple_lookup(intents, filters):
+            with span("template"):
+                answer = template_answer(filters, len(filtered_products), len(products_for_display))
+            answer_source = "template"
         
-        prompt = f"""Customer asked: "{req.question}"
+        if answer is None:
+            answer_source = "llm"
+            with span("prompt"):
+                # Format for AI (just basic info, no full descriptions)
+                products_summary = "\n".join([
+                    f"- {p['name']}: ${p['price']:.2f}"
+                    for p in products_for_display[:5]  # Only show AI first 5
+                ])
+                
+                prompt = f"""Customer asked: "{req.question}"
 
 Matching products:
 {products_summary}
@@ -163,21 +289,28 @@ Examples:
 
 Keep it under 20 words."""
 
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=100,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        
-        answer = message.content[0].text.strip()
+            # Call Claude with SHORT response requirement; a burst of the same question makes one call.
+            # Plain searches go to the fast model; within the budget a slow call is hedged, a failed one retried
+            route = route_model("anthropic", intents, estimate_tokens(prompt))
+            try:
+                with span("llm"):
+                    answer = await single_flight.run(
+                        req.business_id, "answer", (normalize_question(req.question), products_summary),
+                        lambda: complete(functools.partial(generate_answer, prompt), route, budget),
+                        cancel_abandoned=True,
+                    )
+            except LLMUnavailable as e:
+                degraded_answers.inc(agent="ask", reason=e.reason)
+                answer = template_answer(filters, len(filtered_products), len(products_for_display)) or DEGRADED_ANSWER
+                answer_source = "degraded"
+        log_query(req, filters, len(all_products), len(filtered_products), started, answer_source)
         
-        return {
-            "answer": answer,
-            "products": products_for_display
-        }
+        with span("serialize"):
+            return ORJSONResponse({
+                "answer": answer,
+                "products": [compact_product(p, fields) for p in products_for_display]
+            })
     
     except Exception as e:
-        print(f"Error: {e}", flush=True)
-        import traceback
-        traceback.print_exc()
+        logger.exception("Agent error", extra={"business_id": req.business_id})
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -3,6 +3,8 @@ from pydantic import BaseModel
 from datetime import datetime, timedelta
 from typing import Optional
 from src.database.supabase_client import get_supabase_client
+from src.services import query_log
+from src.middleware.timing import span
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
@@ -26,7 +28,8 @@ async def log_conversation(log: ConversationLog):
         'timestamp': (log.timestamp or datetime.utcnow()).isoformat()
     }
     
-    supabase.table('conversation_logs').insert(data).execute()
+    with span("db"):
+        supabase.table('conversation_logs').insert(data).execute()
     return {"status": "logged"}
 
 @router.get("/stats/{business_id}")
@@ -34,12 +37,13 @@ async def get_stats(business_id: str):
     """Get analytics stats for a business"""
     supabase = get_supabase_client()
     
-    # Total conversations
-    total = supabase.table('conversation_logs').select('id', count='exact').eq('business_id', business_id).execute()
-    
-    # Last 30 days
-    thirty_days_ago = (datetime.utcnow() - timedelta(days=30)).isoformat()
-    recent = supabase.table('conversation_logs').select('*').eq('business_id', business_id).gte('timestamp', thirty_days_ago).execute()
+    with span("db"):
+        # Total conversations
+        total = supabase.table('conversation_logs').select('id', count='exact').eq('business_id', business_id).execute()
+        
+        # Last 30 days
+        thirty_days_ago = (datetime.utcnow() - timedelta(days=30)).isoformat()
+        recent = supabase.table('conversation_logs').select('*').eq('business_id', business_id).gte('timestamp', thirty_days_ago).execute()
     
     avg_products = sum(c.get('products_found', 0) for c in recent.data) / len(recent.data) if recent.data else 0
     
@@ -48,3 +52,40 @@ async def get_stats(business_id: str):
         'conversations_last_30_days': len(recent.data) if recent.data else 0,
         'avg_products_per_query': round(avg_products, 2)
     }
+
+# The query log scans Parquet files, so these are plain functions run in the threadpool
+@router.get("/queries/top/{business_id}")
+def get_top_queries(business_id: str, days: int = 30, limit: int = 20):
+    """Most frequent questions asked to a business's agent"""
+    return {
+        'business_id': business_id,
+        'days': days,
+        'queries': query_log.top_queries(business_id, days=days, limit=limit)
+    }
+
+@router.get("/queries/zero-results/{business_id}")
+def get_zero_result_queries(business_id: str, days: int = 30, limit: int = 20):
+    """Most frequent questions that matched no products"""
+    return {
+        'business_id': business_id,
+        'days': days,
+        'queries': query_log.zero_result_queries(business_id, days=days, limit=limit)
+    }
+
+@router.get("/queries/answers/{business_id}")
+def get_answer_sources(business_id: str, days: int = 30):
+    """Share of agent answers written without an LLM call (templates and no-product replies)"""
+    return {
+        'business_id': business_id,
+        'days': days,
+        **query_log.answer_sources(business_id, days=days)
+    }
+
+@router.get("/queries/latency/{business_id}")
+def get_query_latency(business_id: str, days: int = 30):
+    """Latency percentiles and zero-result rate for a business's agent"""
+    return {
+        'business_id': business_id,
+        'days': days,
+        **query_log.latency_percentiles(business_id, days=days)
+    }
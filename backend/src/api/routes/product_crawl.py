@@ -1,10 +1,21 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+import asyncio
+import time
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
 from pydantic import BaseModel
-from typing import List, Dict
-import httpx
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-from src.database.supabase_client import get_supabase_client
+from typing import List, Dict, Optional
+from urllib.parse import urlparse
+from src.crawlers.archive import archive_crawl
+from src.crawlers.frontier import Frontier, canonical_url, learn_patterns, learned_patterns
+from src.crawlers.parse_pool import run_parse
+from src.crawlers.fetching import fetch_html
+from src.crawlers.product_sources import fetch_json, shopify_product_page
+from src.crawlers.seeding import crawl_delay_remaining, seed_crawl
+from src.crawlers.web_crawler import ParsedPage, parse_page
+from src.services.product_store import ProductWriter
+from src.services.recrawl_tokens import check_recrawl_token, is_crawl_service
+from src.services.single_flight import single_flight
+from src.middleware.rate_limit import rate_limiter, client_key, CRAWL_PER_CALLER
+from src.middleware.timing import span
 
 router = APIRouter(prefix="/product-crawl", tags=["product-crawl"])
 
@@ -12,132 +23,125 @@ class CrawlRequest(BaseModel):
     start_url: str
     max_pages: int = 100
     business_id: str
+    # The business's recrawl_token (from its first /api/crawl): crawls write into its catalog
+    recrawl_token: Optional[str] = None
 
-async def is_product_page(url: str, soup: BeautifulSoup) -> bool:
+def is_product_page(url: str, page: ParsedPage) -> bool:
     """Detect if this is a product page"""
     if '/products/' in url or '/product/' in url:
         return True
-    if soup.find('meta', property='og:type', content='product'):
-        return True
-    return False
+    return page.og_type == 'product'
 
 async def scrape_shopify_product(url: str) -> Dict:
     """Scrape Shopify product using JSON API"""
     try:
         if '/products/' in url:
-            json_url = url.split('?')[0] + '.json'
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(json_url)
-                response.raise_for_status()
-                data = response.json()
-                
-                if 'product' not in data:
-                    return None
-                
-                product_data = data['product']
-                variants = product_data.get('variants', [])
-                
-                colors = set()
-                sizes = set()
-                
-                option1_name = product_data.get('options', [{}])[0].get('name', '').lower() if product_data.get('options') else ''
-                option2_name = product_data.get('options', [{}])[1].get('name', '').lower() if len(product_data.get('options', [])) > 1 else ''
-                
-                for variant in variants:
-                    opt1 = variant.get('option1')
-                    opt2 = variant.get('option2')
-                    
-                    if opt1:
-                        if 'size' in option1_name or any(c.isdigit() for c in str(opt1)):
-                            sizes.add(opt1)
-                        else:
-                            colors.add(opt1)
-                    
-                    if opt2:
-                        if 'size' in option2_name or any(c.isdigit() for c in str(opt2)):
-                            sizes.add(opt2)
-                        else:
-                            colors.add(opt2)
-                
-                in_stock = any(v.get('available', False) for v in variants)
-                
-                price = None
-                if variants:
-                    prices = [float(v['price']) for v in variants if v.get('price')]
-                    price = min(prices) if prices else None
-                
-                images = [img['src'] for img in product_data.get('images', [])[:3]]
-                
-                return {
-                    'url': url,
-                    'name': product_data.get('title'),
-                    'price': price,
-                    'description': product_data.get('body_html', '')[:500] if product_data.get('body_html') else None,
-                    'colors': list(colors),
-                    'sizes': list(sizes),
-                    'in_stock': in_stock,
-                    'category': product_data.get('product_type'),
-                    'brand': product_data.get('vendor'),
-                    'images': images
-                }
+            data = await fetch_json(url.split('?')[0] + '.json')
+            return shopify_product_page(data, url)
     except:
         return None
 
 async def crawl_and_extract(start_url: str, max_pages: int, business_id: str) -> Dict:
-    """Crawl website and extract products"""
+    """Crawl website and extract products; a crawl of the same site already running is awaited instead"""
+    return await single_flight.run(
+        business_id, "crawl", (canonical_url(start_url), max_pages),
+        lambda: _crawl_and_extract(start_url, max_pages, business_id),
+    )
+
+async def _crawl_and_extract(start_url: str, max_pages: int, business_id: str) -> Dict:
+    import httpx
+
+    # Product pages listed in the sitemap go first, then the start page and the rest
+    with span("seed"):
+        seeds = await seed_crawl(start_url, max_pages)
+    robots = seeds.robots
+    
+    # Best-first: product URLs, then listings; media, cart/account pages and facet permutations are never queued
+    patterns = await asyncio.to_thread(learned_patterns, urlparse(start_url).netloc)
+    frontier = Frontier(start_url, robots, patterns)
+    for url in seeds.ordered(start_url):
+        frontier.push(url)
+    
     visited = set()
-    to_visit = [start_url]
+    product_pages = []
+    # Product pages whose product was extracted
+    extracted = set()
     products = []
+    failed = 0
+    last_fetch = 0.0
     
-    base_domain = urlparse(start_url).netloc
-    
-    async with httpx.AsyncClient(timeout=30) as client:
-        while to_visit and len(visited) < max_pages:
-            url = to_visit.pop(0)
+    with archive_crawl():
+        async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
+            while frontier and len(visited) < max_pages:
+                url, depth = frontier.pop()
+            
+                delay = crawl_delay_remaining(robots, last_fetch)
+                if delay:
+                    await asyncio.sleep(delay)
+                last_fetch = time.monotonic()
             
-            if url in visited:
-                continue
+                # Streamed: media, non-HTML and oversized responses are dropped before their body downloads
+                fetched = await fetch_html(url, client, timeout=30)
+                if fetched is None:
+                    failed += 1
+                    continue
             
-            try:
-                response = await client.get(url)
-                response.raise_for_status()
-                visited.add(url)
+                try:
+                    visited.add(url)
                 
-                soup = BeautifulSoup(response.content, 'html.parser')
+                    # Parsing and link discovery run in the parse pool, off the event loop
+                    page = await run_parse(parse_page, fetched.text, fetched.url, False)
                 
-                # Check if product page
-                if await is_product_page(url, soup):
-                    product = await scrape_shopify_product(url)
-                    if product:
-                        product['business_id'] = business_id
-                        products.append(product)
+                    # Check if product page
+                    on_product_page = is_product_page(url, page)
+                    if on_product_page:
+                        product_pages.append(url)
+                        with span("extract"):
+                            product = await scrape_shopify_product(url)
+                        if product:
+                            product['business_id'] = business_id
+                            products.append(product)
+                            extracted.add(url)
                 
-                # Find more links
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
-                    full_url = urljoin(url, href)
-                    
-                    if urlparse(full_url).netloc == base_domain and full_url not in visited:
-                        to_visit.append(full_url)
+                    # Find more links
+                    for link in page.links:
+                        frontier.push(link, depth + 1, from_product=on_product_page)
             
-            except:
-                continue
+                except:
+                    failed += 1
+                    continue
     
-    # Save to Supabase
+    # Save to Supabase, keyed on (business_id, url) so recrawls update rows instead of duplicating them
+    writer = ProductWriter(business_id)
     if products:
-        supabase = get_supabase_client()
-        supabase.table('products').upsert(products).execute()
+        await writer.write(products)
+    # Products are only marked out of stock when no page failed, every product URL the crawl found
+    # (sitemap, links, learned patterns) was extracted, and nothing else can hide more products:
+    # either the frontier ran dry, or the sitemap listed the catalog (fewer product URLs than
+    # max_pages, so seeding wasn't cut short) and the pages left over are just listings of it.
+    sitemap_catalog = 0 < len(seeds.product_urls) < max_pages
+    complete = failed == 0 and frontier.product_urls <= extracted and (not frontier or sitemap_catalog)
+    written = await writer.finish(mark_missing=complete and bool(products))
+    # Next crawl of this domain goes to pages shaped like these first
+    await asyncio.to_thread(learn_patterns, frontier.domain, product_pages)
     
     return {
         "pages_crawled": len(visited),
-        "products_found": len(products)
+        "products_found": len(products),
+        **written.as_dict(),
     }
 
 @router.post("/")
-async def crawl_products(req: CrawlRequest, background_tasks: BackgroundTasks):
+async def crawl_products(req: CrawlRequest, request: Request, background_tasks: BackgroundTasks):
     """Crawl a website and extract product data"""
     if not req.start_url.startswith("http"):
         raise HTTPException(status_code=400, detail="start_url must start with http/https")
+    # Per caller IP, like /api/crawl (the business_id is caller-chosen), except for the app's own crawl jobs
+    if not is_crawl_service(request.headers.get("x-crawl-service-token")):
+        await rate_limiter.enforce(f"crawl:{client_key(request)}", CRAWL_PER_CALLER, detail="Too many crawl requests")
+    # Writes (and marks out of stock) the business's products: only for callers holding its token
+    check_recrawl_token(req.business_id, req.recrawl_token)
+    await rate_limiter.enforce(f"crawl:business:{req.business_id}", CRAWL_PER_CALLER, detail="Too many crawl requests")
     
     # Run crawl in background
     result = await crawl_and_extract(req.start_url, req.max_pages, req.business_id)
@@ -1,6 +1,8 @@
+import asyncio
 from fastapi import APIRouter
 from src.database.supabase_client import get_supabase_client
-import httpx
+from src.middleware.timing import span
+from src.services.crawl_service import CrawlJob, get_crawl_service
 
 router = APIRouter(prefix="/scheduled", tags=["scheduled"])
 
@@ -8,34 +10,28 @@ router = APIRouter(prefix="/scheduled", tags=["scheduled"])
 async def crawl_all_businesses():
     """Daily cron job to recrawl all business websites"""
     supabase = get_supabase_client()
+    service = get_crawl_service()
     
     # Get all businesses with websites
-    businesses = supabase.table('businesses').select('id, website').execute()
+    with span("db"):
+        businesses = supabase.table('businesses').select('id, website').execute()
     
-    results = []
+    async def crawl(business: dict) -> dict:
+        try:
+            data = await service.run(CrawlJob(business_id=business['id'], start_url=business['website']))
+            return {
+                "business_id": business['id'],
+                "status": "success",
+                "data": data
+            }
+        except Exception as e:
+            return {
+                "business_id": business['id'],
+                "status": "error",
+                "error": str(e)
+            }
     
-    async with httpx.AsyncClient(timeout=300.0) as client:
-        for business in businesses.data:
-            if business.get('website'):
-                try:
-                    response = await client.post(
-                        "https://web-production-902d.up.railway.app/product-crawl/",
-                        json={
-                            "start_url": business['website'],
-                            "max_pages": 100,
-                            "business_id": business['id']
-                        }
-                    )
-                    results.append({
-                        "business_id": business['id'],
-                        "status": "success",
-                        "data": response.json()
-                    })
-                except Exception as e:
-                    results.append({
-                        "business_id": business['id'],
-                        "status": "error",
-                        "error": str(e)
-                    })
+    # The crawl service bounds how many run at once (CRAWL_QUEUE_WORKERS with the default queue transport)
+    results = await asyncio.gather(*(crawl(b) for b in businesses.data if b.get('website')))
     
-    return {"businesses_crawled": len(results), "results": results}
+    return {"businesses_crawled": len(results), "results": list(results)}
@@ -1,50 +1,43 @@
+import asyncio
 from fastapi import APIRouter, HTTPException
-from src.database.supabase_client import get_supabase_client
+from src.services.usage import list_tiers_cached, usage_tracker, DEFAULT_TIER
 
 router = APIRouter(prefix="/tiers", tags=["tiers"])
 
 @router.get("/list")
 async def list_tiers():
     """Get all available pricing tiers"""
-    supabase = get_supabase_client()
-    result = supabase.table('pricing_tiers').select('*').execute()
-    return {"tiers": result.data}
+    # Reads the table on a cache miss
+    return {"tiers": await asyncio.to_thread(list_tiers_cached)}
 
 @router.get("/check-limits/{business_id}")
-async def check_limits(business_id: str):
+async def check_limits(business_id: str, refresh: bool = False):
     """Check usage limits for a business"""
-    supabase = get_supabase_client()
-    
-    # Get business with tier info
-    business = supabase.table('businesses').select('*, pricing_tiers(*)').eq('id', business_id).single().execute()
-    
-    if not business.data:
+    # Served from in-memory counters; refresh=true forces a re-read from Supabase
+    if refresh:
+        usage = await asyncio.to_thread(usage_tracker.reconcile, business_id)
+    else:
+        usage = await usage_tracker.refresh(business_id)
+
+    if not usage.found:
         raise HTTPException(status_code=404, detail="Business not found")
-    
-    tier = business.data.get('pricing_tiers', {})
-    
-    # Count products
-    products = supabase.table('products').select('id', count='exact').eq('business_id', business_id).execute()
-    product_count = products.count or 0
-    
-    # Count conversations this month
-    from datetime import datetime, timedelta
-    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0).isoformat()
-    conversations = supabase.table('conversation_logs').select('id', count='exact').eq('business_id', business_id).gte('timestamp', month_start).execute()
-    conversation_count = conversations.count or 0
-    
+
+    tier = usage_tracker.limits_for(usage)
+    max_products = tier.get('max_products', DEFAULT_TIER['max_products'])
+    max_conversations = tier.get('max_conversations', DEFAULT_TIER['max_conversations'])
+
     return {
         "tier_name": tier.get('name', 'Free'),
         "limits": {
-            "max_products": tier.get('max_products', 50),
-            "max_conversations": tier.get('max_conversations', 100)
+            "max_products": max_products,
+            "max_conversations": max_conversations
         },
         "current_usage": {
-            "products": product_count,
-            "conversations_this_month": conversation_count
+            "products": usage.products,
+            "conversations_this_month": usage.conversations
         },
         "limits_exceeded": {
-            "products": product_count > tier.get('max_products', 50),
-            "conversations": conversation_count > tier.get('max_conversations', 100)
+            "products": usage.products > max_products,
+            "conversations": usage.conversations > max_conversations
         }
     }
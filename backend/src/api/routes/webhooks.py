@@ -1,35 +1,29 @@
-from fastapi import APIRouter, BackgroundTasks
-import httpx
+from fastapi import APIRouter
+import logging
 from src.database.supabase_client import get_supabase_client
+from src.middleware.timing import span
+from src.services.crawl_service import CrawlJob, get_crawl_service
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/webhooks", tags=["webhooks"])
 
-async def trigger_crawl(business_id: str, website_url: str):
-    """Background task to crawl website"""
-    async with httpx.AsyncClient(timeout=300.0) as client:
-        try:
-            await client.post(
-                "https://web-production-902d.up.railway.app/product-crawl/",
-                json={
-                    "start_url": website_url,
-                    "max_pages": 100,
-                    "business_id": business_id
-                }
-            )
-        except Exception as e:
-            print(f"Crawl error: {e}")
+def trigger_crawl(business_id: str, website_url: str):
+    """Queue the first crawl of a new business's website (errors are logged by the crawl service)"""
+    get_crawl_service().submit(CrawlJob(business_id=business_id, start_url=website_url))
 
 @router.post("/business-created")
-async def business_created(background_tasks: BackgroundTasks, business_id: str, website_url: str):
+async def business_created(business_id: str, website_url: str):
     """Webhook triggered when a business signs up"""
     supabase = get_supabase_client()
     
-    supabase.table('webhook_logs').insert({
-        'business_id': business_id,
-        'event': 'business_created',
-        'status': 'processing'
-    }).execute()
+    with span("db"):
+        supabase.table('webhook_logs').insert({
+            'business_id': business_id,
+            'event': 'business_created',
+            'status': 'processing'
+        }).execute()
     
-    background_tasks.add_task(trigger_crawl, business_id, website_url)
+    trigger_crawl(business_id, website_url)
     
     return {"status": "crawl_scheduled"}
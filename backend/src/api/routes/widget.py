@@ -1,59 +1,250 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import Response
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, field_validator
 from typing import Optional
 from src.database.supabase_client import get_supabase_client
+from src.config.settings import get_settings
+from src.services.cache import TTLCache
+from src.middleware.timing import span
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
 import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/widget", tags=["widget"])
 
+WIDGET_PATH = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'static', 'widget.js'
+))
+
+# Unversioned URL: cache for a day, then revalidate cheaply with the ETag
+WIDGET_CACHE_CONTROL = "public, max-age=86400, stale-while-revalidate=604800"
+# ?v=<etag> URLs never change content
+WIDGET_VERSIONED_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Scripts with inlined settings must pick up settings changes reasonably quickly
+WIDGET_INLINE_CACHE_CONTROL = "public, max-age=300, stale-while-revalidate=3600"
+SETTINGS_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=3600"
+
+# Settings only change through update_widget_settings, which invalidates this process's
+# entry; the TTL bounds staleness on other workers.
+SETTINGS_TTL_SECONDS = 600
+# Colors the widget accepts for primary_color (same pattern as COLOR in widget.js)
+COLOR = re.compile(r"^(#[0-9a-f]{3,8}|rgba?\(\s*\d{1,3}%?\s*(,\s*\d{1,3}%?\s*){2}(,\s*(0|1|0?\.\d+)\s*)?\))$", re.I)
+
+DEFAULT_WIDGET_SETTINGS = {
+    "primary_color": "#FF6B35",
+    "position": "bottom-right",
+    "bubble_icon": "💬"
+}
+
 class WidgetSettings(BaseModel):
     business_id: str
     primary_color: Optional[str] = "#FF6B35"
     position: Optional[str] = "bottom-right"
     bubble_icon: Optional[str] = "💬"
 
+    @field_validator('primary_color')
+    @classmethod
+    def plain_color(cls, color: Optional[str]) -> Optional[str]:
+        # The widget puts it in style attributes; it checks again for rows saved before this
+        if color is not None and not COLOR.match(color):
+            raise ValueError("primary_color must be a hex color (#rrggbb) or rgb()/rgba()")
+        return color
+
+
+# Per-business inlined scripts are built on request, so they get cheap compression levels
+INLINED_GZIP_LEVEL = 5
+INLINED_BROTLI_QUALITY = 4
+
+
+class CompressedAsset:
+    """Script body held in memory with a content-hash ETag and pre-compressed variants"""
+
+    def __init__(self, body: bytes, gzip_level: int = 9, brotli_quality: int = 11):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:20] + '"'
+        self.variants = {"gzip": gzip.compress(body, compresslevel=gzip_level, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, mode=brotli.MODE_TEXT, quality=brotli_quality)
+
+    @property
+    def version(self) -> str:
+        return self.etag.strip('"')
+
+    def negotiate(self, accept_encoding: str) -> tuple[bytes, Optional[str]]:
+        """Pick the smallest variant the client accepts"""
+        accepted = {part.split(';')[0].strip() for part in accept_encoding.lower().split(',')}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.variants:
+                return self.variants[encoding], encoding
+        return self.body, None
+
+
+class WidgetScript:
+    """widget.js loaded once; reloaded when the file changes in debug mode"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = None
+        self.asset: Optional[CompressedAsset] = None
+        # Per-business variants with settings inlined
+        self.inlined = TTLCache(ttl_seconds=300, max_entries=2000)
+
+    def load(self):
+        with open(self.path, 'rb') as f:
+            body = f.read()
+        self.mtime = os.stat(self.path).st_mtime
+        self.asset = CompressedAsset(body)
+        self.inlined.invalidate()
+
+    def get(self) -> CompressedAsset:
+        if self.asset is None:
+            self.load()
+        elif get_settings().debug and os.stat(self.path).st_mtime != self.mtime:
+            self.load()
+        return self.asset
+
+    def cached_inlined(self, business_id: str) -> Optional[CompressedAsset]:
+        """get_inlined()'s answer if it needs no database read or compression, else None"""
+        asset = self.inlined.get(business_id)
+        if asset is None and _settings_cache.get(business_id) is not None and not has_widget_settings(business_id):
+            return self.get()
+        return asset
+
+    def get_inlined(self, business_id: str) -> CompressedAsset:
+        """The script with the business's settings inlined; the plain script if it has none (blocking)"""
+        base = self.get()
+        asset = self.inlined.get(business_id)
+        if asset is None:
+            # Unknown or unconfigured businesses (the id is caller-chosen) share the plain script,
+            # so they neither cost a compression nor evict real entries
+            if not has_widget_settings(business_id):
+                return base
+            settings = json.dumps(load_widget_settings(business_id), ensure_ascii=False)
+            # "</" is escaped so stored settings can't close a <script> element
+            settings = settings.replace('</', '<\\/')
+            prefix = f"window.__AI_WIDGET_SETTINGS__ = {settings};\n"
+            asset = CompressedAsset(prefix.encode('utf-8') + base.body, INLINED_GZIP_LEVEL, INLINED_BROTLI_QUALITY)
+            self.inlined.set(business_id, asset)
+        return asset
+
+
+widget_script = WidgetScript(WIDGET_PATH)
+try:
+    widget_script.load()
+except FileNotFoundError:
+    logger.error("Widget script not found at %s", WIDGET_PATH)
+
+
+_settings_cache = TTLCache(ttl_seconds=SETTINGS_TTL_SECONDS, max_entries=10000)
+
+
+def _fetch_widget_settings(business_id: str) -> tuple[dict, str, bool]:
+    supabase = get_supabase_client()
+    with span("db"):
+        result = supabase.table('widget_settings').select('*').eq('business_id', business_id).execute()
+
+    settings = result.data[0] if result.data else dict(DEFAULT_WIDGET_SETTINGS)
+    body = json.dumps(settings, sort_keys=True, default=str).encode('utf-8')
+    etag = '"' + hashlib.sha256(body).hexdigest()[:20] + '"'
+    return settings, etag, bool(result.data)
+
+
+def _widget_settings_entry(business_id: str) -> tuple[dict, str, bool]:
+    # Businesses without a row are cached too (with the defaults), so repeated unknown ids don't hit the database
+    return _settings_cache.get_or_load(business_id, lambda: _fetch_widget_settings(business_id))
+
+
+def load_widget_settings_with_etag(business_id: str) -> tuple[dict, str]:
+    """Read-through cached widget settings and their ETag"""
+    settings, etag, _stored = _widget_settings_entry(business_id)
+    return settings, etag
+
+
+def has_widget_settings(business_id: str) -> bool:
+    """Whether the business saved widget settings (blocking on a cache miss)"""
+    return _widget_settings_entry(business_id)[2]
+
+
+def load_widget_settings(business_id: str) -> dict:
+    """Widget settings row for a business, or the defaults"""
+    return load_widget_settings_with_etag(business_id)[0]
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
 @router.post("/settings/{business_id}")
 async def update_widget_settings(business_id: str, settings: WidgetSettings):
     """Update widget customization settings"""
     supabase = get_supabase_client()
-    
+
     data = {
         'business_id': business_id,
         'primary_color': settings.primary_color,
         'position': settings.position,
         'bubble_icon': settings.bubble_icon
     }
-    
-    supabase.table('widget_settings').upsert(data).execute()
+
+    with span("db"):
+        supabase.table('widget_settings').upsert(data).execute()
+    _settings_cache.invalidate(business_id)
+    widget_script.inlined.invalidate(business_id)
     return {"status": "updated", "settings": data}
 
 @router.get("/settings/{business_id}")
-async def get_widget_settings(business_id: str):
+async def get_widget_settings(business_id: str, request: Request):
     """Get widget customization settings"""
-    supabase = get_supabase_client()
-    
-    result = supabase.table('widget_settings').select('*').eq('business_id', business_id).execute()
-    
-    if not result.data:
-        return {
-            "primary_color": "#FF6B35",
-            "position": "bottom-right",
-            "bubble_icon": "💬"
-        }
-    
-    return result.data[0]
+    settings, etag = load_widget_settings_with_etag(business_id)
+    headers = {"ETag": etag, "Cache-Control": SETTINGS_CACHE_CONTROL}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(content=jsonable_encoder(settings), headers=headers)
 
 @router.get("/widget.js")
-async def get_widget_script():
-    """Serve the widget JavaScript file"""
-    # Use absolute path from current file location
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    static_path = os.path.join(current_dir, '..', '..', '..', 'static', 'widget.js')
-    
+async def get_widget_script(request: Request, business_id: Optional[str] = None, v: Optional[str] = None):
+    """Serve the widget JavaScript file from memory"""
     try:
-        with open(static_path, 'r') as f:
-            content = f.read()
-        return Response(content=content, media_type="application/javascript")
+        if business_id:
+            # A cache miss reads the settings and compresses a new variant: in a thread
+            asset = widget_script.cached_inlined(business_id) or await asyncio.to_thread(widget_script.get_inlined, business_id)
+        else:
+            asset = widget_script.get()
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Widget script not found")
+
+    if business_id:
+        cache_control = WIDGET_INLINE_CACHE_CONTROL
+    elif v and v == asset.version:
+        cache_control = WIDGET_VERSIONED_CACHE_CONTROL
+    else:
+        cache_control = WIDGET_CACHE_CONTROL
+
+    headers = {
+        "ETag": asset.etag,
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+
+    if etag_matches(request, asset.etag):
+        return Response(status_code=304, headers=headers)
+
+    body, encoding = asset.negotiate(request.headers.get("accept-encoding", ""))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=body, media_type="application/javascript", headers=headers)
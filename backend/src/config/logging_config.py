@@ -0,0 +1,134 @@
+"""
+Structured logging setup.
+
+Application code logs through the standard `logging` module
+(`logger = logging.getLogger(__name__)`). Records are handed to a queue on the
+calling thread and written as JSON lines by a background listener thread, so a
+log call in a request handler never waits on stdout.
+
+Pass structured fields with `extra={...}`; the current request id is attached
+automatically. High-volume DEBUG lines are sampled (LOG_DEBUG_SAMPLE_RATE, or a
+per-call `extra={"sample_rate": 0.1}`).
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+_INTERNAL_ATTRS = {"sample_rate"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and key not in _INTERNAL_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable output for local development (LOG_FORMAT=text)"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id") or record.request_id is None:
+            record.request_id = "-"
+        return super().format(record)
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current request id; runs in the caller's context, before the record is queued"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records; INFO and above always pass"""
+
+    def __init__(self, sample_rate: float):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = getattr(record, "sample_rate", self.sample_rate)
+        return rate >= 1.0 or random.random() < rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message and traceback now (args/exc_info may not survive the
+        # thread hop) but leave JSON formatting to the listener thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json", debug_sample_rate: float = 0.01):
+    """Route the root logger through a queue to a JSON stdout writer thread. Safe to call twice."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(TextFormatter() if fmt == "text" else JSONFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    # Chatty third-party loggers stay at WARNING
+    for name in ("httpx", "httpcore", "hpack", "urllib3"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Drain the queue and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
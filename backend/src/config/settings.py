@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -14,6 +15,62 @@ class Settings(BaseSettings):
     debug: bool = Field(default=True, alias="DEBUG")
     host: str = Field(default="0.0.0.0", alias="HOST")
     port: int = Field(default=8000, alias="PORT")
+    warm_up_clients: bool = Field(default=True, alias="WARM_UP_CLIENTS")
+
+    # Logging
+    log_level: str = Field(default="INFO", alias="LOG_LEVEL")
+    log_format: str = Field(default="json", alias="LOG_FORMAT")
+    log_debug_sample_rate: float = Field(default=0.01, alias="LOG_DEBUG_SAMPLE_RATE")
+
+    # Rate limiting (token buckets in Redis, per-process fallback)
+    rate_limit_enabled: bool = Field(default=True, alias="RATE_LIMIT_ENABLED")
+    rate_limit_ask_per_business: int = Field(default=120, alias="RATE_LIMIT_ASK_PER_BUSINESS")
+    rate_limit_ask_per_session: int = Field(default=15, alias="RATE_LIMIT_ASK_PER_SESSION")
+    rate_limit_ask_per_ip: int = Field(default=30, alias="RATE_LIMIT_ASK_PER_IP")
+    # Proxies in front of the API that append to X-Forwarded-For (Railway: 1; 0 uses the socket address)
+    trusted_proxy_count: int = Field(default=1, alias="TRUSTED_PROXY_COUNT")
+    rate_limit_crawls_per_hour: int = Field(default=5, alias="RATE_LIMIT_CRAWLS_PER_HOUR")
+
+    # /agent/ask answers: "auto" writes simple lookups from templates and calls the LLM for the rest,
+    # "llm" always calls the LLM. businesses.answer_mode overrides it per business.
+    agent_answer_mode: str = Field(default="auto", alias="AGENT_ANSWER_MODE")
+
+    # LLM model tiers (src/services/model_router.py): plain searches use the fast model,
+    # compare/recommend questions and prompts over LLM_LARGE_PROMPT_TOKENS the standard one
+    llm_fast_model: str = Field(default="claude-3-5-haiku-20241022", alias="LLM_FAST_MODEL")
+    llm_standard_model: str = Field(default="claude-sonnet-4-20250514", alias="LLM_STANDARD_MODEL")
+    openai_fast_model: str = Field(default="gpt-4o-mini", alias="OPENAI_FAST_MODEL")
+    openai_standard_model: str = Field(default="gpt-4o", alias="OPENAI_STANDARD_MODEL")
+    llm_large_prompt_tokens: int = Field(default=1500, alias="LLM_LARGE_PROMPT_TOKENS")
+    # Time a request may take before answering with products only (widget /agent/ask, chat agents)
+    agent_latency_budget_ms: float = Field(default=4000, alias="AGENT_LATENCY_BUDGET_MS")
+    assistant_latency_budget_ms: float = Field(default=15000, alias="ASSISTANT_LATENCY_BUDGET_MS")
+
+    # Listing crawls (crawl_website)
+    crawl_max_products: int = Field(default=5000, alias="CRAWL_MAX_PRODUCTS")
+    crawl_max_listing_pages: int = Field(default=50, alias="CRAWL_MAX_LISTING_PAGES")
+    crawl_concurrency: int = Field(default=4, alias="CRAWL_CONCURRENCY")
+    crawl_max_page_bytes: int = Field(default=5 * 1024 * 1024, alias="CRAWL_MAX_PAGE_BYTES")
+    # HTML parsing processes for crawls (unset: one per core, max 4; 0: parse in a thread)
+    parse_workers: Optional[int] = Field(default=None, alias="PARSE_WORKERS")
+    # Raw crawled responses (zstd WARC-style segments) for scripts/reextract.py; empty disables
+    crawl_archive_dir: str = Field(default=".crawl_archive", alias="CRAWL_ARCHIVE_DIR")
+    # Archived crawls kept per domain (older ones are deleted when a new crawl starts)
+    crawl_archive_keep_crawls: int = Field(default=3, alias="CRAWL_ARCHIVE_KEEP_CRAWLS")
+    # How webhooks and the daily recrawl start crawls: "queue", "inline" or "http" (POST to CRAWL_SERVICE_URL)
+    crawl_transport: str = Field(default="queue", alias="CRAWL_TRANSPORT")
+    crawl_queue_workers: int = Field(default=2, alias="CRAWL_QUEUE_WORKERS")
+    crawl_service_url: str = Field(default="", alias="CRAWL_SERVICE_URL")
+
+    # Analytics
+    query_log_dir: str = Field(default=".query_logs", alias="QUERY_LOG_DIR")
+
+    # Backends: "supabase" or "sqlite" (local table store on DATABASE_URL);
+    # "live" or "fake" (deterministic offline LLM and embeddings) for load tests
+    database_backend: str = Field(default="supabase", alias="DATABASE_BACKEND")
+    llm_backend: str = Field(default="live", alias="LLM_BACKEND")
+    fake_llm_latency_ms: float = Field(default=0.0, alias="FAKE_LLM_LATENCY_MS")
+    fake_embedding_latency_ms: float = Field(default=0.0, alias="FAKE_EMBEDDING_LATENCY_MS")
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,414 @@
+"""
+Archive of crawled responses, so improved extraction can be re-run over past
+crawls (scripts/reextract.py) without fetching the sites again.
+
+Every crawl (crawl_website, crawl_and_extract, crawl_site) runs inside
+archive_crawl(), which gives it a crawl id; fetches outside a crawl aren't
+archived. Layout, one directory per site:
+
+    <crawl_archive_dir>/<domain>/<crawl_id>.index.jsonl     url -> segment, offset, length; then an end line
+    <crawl_archive_dir>/<domain>/<crawl_id>-<n>.warc.zst    WARC-style response records
+
+Crawl ids start with their UTC start time, so they sort in crawl order.
+Re-extraction reads only a domain's most recent crawl: a page that has since
+gone (404, or no longer linked) isn't brought back from an older capture. Only
+the newest CRAWL_ARCHIVE_KEEP_CRAWLS crawls of a domain are kept.
+
+Every record is its own zstd frame (like per-record gzip in .warc.gz), so a
+record can be read from its offset without decompressing the segment. Bodies
+are stored decoded, as UTF-8 for text. Compression and writes happen on a
+background thread fed by a bounded queue; when the queue is full, records are
+dropped rather than slowing the crawl. When the crawl ends its index gets an
+end line, {"end": true, "dropped": <records dropped>}: a crawl without one (still
+running, or the process died) or with drops is incomplete, and re-extraction
+won't mark products missing from it. An empty CRAWL_ARCHIVE_DIR turns
+archiving off.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from src.config.settings import get_settings
+from src.services.metrics import crawl_archive_records
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAX_BYTES = 256 * 1024 * 1024
+COMPRESSION_LEVEL = 3
+INDEX_SUFFIX = ".index.jsonl"
+SEGMENT_SUFFIX = ".warc.zst"
+DEFAULT_KEEP_CRAWLS = 3
+# Records waiting for the writer thread (bodies are up to CRAWL_MAX_PAGE_BYTES each)
+QUEUE_MAX_RECORDS = 200
+# Transfer headers that no longer describe the stored (decoded) body
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie'}
+
+_SAFE_DOMAIN = re.compile(r"[^a-z0-9.-]+")
+
+
+@dataclass
+class ArchivedResponse:
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    fetched_at: str
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get('content-type', '')
+
+    @property
+    def text(self) -> str:
+        return self.body.decode('utf-8', errors='replace')
+
+
+def domain_key(url: str) -> str:
+    """Archive directory name of a URL's site (its host, filesystem-safe)"""
+    from urllib.parse import urlparse
+
+    return _SAFE_DOMAIN.sub('_', urlparse(url).netloc.lower()) or '_'
+
+
+def encode_record(url: str, status: int, headers: Dict[str, str], body: bytes, fetched_at: str) -> bytes:
+    """A WARC/1.1 response record (HTTP status line and headers, then the body)"""
+    http_lines = [f"HTTP/1.1 {status}"]
+    http_lines += [f"{k}: {v}" for k, v in headers.items() if k.lower() not in DROPPED_HEADERS]
+    http_block = ("\r\n".join(http_lines) + "\r\n\r\n").encode('utf-8') + body
+    warc_headers = "\r\n".join([
+        "WARC/1.1",
+        "WARC-Type: response",
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+        f"WARC-Date: {fetched_at}",
+        f"WARC-Target-URI: {url}",
+        "Content-Type: application/http; msgtype=response",
+        f"Content-Length: {len(http_block)}",
+    ])
+    return warc_headers.encode('utf-8') + b"\r\n\r\n" + http_block + b"\r\n\r\n"
+
+
+def decode_record(data: bytes) -> ArchivedResponse:
+    warc_head, _, rest = data.partition(b"\r\n\r\n")
+    warc = dict(line.split(": ", 1) for line in warc_head.decode('utf-8').split("\r\n")[1:])
+    block = rest[:int(warc['Content-Length'])]
+    http_head, _, body = block.partition(b"\r\n\r\n")
+    status_line, *header_lines = http_head.decode('utf-8').split("\r\n")
+    headers = {}
+    for line in header_lines:
+        key, _, value = line.partition(": ")
+        headers[key.lower()] = value
+    return ArchivedResponse(
+        url=warc['WARC-Target-URI'],
+        status=int(status_line.split()[1]),
+        headers=headers,
+        body=body,
+        fetched_at=warc['WARC-Date'],
+    )
+
+
+class CrawlArchive:
+    """Writes response records from a background thread; one open segment and index per crawl and domain"""
+
+    def __init__(self, root: str, keep_crawls: int = DEFAULT_KEEP_CRAWLS):
+        self.root = root
+        self.keep_crawls = max(1, keep_crawls)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=QUEUE_MAX_RECORDS)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        # (directory, crawl_id) -> open files of that crawl
+        self._crawls: Dict[Tuple[str, str], _CrawlFiles] = {}
+        # (directory, crawl_id) -> records dropped because the queue was full
+        self._dropped: Dict[Tuple[str, str], int] = {}
+        self._dropped_lock = threading.Lock()
+        self._compressor = None
+
+    def _compress(self, data: bytes) -> bytes:
+        if self._compressor is None:
+            import zstandard
+            self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+        return self._compressor.compress(data)
+
+    # -- called from crawls --
+
+    def submit(self, crawl_id: str, url: str, status: int, headers: Dict[str, str], body: Union[bytes, str]):
+        """Queue a record for the writer thread; dropped (and counted in the crawl's end line) if it is QUEUE_MAX_RECORDS behind"""
+        self._start()
+        fetched_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        try:
+            self._queue.put_nowait(('record', crawl_id, url, status, headers, body, fetched_at))
+        except queue.Full:
+            crawl_archive_records.inc(result="dropped")
+            key = (os.path.join(self.root, domain_key(url)), crawl_id)
+            with self._dropped_lock:
+                self._dropped[key] = self._dropped.get(key, 0) + 1
+
+    def end_crawl(self, crawl_id: str):
+        """The crawl is over: close its files once its queued records are written"""
+        if self._thread is not None:
+            self._queue.put(('end', crawl_id))
+
+    def flush(self):
+        """Wait until every queued record is written"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        with self._thread_lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+        for files in self._crawls.values():
+            files.close()
+        self._crawls.clear()
+
+    # -- writer thread --
+
+    def _start(self):
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="crawl-archive", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if item[0] == 'end':
+                    self._end(item[1])
+                else:
+                    self.record(*item[1:])
+                    crawl_archive_records.inc(result="written")
+            except Exception as e:
+                crawl_archive_records.inc(result="failed")
+                logger.warning("Archiving failed: %s", e)
+            finally:
+                self._queue.task_done()
+
+    def _end(self, crawl_id: str):
+        with self._dropped_lock:
+            dropped = {key: n for key, n in self._dropped.items() if key[1] == crawl_id}
+            for key in dropped:
+                del self._dropped[key]
+        for key in {key for key in self._crawls if key[1] == crawl_id} | set(dropped):
+            files = self._files(*key)
+            files.append_index({'end': True, 'dropped': dropped.get(key, 0)})
+            self._crawls.pop(key).close()
+
+    def _files(self, directory: str, crawl_id: str) -> "_CrawlFiles":
+        files = self._crawls.get((directory, crawl_id))
+        if files is None:
+            os.makedirs(directory, exist_ok=True)
+            files = self._crawls[(directory, crawl_id)] = _CrawlFiles(directory, crawl_id)
+            # A new crawl of this domain: drop the ones past retention
+            prune(directory, self.keep_crawls)
+        return files
+
+    def record(self, crawl_id: str, url: str, status: int, headers: Dict[str, str], body: Union[bytes, str],
+               fetched_at: str):
+        """Write one record (on the writer thread)"""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+            headers = {**headers, 'content-type': _utf8_content_type(headers.get('content-type', ''))}
+        frame = self._compress(encode_record(url, status, headers, body, fetched_at))
+        files = self._files(os.path.join(self.root, domain_key(url)), crawl_id)
+        segment, offset = files.append_record(frame)
+        files.append_index({
+            'url': url, 'segment': segment, 'offset': offset, 'length': len(frame),
+            'status': status, 'content_type': headers.get('content-type', ''), 'fetched_at': fetched_at,
+            'crawl': crawl_id,
+        })
+
+
+class _CrawlFiles:
+    """The index and current segment of one crawl in one domain directory, kept open while it runs"""
+
+    def __init__(self, directory: str, crawl_id: str):
+        self.directory = directory
+        self.crawl_id = crawl_id
+        # The index comes first: prune() keeps the files of every crawl that has one
+        self.index = open(os.path.join(directory, crawl_id + INDEX_SUFFIX), 'a')
+        self.segments = 0
+        self.segment = None
+        self.segment_name = None
+
+    def append_record(self, frame: bytes) -> Tuple[str, int]:
+        if self.segment is None or self.segment.tell() >= SEGMENT_MAX_BYTES:
+            if self.segment is not None:
+                self.segment.close()
+            self.segments += 1
+            self.segment_name = f"{self.crawl_id}-{self.segments}{SEGMENT_SUFFIX}"
+            self.segment = open(os.path.join(self.directory, self.segment_name), 'ab')
+        offset = self.segment.tell()
+        self.segment.write(frame)
+        self.segment.flush()
+        return self.segment_name, offset
+
+    def append_index(self, entry: dict):
+        # Flushed after the record, so an index line always points at written bytes
+        self.index.write(json.dumps(entry) + "\n")
+        self.index.flush()
+
+    def close(self):
+        self.index.close()
+        if self.segment is not None:
+            self.segment.close()
+
+
+def prune(directory: str, keep: int):
+    """Delete the files of all but the newest `keep` crawls in a domain directory"""
+    crawls = crawl_ids(directory)
+    kept = set(crawls[-keep:])
+    for name in os.listdir(directory):
+        if name.endswith(INDEX_SUFFIX):
+            remove = name[:-len(INDEX_SUFFIX)] not in kept
+        elif name.endswith(SEGMENT_SUFFIX):
+            # Segments of a crawl whose index is gone are removed too
+            remove = not any(name.startswith(crawl_id + '-') for crawl_id in kept)
+        else:
+            continue
+        if remove:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError as e:
+                logger.warning("Pruning %s failed: %s", name, e)
+
+
+def _utf8_content_type(content_type: str) -> str:
+    media_type = content_type.split(';', 1)[0].strip()
+    return f"{media_type}; charset=utf-8" if media_type else ''
+
+
+_archive: Optional[CrawlArchive] = None
+_archive_lock = threading.Lock()
+_crawl_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("archive_crawl_id", default=None)
+
+
+def get_archive() -> Optional[CrawlArchive]:
+    """Process-wide archive, or None when CRAWL_ARCHIVE_DIR is empty"""
+    global _archive
+    settings = get_settings()
+    if not settings.crawl_archive_dir:
+        return None
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = CrawlArchive(settings.crawl_archive_dir, settings.crawl_archive_keep_crawls)
+                # Scripts and benchmarks exit without the app's shutdown hook
+                atexit.register(shutdown_archive)
+    return _archive
+
+
+def shutdown_archive():
+    """Write what is queued and close the archive"""
+    global _archive
+    with _archive_lock:
+        archive, _archive = _archive, None
+    if archive is not None:
+        archive.close()
+
+
+def new_crawl_id() -> str:
+    return f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+
+
+@contextmanager
+def archive_crawl():
+    """Archive the responses fetched inside this block (tasks and threads started in it included) as one crawl"""
+    crawl_id = new_crawl_id()
+    token = _crawl_id.set(crawl_id)
+    try:
+        yield crawl_id
+    finally:
+        _crawl_id.reset(token)
+        archive = get_archive()
+        if archive is not None:
+            archive.end_crawl(crawl_id)
+
+
+def archive_response(url: str, status: int, headers, body: Union[bytes, str]):
+    """Queue a fetched response for the archive; never lets archiving break or slow a crawl"""
+    crawl_id = _crawl_id.get()
+    if crawl_id is None:
+        return
+    archive = get_archive()
+    if archive is None:
+        return
+    try:
+        archive.submit(crawl_id, url, status, {k.lower(): v for k, v in dict(headers).items()}, body)
+    except Exception as e:
+        logger.warning("Archiving %s failed: %s", url, e)
+
+
+# ===== READING =====
+
+def archived_domains(root: str) -> List[str]:
+    if not os.path.isdir(root):
+        return []
+    return sorted(d for d in os.listdir(root) if crawl_ids(os.path.join(root, d)))
+
+
+def crawl_ids(directory: str) -> List[str]:
+    """Archived crawls of a domain directory, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[:-len(INDEX_SUFFIX)] for name in os.listdir(directory) if name.endswith(INDEX_SUFFIX))
+
+
+def _read_index(path: str) -> Iterator[dict]:
+    with open(path) as index:
+        for line in index:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A line cut short by a crash mid-append
+                continue
+
+
+def latest_crawl(directory: str) -> Tuple[List[dict], Optional[dict]]:
+    """
+    (index entries, end line) of a domain's most recent crawl: the last capture
+    of each URL in it, and None for the end line if the crawl never finished
+    """
+    crawls = crawl_ids(directory)
+    if not crawls:
+        return [], None
+    latest: Dict[str, dict] = {}
+    end = None
+    for entry in _read_index(os.path.join(directory, crawls[-1] + INDEX_SUFFIX)):
+        if entry.get('end'):
+            end = entry
+        elif 'url' in entry:
+            latest[entry['url']] = entry
+    return list(latest.values()), end
+
+
+def latest_entries(directory: str) -> List[dict]:
+    return latest_crawl(directory)[0]
+
+
+def read_entry(directory: str, entry: dict) -> ArchivedResponse:
+    import zstandard
+
+    with open(os.path.join(directory, entry['segment']), 'rb') as segment:
+        segment.seek(entry['offset'])
+        frame = segment.read(entry['length'])
+    return decode_record(zstandard.ZstdDecompressor().decompress(frame))
+
+
+def iter_domain(directory: str) -> Iterator[ArchivedResponse]:
+    for entry in latest_entries(directory):
+        yield read_entry(directory, entry)
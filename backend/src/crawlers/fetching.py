@@ -0,0 +1,194 @@
+"""
+Streaming HTML fetches for the crawlers.
+
+Pages are read as a stream and checked before and while the body arrives:
+non-HTML Content-Types and Content-Lengths over the cap are rejected from the
+headers alone, bodies stop downloading once they pass CRAWL_MAX_PAGE_BYTES, and a
+first chunk that looks binary (images, PDFs, archives served as text/html or
+without a Content-Type) aborts the download. The body is decoded incrementally
+(charset from the Content-Type, else a <meta charset> near the top, else UTF-8),
+so a crawl that runs into large media never holds more than the cap in memory.
+Pages that pass are archived (archive.py) for later re-extraction.
+
+fetch_html() is for the async crawlers (httpx); fetch_html_sync() for crawl_site (requests).
+"""
+import codecs
+import logging
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from src.config.settings import get_settings
+from src.crawlers.archive import archive_response
+from src.crawlers.seeding import USER_AGENT
+from src.middleware.timing import span
+from src.services.metrics import crawl_fetch_aborts
+
+logger = logging.getLogger(__name__)
+
+FETCH_TIMEOUT = 10
+CHUNK_SIZE = 64 * 1024
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+# Enough of the document to find a <meta charset> in
+SNIFF_BYTES = 2048
+
+BINARY_SIGNATURES = (
+    b'\x89PNG', b'\xff\xd8\xff', b'GIF8', b'%PDF', b'PK\x03\x04', b'\x1f\x8b', b'RIFF', b'BM',
+    b'\x00\x00\x00', b'ID3', b'OggS', b'fLaC', b'wOFF', b'wOF2', b'7z\xbc\xaf', b'Rar!',
+)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.I)
+_CHARSET_PARAM = re.compile(r'charset=["\']?([\w.:-]+)', re.I)
+
+
+@dataclass
+class FetchedPage:
+    url: str
+    text: str
+    headers: dict
+
+
+class FetchAborted(Exception):
+    """The response isn't an HTML page we want (reason is the metric label)"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def max_page_bytes() -> int:
+    return get_settings().crawl_max_page_bytes
+
+
+def check_headers(headers, max_bytes: int):
+    """Reject from the headers alone: non-HTML Content-Type, or a Content-Length over the cap"""
+    content_type = headers.get('content-type', '').split(';', 1)[0].strip().lower()
+    if content_type and content_type not in HTML_TYPES:
+        raise FetchAborted('content_type')
+    length = headers.get('content-length')
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise FetchAborted('too_large')
+
+
+def looks_binary(chunk: bytes) -> bool:
+    head = chunk[:512]
+    return head.startswith(BINARY_SIGNATURES) or b'\x00' in head
+
+
+def _codec(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.decode('ascii') if isinstance(name, bytes) else name).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+
+class BodyReader:
+    """Collects a streamed body: size cap, binary sniffing on the first bytes, incremental decoding"""
+
+    def __init__(self, headers, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        match = _CHARSET_PARAM.search(headers.get('content-type', ''))
+        self._charset = _codec(match.group(1)) if match else None
+        self._decoder = None
+        self._pending = b''
+        self._parts = []
+
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise FetchAborted('too_large')
+        if self._decoder is None:
+            # Hold back the first bytes until the encoding can be decided
+            self._pending += chunk
+            if len(self._pending) < SNIFF_BYTES:
+                return
+            chunk, self._pending = self._pending, b''
+            self._start(chunk)
+        self._parts.append(self._decoder.decode(chunk))
+
+    def _start(self, head: bytes):
+        charset = self._charset
+        # UTF-16/32 text is full of NUL bytes (codecs.lookup() names: utf-16, utf-16-le, utf-32-be, ...)
+        if not (charset or '').startswith(('utf-16', 'utf-32')) and looks_binary(head):
+            raise FetchAborted('binary')
+        if charset is None:
+            match = _META_CHARSET.search(head[:SNIFF_BYTES])
+            charset = _codec(match.group(1)) if match else None
+        self._decoder = codecs.getincrementaldecoder(charset or 'utf-8')(errors='replace')
+
+    def text(self) -> str:
+        if self._decoder is None:
+            head, self._pending = self._pending, b''
+            self._start(head)
+            self._parts.append(self._decoder.decode(head))
+        self._parts.append(self._decoder.decode(b'', final=True))
+        return ''.join(self._parts)
+
+
+def _lower(headers) -> dict:
+    return {k.lower(): v for k, v in headers.items()}
+
+
+def _aborted(url: str, reason: str):
+    crawl_fetch_aborts.inc(reason=reason)
+    logger.debug("Fetch of %s aborted: %s", url, reason)
+
+
+async def fetch_html(url: str, client=None, max_bytes: Optional[int] = None,
+                     timeout: float = FETCH_TIMEOUT) -> Optional[FetchedPage]:
+    """An HTML page via a streamed GET; None on errors, non-200s and aborted (non-HTML/oversized) responses"""
+    if client is None:
+        from src.integrations.clients import get_http_client
+        client = get_http_client()
+    max_bytes = max_bytes or max_page_bytes()
+
+    try:
+        with span("fetch"):
+            async with client.stream("GET", url, timeout=timeout, headers={"User-Agent": USER_AGENT}) as response:
+                if response.status_code != 200:
+                    logger.debug("Fetch of %s returned %s", url, response.status_code)
+                    return None
+                check_headers(response.headers, max_bytes)
+                body = BodyReader(response.headers, max_bytes)
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    body.feed(chunk)
+                page = FetchedPage(url=str(response.url), text=body.text(), headers=_lower(response.headers))
+                archive_response(page.url, response.status_code, page.headers, page.text)
+                return page
+    except FetchAborted as e:
+        _aborted(url, e.reason)
+    except Exception as e:
+        logger.debug("Fetch failed for %s: %s", url, e)
+    return None
+
+
+def fetch_html_sync(url: str, session=None, max_bytes: Optional[int] = None,
+                    timeout: float = FETCH_TIMEOUT) -> Optional[FetchedPage]:
+    """fetch_html() for synchronous crawlers (requests)"""
+    import requests
+
+    http = session or requests
+    max_bytes = max_bytes or max_page_bytes()
+
+    try:
+        with span("fetch"):
+            with http.get(url, timeout=timeout, headers={"User-Agent": USER_AGENT}, stream=True) as response:
+                if response.status_code != 200:
+                    logger.debug("Fetch of %s returned %s", url, response.status_code)
+                    return None
+                check_headers(response.headers, max_bytes)
+                body = BodyReader(response.headers, max_bytes)
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    body.feed(chunk)
+                page = FetchedPage(url=response.url, text=body.text(), headers=_lower(response.headers))
+                archive_response(page.url, response.status_code, page.headers, page.text)
+                return page
+    except FetchAborted as e:
+        _aborted(url, e.reason)
+    except Exception as e:
+        logger.debug("Fetch failed for %s: %s", url, e)
+    return None
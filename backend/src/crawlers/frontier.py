@@ -0,0 +1,195 @@
+"""
+Best-first crawl frontier for product crawls.
+
+URLs are scored before they are queued: product pages (/products/<handle>, or a
+path shape that yielded products on an earlier crawl of the same domain) first,
+then listing pages, then links found on product pages, then everything else.
+Links that can't be product pages (images, PDFs, cart/account pages) are dropped
+before fetching, and faceted-filter and tracking query parameters are stripped
+so the permutations of one listing collapse into one URL.
+
+Path shapes that yielded products are remembered per domain in the
+crawl_patterns table (domain, patterns, updated_at), so recrawls from any
+worker, and after restarts, spend max_pages on product pages.
+"""
+import heapq
+import logging
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urldefrag, urlencode, urlparse, urlunparse
+
+from src.crawlers.seeding import RobotsRules, is_product_url
+from src.database.supabase_client import get_supabase_client
+from src.middleware.timing import span
+from src.services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_SCORE = 100
+LEARNED_SCORE = 90
+LISTING_SCORE = 50
+PRODUCT_PARENT_BONUS = 20
+DEFAULT_SCORE = 10
+
+SKIP_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.svg', '.ico', '.bmp', '.tif', '.tiff',
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.csv',
+    '.zip', '.gz', '.tar', '.rar', '.7z', '.dmg', '.exe',
+    '.mp3', '.mp4', '.m4a', '.mov', '.avi', '.webm', '.wav', '.ogg',
+    '.css', '.js', '.json', '.xml', '.rss', '.atom', '.txt', '.woff', '.woff2', '.ttf', '.eot',
+}
+SKIP_PATH = re.compile(
+    r"/(?:cart|checkout|checkouts|account|accounts|login|logout|register|signin|sign-in|password|"
+    r"wishlist|compare|search|orders|my-account|wp-admin|wp-login\.php|cdn-cgi)(?:/|$)",
+    re.I,
+)
+LISTING_PATH = re.compile(r"/(?:collections?|categor(?:y|ies)|shop|catalog|product-category|store)(?:/|$)", re.I)
+
+# Query parameters that only filter, sort or track: dropped so facet permutations share one URL
+FACET_PARAMS = {
+    'sort', 'sort_by', 'order', 'orderby', 'dir', 'view', 'grid', 'limit', 'per_page', 'q', 'variant',
+    'color', 'colour', 'size', 'min_price', 'max_price', 'price', 'ref', 'fbclid', 'gclid', 'srsltid',
+}
+FACET_PREFIXES = ('filter', 'utm_', 'pf_', 'attribute_')
+
+PATTERN_TTL_SECONDS = 30 * 24 * 3600
+MAX_PATTERNS = 10
+# domain -> {path pattern: products found}; a per-process read-through cache of crawl_patterns
+PATTERN_CACHE_SECONDS = 10 * 60
+_patterns = TTLCache(ttl_seconds=PATTERN_CACHE_SECONDS, max_entries=5000)
+
+
+def canonical_url(url: str) -> str:
+    """URL without fragment and facet/tracking parameters, remaining parameters sorted"""
+    url, _fragment = urldefrag(url)
+    parsed = urlparse(url)
+    params = [
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in FACET_PARAMS and not key.lower().startswith(FACET_PREFIXES)
+    ]
+    return urlunparse(parsed._replace(query=urlencode(sorted(params))))
+
+
+def should_skip(url: str) -> bool:
+    """Links that are never product pages: media and documents, cart/account/search pages"""
+    path = urlparse(url).path
+    extension = path[path.rfind('.'):].lower() if '.' in path.rsplit('/', 1)[-1] else ''
+    return extension in SKIP_EXTENSIONS or bool(SKIP_PATH.search(path))
+
+
+def path_pattern(url: str) -> str:
+    """Shape of a product URL's path: the last segment and numeric segments become *"""
+    segments = urlparse(url).path.rstrip('/').split('/')
+    shape = ['*' if segment.isdigit() else segment for segment in segments[:-1]] + ['*']
+    return '/'.join(shape)
+
+
+def _pattern_regex(pattern: str) -> re.Pattern:
+    return re.compile('^' + '[^/]+'.join(re.escape(part) for part in pattern.split('*')) + '/?$')
+
+
+def _load_patterns(domain: str) -> Dict[str, int]:
+    """Stored patterns of a domain, unless older than PATTERN_TTL_SECONDS"""
+    supabase = get_supabase_client()
+    since = (datetime.now(timezone.utc) - timedelta(seconds=PATTERN_TTL_SECONDS)).isoformat()
+    with span("db"):
+        result = supabase.table('crawl_patterns').select('patterns').eq('domain', domain) \
+            .gte('updated_at', since).execute()
+    return dict(result.data[0]['patterns'] or {}) if result.data else {}
+
+
+def learned_patterns(domain: str) -> Dict[str, int]:
+    """Path patterns that yielded products on earlier crawls of the domain (blocking: a database read on a cache miss)"""
+    patterns = _patterns.get(domain)
+    if patterns is None:
+        try:
+            patterns = _load_patterns(domain)
+        except Exception as e:
+            # Crawl without them rather than fail; not cached, so the next crawl reads again
+            logger.warning("Loading crawl patterns failed: %s", e, extra={"domain": domain})
+            return {}
+        _patterns.set(domain, patterns)
+    return dict(patterns)
+
+
+def learn_patterns(domain: str, product_urls: List[str]):
+    """Remember the path shapes of this crawl's product pages for the next crawl of the domain (blocking)"""
+    counts = Counter(learned_patterns(domain))
+    # A shape without a literal segment ("/*") would match every page of the site
+    counts.update(p for p in map(path_pattern, product_urls) if p.strip('/*'))
+    if not counts:
+        return
+    patterns = dict(counts.most_common(MAX_PATTERNS))
+    _patterns.set(domain, patterns)
+    try:
+        with span("db"):
+            get_supabase_client().table('crawl_patterns').upsert({
+                'domain': domain,
+                'patterns': patterns,
+                'updated_at': datetime.now(timezone.utc).isoformat(),
+            }).execute()
+    except Exception as e:
+        logger.warning("Saving crawl patterns failed: %s", e, extra={"domain": domain})
+
+
+class Frontier:
+    """Priority queue of URLs to crawl on one domain; pop() returns the best-scoring URL"""
+
+    def __init__(self, start_url: str, robots: Optional[RobotsRules] = None, patterns: Optional[Dict[str, int]] = None):
+        self.domain = urlparse(start_url).netloc
+        self.robots = robots or RobotsRules()
+        if patterns is None:
+            patterns = learned_patterns(self.domain)
+        self.patterns = [_pattern_regex(p) for p in patterns]
+        self._heap: List[Tuple[int, int, str, int]] = []
+        self._seen: set = set()
+        self._count = 0
+        self.skipped = 0
+        # Queued URLs that look like product pages (product path or a learned pattern)
+        self.product_urls: set = set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def matches_learned(self, url: str) -> bool:
+        path = urlparse(url).path
+        return any(pattern.match(path) for pattern in self.patterns)
+
+    def score(self, url: str, depth: int, from_product: bool) -> int:
+        path = urlparse(url).path
+        if is_product_url(url):
+            score = PRODUCT_SCORE
+        elif self.matches_learned(url):
+            score = LEARNED_SCORE
+        elif LISTING_PATH.search(path):
+            score = LISTING_SCORE
+        else:
+            score = DEFAULT_SCORE
+        # Related products and breadcrumbs on a product page are usually more products
+        if from_product:
+            score += PRODUCT_PARENT_BONUS
+        return score - depth
+
+    def push(self, url: str, depth: int = 0, from_product: bool = False, score: Optional[int] = None) -> bool:
+        """Queue a URL unless it was seen before, is off-domain, disallowed or never a product page"""
+        url = canonical_url(url)
+        if url in self._seen:
+            return False
+        self._seen.add(url)
+        if urlparse(url).netloc != self.domain or should_skip(url) or not self.robots.allowed(url):
+            self.skipped += 1
+            return False
+        if score is None:
+            score = self.score(url, depth, from_product)
+        if is_product_url(url) or self.matches_learned(url):
+            self.product_urls.add(url)
+        self._count += 1
+        heapq.heappush(self._heap, (-score, self._count, url, depth))
+        return True
+
+    def pop(self) -> Tuple[str, int]:
+        """(url, depth) of the best-scoring queued URL"""
+        _score, _count, url, depth = heapq.heappop(self._heap)
+        return url, depth
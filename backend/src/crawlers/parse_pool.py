@@ -0,0 +1,95 @@
+"""
+Process pool for CPU-bound HTML parsing during crawls.
+
+BeautifulSoup parsing and selector matching hold the GIL, so running them on the
+event loop (or in a thread) lets one big crawl stall every other request. Crawls
+keep fetching asynchronously and hand each page to run_parse(), which runs the
+parse function in a worker process. At most PARSE_QUEUE_PER_WORKER pages per
+worker are queued; further callers wait for a slot, which slows fetching down to
+the speed parsing can keep up with instead of buffering pages in memory.
+
+Functions passed to run_parse() must be module-level (picklable), take plain
+arguments (HTML text, URLs) and return plain data.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, TypeVar
+
+from src.config.settings import get_settings
+from src.middleware.timing import span
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+PARSE_QUEUE_PER_WORKER = 2
+
+_lock = threading.Lock()
+_executor: Optional[ProcessPoolExecutor] = None
+# One semaphore per event loop (benchmarks and scripts create several)
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def parse_workers() -> int:
+    """PARSE_WORKERS, or one per core (max 4) when unset; 0 parses in a thread instead"""
+    configured = get_settings().parse_workers
+    if configured is not None:
+        return max(0, configured)
+    return min(4, os.cpu_count() or 1)
+
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    workers = parse_workers()
+    if workers == 0:
+        return None
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                # spawn: forking a process that runs threads (logging, HTTP pools) isn't safe
+                _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                logger.info("Parse pool started", extra={"workers": workers})
+    return _executor
+
+
+def _slot() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _slots.get(loop)
+    if semaphore is None:
+        semaphore = _slots[loop] = asyncio.Semaphore(max(1, parse_workers()) * PARSE_QUEUE_PER_WORKER)
+    return semaphore
+
+
+async def run_parse(fn: Callable[..., T], *args) -> T:
+    """Run fn(*args) in the parse pool, waiting for a queue slot first"""
+    async with _slot():
+        with span("parse"):
+            pool = get_parse_pool()
+            if pool is None:
+                return await asyncio.to_thread(fn, *args)
+            try:
+                return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+            except BrokenProcessPool:
+                # A worker died (OOM kill, segfault in a parser): start a fresh pool and retry once
+                logger.warning("Parse pool broken, restarting it")
+                _discard(pool)
+                return await asyncio.get_running_loop().run_in_executor(get_parse_pool(), fn, *args)
+
+
+def _discard(pool: ProcessPoolExecutor):
+    global _executor
+    with _lock:
+        if _executor is pool:
+            _executor = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_parse_pool():
+    if _executor is not None:
+        _discard(_executor)
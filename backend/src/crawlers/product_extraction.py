@@ -0,0 +1,550 @@
+"""
+HTML product extraction shared by the crawl tiers: finding product cards on a
+listing page and pulling name, price, image, link and attributes out of each.
+
+The selectors learned from a site's first product cards (ExtractionTemplate)
+are stored per domain in the extraction_templates table (domain, template,
+updated_at), so parse-pool workers, other API workers and recrawls after a
+restart start from the same template instead of each learning their own.
+
+BeautifulSoup is imported where it's used so importing the API stays fast.
+"""
+import logging
+import re
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple, TYPE_CHECKING
+from urllib.parse import urljoin, urlparse
+
+from src.database.supabase_client import get_supabase_client
+from src.middleware.timing import span
+from src.services.cache import TTLCache
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# Product container selectors, ordered by likelihood
+PRODUCT_SELECTORS = [
+    # Shopify specific
+    'div.product-card, div.product-item, div.grid-product, div.grid__item',
+    # WooCommerce specific
+    'li.product, div.product',
+    # Generic e-commerce
+    'article[data-product], div[data-product-id], div[data-product]',
+    # More generic patterns
+    'div[class*="product-"], div[class*="product_"]',
+    'div[class*="item-"], div[class*="item_"]',
+]
+
+# A listing needs at least this many matching containers to count as product cards
+MIN_PRODUCT_ELEMENTS = 3
+
+# Product cards used to learn a site's extraction template, and how long it's kept
+TEMPLATE_SAMPLE_SIZE = 5
+# A field is only learned as absent from a full sample, and cards still re-check it this often
+ABSENT_REPROBE_EVERY = 10
+TEMPLATE_TTL_SECONDS = 7 * 24 * 3600
+# domain -> ExtractionTemplate; a per-process read-through cache of extraction_templates
+TEMPLATE_CACHE_SECONDS = 10 * 60
+_templates = TTLCache(ttl_seconds=TEMPLATE_CACHE_SECONDS, max_entries=2000)
+# Selectors kept in extraction_templates; uses and misses are counted per process
+TEMPLATE_FIELDS = ('container', 'name', 'price', 'description')
+
+
+def page_title(soup: "BeautifulSoup", default: str) -> str:
+    if soup.title and soup.title.string:
+        return soup.title.string.strip()
+    return default
+
+
+def find_product_elements(soup: "BeautifulSoup", preferred: Optional[str] = None) -> Tuple[list, Optional[str]]:
+    """First selector that matches enough product containers: (elements, selector)"""
+    if preferred:
+        found = soup.select(preferred)
+        if len(found) >= MIN_PRODUCT_ELEMENTS:
+            return found, preferred
+    for selector_group in PRODUCT_SELECTORS:
+        for selector in selector_group.split(', '):
+            found = soup.select(selector)
+            if len(found) >= MIN_PRODUCT_ELEMENTS:
+                return found, selector
+    return [], None
+
+
+def extract_listing(html: str, url: str, max_products: int = 50) -> Tuple[List[dict], str]:
+    """
+    Products from the product cards of a listing page
+    Returns: (list of products, page_title)
+    """
+    from bs4 import BeautifulSoup
+
+    domain = urlparse(url).netloc
+    template = stored_template(domain)
+
+    with span("parse"):
+        soup = BeautifulSoup(html, 'html.parser')
+        title = page_title(soup, url)
+        elements, matched_selector = find_product_elements(soup, template.container if template else None)
+
+    if not elements:
+        logger.info("No products found with standard selectors", extra={"url": url})
+        return [], title
+
+    if template is None or template.container != matched_selector:
+        template = learn_template(elements, matched_selector)
+        save_template(domain, template)
+
+    logger.info(
+        "Found product elements",
+        extra={"url": url, "elements": len(elements), "selector": matched_selector, "max_products": max_products}
+    )
+
+    products = []
+    for idx, element in enumerate(elements[:max_products]):
+        try:
+            with span("extract"):
+                product_data = extract_product_data(element, url, idx, template)
+            if product_data and product_data['name']:
+                products.append(product_data)
+        except Exception as e:
+            logger.debug("Error on product %d: %s", idx, e)
+            continue
+
+    # The site changed its markup: learn again on the next page
+    if template.uses >= TEMPLATE_SAMPLE_SIZE * 2 and template.misses > template.uses:
+        forget_template(domain)
+
+    logger.info("Extracted products", extra={"url": url, "products": len(products)})
+    return products, title
+
+
+def extract_category_from_name(name: str) -> Optional[str]:
+    """
+    Extract product category from name using comprehensive keyword matching
+    Works for any type of product across multiple industries
+    """
+    if not name:
+        return None
+    
+    name_lower = name.lower()
+    
+    # Comprehensive category keywords (order matters - check specific before general)
+    categories = {
+        # Clothing & Fashion
+        'Jeans': ['jean', 'denim'],
+        'Shirts & Tops': ['tee', 't-shirt', 'shirt', 'top', 'blouse', 'tank', 'polo', 'button-up', 'button-down'],
+        'Hoodies & Sweatshirts': ['hoodie', 'sweatshirt', 'sweater', 'pullover', 'crewneck'],
+        'Jackets & Coats': ['jacket', 'coat', 'puffer', 'windbreaker', 'blazer', 'parka', 'vest'],
+        'Shorts': ['short'],
+        'Pants': ['pant', 'trouser', 'jogger', 'sweatpant', 'chino', 'cargo'],
+        'Dresses & Skirts': ['dress', 'skirt', 'gown', 'maxi', 'midi'],
+        'Shoes': ['shoe', 'sneaker', 'boot', 'sandal', 'heel', 'loafer', 'slipper', 'clog'],
+        'Accessories': ['hat', 'cap', 'beanie', 'scarf', 'glove', 'belt', 'tie', 'watch', 'sunglasses', 'bag', 'backpack', 'wallet', 'purse'],
+        'Socks & Underwear': ['sock', 'underwear', 'brief', 'boxer', 'bra'],
+        
+        # Electronics & Tech
+        'Computers & Laptops': ['laptop', 'computer', 'macbook', 'pc', 'desktop', 'chromebook'],
+        'Phones & Tablets': ['phone', 'iphone', 'android', 'tablet', 'ipad', 'smartphone'],
+        'Audio': ['headphone', 'earbuds', 'airpod', 'speaker', 'soundbar', 'microphone'],
+        'Cameras': ['camera', 'lens', 'gopro', 'dslr', 'mirrorless'],
+        'Gaming': ['gaming', 'playstation', 'xbox', 'nintendo', 'console', 'controller'],
+        'Smart Home': ['smart home', 'alexa', 'echo', 'nest', 'ring', 'thermostat'],
+        'TV & Video': ['tv', 'television', 'monitor', 'display', 'projector'],
+        
+        # Home & Garden
+        'Furniture': ['chair', 'table', 'desk', 'sofa', 'couch', 'bed', 'dresser', 'shelf', 'cabinet'],
+        'Kitchen': ['pan', 'pot', 'knife', 'blender', 'mixer', 'toaster', 'cookware', 'cutlery'],
+        'Bedding': ['sheet', 'pillow', 'blanket', 'comforter', 'duvet', 'mattress'],
+        'Decor': ['lamp', 'rug', 'curtain', 'mirror', 'frame', 'vase', 'candle'],
+        'Garden & Outdoor': ['plant', 'seed', 'garden', 'lawn', 'grill', 'patio'],
+        'Tools': ['drill', 'hammer', 'saw', 'wrench', 'screwdriver', 'toolbox'],
+        
+        # Sports & Outdoors
+        'Camping & Hiking': ['tent', 'sleeping bag', 'backpack', 'hiking', 'camp'],
+        'Fitness': ['dumbbell', 'yoga', 'weight', 'treadmill', 'exercise', 'gym'],
+        'Bikes': ['bike', 'bicycle', 'cycling'],
+        'Skateboards': ['skateboard', 'deck', 'longboard'],
+        'Water Sports': ['surfboard', 'kayak', 'paddleboard', 'swim'],
+        'Team Sports': ['basketball', 'football', 'soccer', 'baseball', 'tennis'],
+        
+        # Beauty & Personal Care
+        'Skincare': ['serum', 'moisturizer', 'cleanser', 'toner', 'cream', 'lotion', 'sunscreen'],
+        'Makeup': ['lipstick', 'foundation', 'mascara', 'eyeshadow', 'blush', 'makeup'],
+        'Hair Care': ['shampoo', 'conditioner', 'hair oil', 'hair mask', 'styling'],
+        'Fragrance': ['perfume', 'cologne', 'fragrance', 'scent'],
+        'Bath & Body': ['body wash', 'soap', 'bath', 'shower'],
+        
+        # Food & Beverages
+        'Coffee & Tea': ['coffee', 'tea', 'espresso'],
+        'Snacks': ['chip', 'cookie', 'candy', 'chocolate', 'snack'],
+        'Beverages': ['juice', 'soda', 'water', 'drink'],
+        
+        # Books & Media
+        'Books': ['book', 'novel', 'textbook', 'cookbook'],
+        'Music': ['vinyl', 'cd', 'album', 'record'],
+        'Movies': ['dvd', 'blu-ray', 'movie'],
+        
+        # Toys & Games
+        'Toys': ['toy', 'doll', 'action figure', 'lego', 'puzzle'],
+        'Board Games': ['board game', 'card game', 'game'],
+        
+        # Baby & Kids
+        'Baby Gear': ['stroller', 'crib', 'car seat', 'baby carrier'],
+        'Baby Clothing': ['onesie', 'baby clothes', 'infant'],
+        
+        # Health & Wellness
+        'Supplements': ['vitamin', 'supplement', 'protein', 'probiotic'],
+        'Medical': ['thermometer', 'blood pressure', 'first aid'],
+        
+        # Pet Products
+        'Pet Supplies': ['dog', 'cat', 'pet', 'leash', 'collar', 'pet food'],
+        
+        # Office & Stationery
+        'Office Supplies': ['pen', 'pencil', 'notebook', 'paper', 'binder', 'stapler'],
+        
+        # Automotive
+        'Auto Parts': ['tire', 'battery', 'oil', 'filter', 'brake', 'spark plug'],
+        
+        # Jewelry
+        'Jewelry': ['ring', 'necklace', 'bracelet', 'earring', 'chain'],
+    }
+    
+    # Check for category matches
+    for category, keywords in categories.items():
+        for keyword in keywords:
+            if keyword in name_lower:
+                return category
+    
+    # Default category
+    return 'Other'
+
+
+def extract_colors_from_name(name: str) -> List[str]:
+    """Extract colors from product name"""
+    if not name:
+        return []
+    
+    name_lower = name.lower()
+    colors = ['black', 'white', 'red', 'blue', 'green', 'yellow', 'orange', 'purple', 'pink', 'gray', 'grey', 'brown', 'beige', 'navy', 'olive', 'burgundy', 'maroon', 'teal', 'cream', 'tan', 'vintage']
+    
+    found_colors = []
+    for color in colors:
+        if color in name_lower:
+            found_colors.append(color.capitalize())
+    
+    return list(dict.fromkeys(found_colors))  # Remove duplicates, keeping a stable order
+
+
+def extract_sizes_from_name(name: str) -> List[str]:
+    """Extract sizes from product name"""
+    if not name:
+        return []
+    
+    name_lower = name.lower()
+    sizes = ['xs', 'small', 's', 'medium', 'm', 'large', 'l', 'xl', 'xxl', '2xl', '3xl', 
+             'one size', 'os', '7', '7.5', '8', '8.5', '9', '9.5', '10', '10.5', '11', '11.5', '12']
+    
+    found_sizes = []
+    for size in sizes:
+        # Match whole words
+        if f' {size} ' in f' {name_lower} ' or name_lower.endswith(f' {size}'):
+            found_sizes.append(size.upper())
+    
+    return list(dict.fromkeys(found_sizes))
+
+
+NAME_SELECTORS = [
+    'h2.product-title',
+    'h3.product-name',
+    'h4.product__title',
+    '.product-card__title',
+    '.product-title',
+    '.product-name',
+    '[data-product-name]',
+    '[data-product-title]',
+    'a.product-link',
+    'a.product-card__link',
+    'a[href*="/products/"]',
+    '.product-card h2',
+    '.product-card h3',
+    '.product-card h4',
+    'h2', 'h3', 'h4',
+]
+
+# Name from a link's title/aria-label attribute instead of its text
+LINK_LABEL = 'a[title], a[aria-label]'
+
+PRICE_SELECTORS = [
+    '.price',
+    '[class*="price"]',
+    '.money',
+    '[data-product-price]',
+    'span[class*="Price"]',
+    'div[class*="price"]',
+]
+
+DESCRIPTION_SELECTORS = [
+    '.product-description',
+    '.description',
+    '[class*="description"]',
+    'p',
+]
+
+IMAGE_ATTRS = ['src', 'data-src', 'data-lazy-src', 'data-srcset']
+
+# Learned "selector" for a field none of a full sample of cards had (e.g. no description on the listing)
+ABSENT = ''
+
+
+@dataclass
+class ExtractionTemplate:
+    """
+    The selectors that matched on a site's first product cards. The remaining
+    cards (and recrawls of the same domain) try only these, falling back to the
+    full selector lists for a card where the learned one finds nothing.
+    """
+    container: Optional[str] = None
+    name: Optional[str] = None
+    price: Optional[str] = None
+    description: Optional[str] = None
+    uses: int = 0
+    misses: int = 0
+
+
+def find_name(element: "BeautifulSoup", selectors: List[str]) -> Tuple[Optional[str], Optional[str]]:
+    """(name, selector that produced it)"""
+    for selector in selectors:
+        name_el = element.select_one(selector)
+        if name_el:
+            if selector == LINK_LABEL:
+                potential_name = _link_label(name_el)
+            elif name_el.get('data-product-name'):
+                potential_name = name_el.get('data-product-name').strip()
+            elif name_el.get('data-product-title'):
+                potential_name = name_el.get('data-product-title').strip()
+            else:
+                potential_name = name_el.get_text().strip()
+            
+            if validate_product_name(potential_name):
+                return potential_name, selector
+    
+    if LINK_LABEL not in selectors:
+        link_el = element.select_one(LINK_LABEL)
+        if link_el and validate_product_name(_link_label(link_el)):
+            return _link_label(link_el), LINK_LABEL
+    
+    return None, None
+
+
+def _link_label(link_el) -> str:
+    return (link_el.get('title') or link_el.get('aria-label') or '').strip()
+
+
+def find_price(element: "BeautifulSoup", selectors: List[str]) -> Tuple[float, Optional[str]]:
+    for selector in selectors:
+        price_el = element.select_one(selector)
+        if price_el:
+            if price_el.get('data-product-price'):
+                price_text = price_el.get('data-product-price')
+            else:
+                price_text = price_el.get_text().strip()
+            
+            numbers = re.findall(r'\d+[.,]?\d*', price_text)
+            if numbers:
+                try:
+                    return float(numbers[0].replace(',', '.')), selector
+                except ValueError:
+                    continue
+    return 0.0, None
+
+
+def find_description(element: "BeautifulSoup", selectors: List[str]) -> Tuple[Optional[str], Optional[str]]:
+    for selector in selectors:
+        desc_el = element.select_one(selector)
+        if desc_el:
+            desc_text = desc_el.get_text().strip()
+            if len(desc_text) > 10:
+                return desc_text[:500], selector
+    return None, None
+
+
+def find_image(element: "BeautifulSoup", base_url: str) -> Optional[str]:
+    img_el = element.select_one('img')
+    if not img_el:
+        return None
+    
+    for attr in IMAGE_ATTRS:
+        img_src = img_el.get(attr)
+        if img_src:
+            if img_src.startswith('//'):
+                image_url = 'https:' + img_src
+            elif img_src.startswith('http'):
+                image_url = img_src
+            else:
+                image_url = urljoin(base_url, img_src)
+            
+            if ' ' in image_url:
+                image_url = image_url.split(' ')[0]
+            return image_url
+    return None
+
+
+def find_product_url(element: "BeautifulSoup", base_url: str) -> str:
+    link_el = element.select_one('a')
+    if link_el:
+        href = link_el.get('href')
+        if href:
+            return href if href.startswith('http') else urljoin(base_url, href)
+    return base_url
+
+
+def _find_with_template(find, element, template: Optional[ExtractionTemplate], field_name: str, selectors: List[str]):
+    learned = getattr(template, field_name) if template is not None else None
+    if learned == ABSENT:
+        if template.uses % ABSENT_REPROBE_EVERY:
+            return find(element, [])
+        # Every so often a card checks the full list, in case the sample just lacked the field
+        value, selector = find(element, selectors)
+        if selector is not None:
+            setattr(template, field_name, selector)
+        return value, selector
+    if learned is not None:
+        value, selector = find(element, [learned])
+        if selector is not None:
+            return value, selector
+        template.misses += 1
+    return find(element, selectors)
+
+
+def extract_product_data(element: "BeautifulSoup", base_url: str, idx: int,
+                         template: Optional[ExtractionTemplate] = None) -> Optional[dict]:
+    """
+    Extract structured product data from a product element
+    Returns dict with name, price, image_url, url, description, category, colors, sizes or None if invalid
+    """
+    if template is not None:
+        template.uses += 1
+    
+    name, _selector = _find_with_template(find_name, element, template, 'name', NAME_SELECTORS)
+    if not name:
+        return None
+    
+    price, _selector = _find_with_template(find_price, element, template, 'price', PRICE_SELECTORS)
+    description, _selector = _find_with_template(
+        find_description, element, template, 'description', DESCRIPTION_SELECTORS
+    )
+    
+    return {
+        'name': name,
+        'price': price,
+        'image_url': find_image(element, base_url),
+        'url': find_product_url(element, base_url),
+        'description': description or f"Product: {name}",
+        'category': extract_category_from_name(name),
+        'colors': extract_colors_from_name(name),
+        'sizes': extract_sizes_from_name(name),
+    }
+
+
+def learn_template(elements: list, container: Optional[str]) -> ExtractionTemplate:
+    """Most common matching name/price/description selector over the first few product cards"""
+    found = {'name': Counter(), 'price': Counter(), 'description': Counter()}
+    sample = elements[:TEMPLATE_SAMPLE_SIZE]
+    for element in sample:
+        for field_name, find, selectors in (
+            ('name', find_name, NAME_SELECTORS),
+            ('price', find_price, PRICE_SELECTORS),
+            ('description', find_description, DESCRIPTION_SELECTORS),
+        ):
+            _value, selector = find(element, selectors)
+            if selector is not None:
+                found[field_name][selector] += 1
+    
+    template = ExtractionTemplate(container=container)
+    # Too few cards to tell a missing field from a few cards without it: keep the full lists
+    missing = ABSENT if len(sample) >= TEMPLATE_SAMPLE_SIZE else None
+    for field_name, counts in found.items():
+        setattr(template, field_name, counts.most_common(1)[0][0] if counts else missing)
+    return template
+
+
+def _load_template(domain: str) -> Optional[ExtractionTemplate]:
+    """Stored template of a domain, unless older than TEMPLATE_TTL_SECONDS"""
+    since = (datetime.now(timezone.utc) - timedelta(seconds=TEMPLATE_TTL_SECONDS)).isoformat()
+    with span("db"):
+        result = get_supabase_client().table('extraction_templates').select('template').eq('domain', domain) \
+            .gte('updated_at', since).execute()
+    if not result.data:
+        return None
+    stored = result.data[0]['template'] or {}
+    return ExtractionTemplate(**{k: stored.get(k) for k in TEMPLATE_FIELDS})
+
+
+def stored_template(domain: str) -> Optional[ExtractionTemplate]:
+    """The domain's template (blocking: a database read on a cache miss)"""
+    template = _templates.get(domain)
+    if template is None:
+        try:
+            template = _load_template(domain)
+        except Exception as e:
+            # Learn from this page rather than fail; the learned template is cached either way
+            logger.warning("Loading extraction template failed: %s", e, extra={"domain": domain})
+            return None
+        if template is not None:
+            _templates.set(domain, template)
+    return template
+
+
+def save_template(domain: str, template: ExtractionTemplate):
+    """Cache a newly learned template and store it for other workers and later crawls (blocking)"""
+    _templates.set(domain, template)
+    fields = asdict(template)
+    try:
+        with span("db"):
+            get_supabase_client().table('extraction_templates').upsert({
+                'domain': domain,
+                'template': {k: fields[k] for k in TEMPLATE_FIELDS},
+                'updated_at': datetime.now(timezone.utc).isoformat(),
+            }).execute()
+    except Exception as e:
+        logger.warning("Saving extraction template failed: %s", e, extra={"domain": domain})
+
+
+def forget_template(domain: str):
+    """Drop a template that stopped matching, so the next page learns a new one (blocking)"""
+    _templates.invalidate(domain)
+    try:
+        with span("db"):
+            get_supabase_client().table('extraction_templates').delete().eq('domain', domain).execute()
+    except Exception as e:
+        logger.warning("Deleting extraction template failed: %s", e, extra={"domain": domain})
+
+
+def validate_product_name(name: str) -> bool:
+    """
+    Validate that a product name is legitimate
+    Returns True if valid, False otherwise
+    """
+    if not name:
+        return False
+    
+    if len(name) < 3 or len(name) > 200:
+        return False
+    
+    invalid_names = [
+        'product', 'products', 'item', 'items',
+        'shop', 'buy now', 'add to cart', 'quick view',
+        'view details', 'learn more', 'see more',
+        'sale', 'new', 'featured'
+    ]
+    
+    if name.lower() in invalid_names:
+        return False
+    
+    if not re.search(r'[a-zA-Z0-9]', name):
+        return False
+    
+    return True
@@ -0,0 +1,651 @@
+"""
+Tiered product extraction for a store URL, cheapest and most reliable source first:
+
+1. shopify_json  - Shopify storefront JSON (/products.json)
+2. woocommerce   - WooCommerce Store API (/wp-json/wc/store/v1/products)
+3. json_ld       - schema.org Product markup in the page's HTML
+4. html          - product cards in the page's HTML (CSS selectors)
+5. rendered      - the page rendered by ScrapingBee (JS rendering, slow and metered)
+
+The page itself is fetched once with a plain GET; its markup and headers decide
+which platform APIs are worth trying. Every tier follows pagination (numbered
+API pages, rel="next", ?page=N, "load more" URLs) and listing pages are fetched
+concurrently, so whole catalogs import rather than the first page. HTML
+listing pages are parsed in the parse pool (parse_pool.py), off the event loop.
+Every response is archived (archive.py) so scripts/reextract.py can rerun the
+extraction later without refetching.
+"""
+import asyncio
+import html
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse
+
+from src.config.settings import get_settings
+from src.crawlers.archive import archive_response
+from src.crawlers.fetching import FetchedPage, fetch_html
+from src.crawlers.parse_pool import run_parse
+from src.crawlers.product_extraction import (
+    extract_category_from_name,
+    extract_colors_from_name,
+    extract_listing,
+    extract_sizes_from_name,
+    validate_product_name,
+)
+from src.integrations.clients import get_http_client
+from src.middleware.timing import span
+from src.services.metrics import crawl_extractions
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "LocalBusinessBot/1.0"
+FETCH_TIMEOUT = 10
+RENDER_TIMEOUT = 90
+SHOPIFY_PAGE_SIZE = 250
+WOOCOMMERCE_PAGE_SIZE = 100
+WOOCOMMERCE_ENDPOINTS = ['/wp-json/wc/store/v1/products', '/wp-json/wc/store/products']
+MAX_CARDS_PER_PAGE = 500
+
+_JSON_LD = re.compile(r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.S | re.I)
+_TITLE = re.compile(r'<title[^>]*>(.*?)</title>', re.S | re.I)
+_TAGS = re.compile(r'<[^>]+>')
+_COLLECTION = re.compile(r'^/collections/([^/]+)')
+_LINK_TAG = re.compile(r'<(?:a|link|button)\b[^>]*>', re.I)
+_LINK_URL = re.compile(r'\b(?:href|data-url|data-next-url|data-href)=["\']([^"\']+)["\']', re.I)
+_REL_NEXT = re.compile(r'\brel=["\'][^"\']*\bnext\b', re.I)
+_PAGE_PARAM = re.compile(r'[?&](?:page|paged|pg|p)=\d+', re.I)
+_PAGE_PATH = re.compile(r'/page/\d+/?$', re.I)
+
+
+@dataclass
+class ExtractionResult:
+    products: List[dict] = field(default_factory=list)
+    page_title: Optional[str] = None
+    # Tier that produced the products (None when every tier came up empty)
+    source: Optional[str] = None
+    attempts: List[str] = field(default_factory=list)
+    pages: int = 0
+    product_count: int = 0
+    # The product or page cap cut the crawl short, so the catalog may be incomplete
+    truncated: bool = False
+    # Listing pages or API pages that didn't load (timeout, 429, 5xx); their products weren't seen
+    failed_pages: int = 0
+
+    @property
+    def complete(self) -> bool:
+        """Every listing page loaded and no cap was hit: products not seen have left the site"""
+        return not self.truncated and self.failed_pages == 0
+
+
+def origin_of(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def strip_html(text: Optional[str]) -> str:
+    if not text:
+        return ""
+    return re.sub(r'\s+', ' ', html.unescape(_TAGS.sub(' ', text))).strip()
+
+
+def title_from_html(text: str) -> Optional[str]:
+    match = _TITLE.search(text)
+    if not match:
+        return None
+    return strip_html(match.group(1)) or None
+
+
+async def fetch(url: str, timeout: float = FETCH_TIMEOUT, **kwargs):
+    """GET through the shared client; None on network errors or non-200 responses"""
+    try:
+        with span("fetch"):
+            response = await get_http_client().get(url, timeout=timeout, headers={"User-Agent": USER_AGENT}, **kwargs)
+    except Exception as e:
+        logger.debug("Fetch failed for %s: %s", url, e)
+        return None
+    if response.status_code != 200:
+        logger.debug("Fetch of %s returned %s", url, response.status_code)
+        return None
+    archive_response(str(response.url), response.status_code, response.headers, response.content)
+    return response
+
+
+async def fetch_json(url: str, **kwargs):
+    response = await fetch(url, **kwargs)
+    if response is None:
+        return None
+    try:
+        return response.json()
+    except ValueError:
+        # Storefronts without the API often answer with their HTML 404 page and a 200
+        return None
+
+
+def detect_platform(page: FetchedPage) -> Optional[str]:
+    headers = {k.lower(): v for k, v in page.headers.items()}
+    if 'x-shopid' in headers or 'x-shopify-stage' in headers or 'cdn.shopify.com' in page.text or 'Shopify.shop' in page.text:
+        return 'shopify'
+    lowered = page.text.lower()
+    if 'woocommerce' in lowered or '/wp-json/wc/' in lowered:
+        return 'woocommerce'
+    return None
+
+
+# ===== NORMALISERS (all tiers return the same product dict shape) =====
+
+def _product(name: str, price: float, image_url: Optional[str], url: str, description: str,
+             category: Optional[str] = None, colors: Optional[List[str]] = None,
+             sizes: Optional[List[str]] = None, in_stock: bool = True) -> dict:
+    return {
+        'name': name,
+        'price': price,
+        'image_url': image_url,
+        'url': url,
+        'description': description[:500] if description else f"Product: {name}",
+        'category': category or extract_category_from_name(name),
+        'colors': colors or extract_colors_from_name(name),
+        'sizes': sizes or extract_sizes_from_name(name),
+        'in_stock': in_stock,
+    }
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return None
+
+
+def shopify_product(data: dict, origin: str) -> Optional[dict]:
+    name = (data.get('title') or '').strip()
+    if not validate_product_name(name):
+        return None
+    variants = data.get('variants') or []
+    prices = [p for p in (_float(v.get('price')) for v in variants) if p is not None]
+    options = {(o.get('name') or '').lower(): o.get('values') or [] for o in data.get('options') or []}
+    images = data.get('images') or []
+    return _product(
+        name=name,
+        price=min(prices) if prices else 0.0,
+        image_url=images[0].get('src') if images else None,
+        url=f"{origin}/products/{data.get('handle')}" if data.get('handle') else origin,
+        description=strip_html(data.get('body_html')),
+        category=data.get('product_type') or None,
+        colors=options.get('color') or options.get('colour'),
+        sizes=options.get('size'),
+        in_stock=any(v.get('available', True) for v in variants) if variants else True,
+    )
+
+
+def shopify_product_page(data: dict, url: str) -> Optional[dict]:
+    """Products row from a Shopify product page's JSON (<product url>.json)"""
+    product_data = data.get('product') if isinstance(data, dict) else None
+    if not product_data:
+        return None
+    variants = product_data.get('variants', [])
+
+    # Dicts rather than sets keep variant order, so a recrawl of an unchanged product compares equal
+    colors = {}
+    sizes = {}
+
+    option1_name = product_data.get('options', [{}])[0].get('name', '').lower() if product_data.get('options') else ''
+    option2_name = product_data.get('options', [{}])[1].get('name', '').lower() if len(product_data.get('options', [])) > 1 else ''
+
+    for variant in variants:
+        opt1 = variant.get('option1')
+        opt2 = variant.get('option2')
+
+        if opt1:
+            if 'size' in option1_name or any(c.isdigit() for c in str(opt1)):
+                sizes[opt1] = None
+            else:
+                colors[opt1] = None
+
+        if opt2:
+            if 'size' in option2_name or any(c.isdigit() for c in str(opt2)):
+                sizes[opt2] = None
+            else:
+                colors[opt2] = None
+
+    in_stock = any(v.get('available', False) for v in variants)
+
+    price = None
+    if variants:
+        prices = [float(v['price']) for v in variants if v.get('price')]
+        price = min(prices) if prices else None
+
+    images = [img['src'] for img in product_data.get('images', [])[:3]]
+
+    return {
+        'url': url,
+        'name': product_data.get('title'),
+        'price': price,
+        'description': product_data.get('body_html', '')[:500] if product_data.get('body_html') else None,
+        'colors': list(colors),
+        'sizes': list(sizes),
+        'in_stock': in_stock,
+        'category': product_data.get('product_type'),
+        'brand': product_data.get('vendor'),
+        'images': images
+    }
+
+
+def woocommerce_product(data: dict) -> Optional[dict]:
+    name = strip_html(data.get('name'))
+    if not validate_product_name(name):
+        return None
+    prices = data.get('prices') or {}
+    minor_unit = int(prices.get('currency_minor_unit') or 0)
+    price = _float(prices.get('price')) or 0.0
+    attributes = {(a.get('name') or '').lower(): [t.get('name') for t in a.get('terms') or []] for a in data.get('attributes') or []}
+    images = data.get('images') or []
+    categories = data.get('categories') or []
+    return _product(
+        name=name,
+        price=price / (10 ** minor_unit),
+        image_url=images[0].get('src') if images else None,
+        url=data.get('permalink') or '',
+        description=strip_html(data.get('short_description') or data.get('description')),
+        category=categories[0].get('name') if categories else None,
+        colors=attributes.get('color') or attributes.get('colour'),
+        sizes=attributes.get('size'),
+        in_stock=data.get('is_in_stock', True),
+    )
+
+
+def _is_product(node: dict) -> bool:
+    types = node.get('@type')
+    types = types if isinstance(types, list) else [types]
+    return 'Product' in types
+
+
+def _walk_json_ld(data):
+    """Every schema.org Product node, including those inside @graph and ItemList wrappers"""
+    if isinstance(data, list):
+        for item in data:
+            yield from _walk_json_ld(item)
+    elif isinstance(data, dict):
+        if _is_product(data):
+            yield data
+            return
+        for value in data.values():
+            if isinstance(value, (dict, list)):
+                yield from _walk_json_ld(value)
+
+
+def json_ld_product(node: dict, page_url: str) -> Optional[dict]:
+    name = strip_html(node.get('name'))
+    if not validate_product_name(name):
+        return None
+
+    offers = node.get('offers') or {}
+    offers = offers if isinstance(offers, list) else [offers]
+    price, in_stock, offer_url = 0.0, True, None
+    for offer in offers:
+        if not isinstance(offer, dict):
+            continue
+        value = _float(offer.get('price', offer.get('lowPrice')))
+        if value is not None:
+            price = value
+            in_stock = 'OutOfStock' not in str(offer.get('availability', ''))
+            offer_url = offer.get('url')
+            break
+
+    image = node.get('image')
+    if isinstance(image, list):
+        image = image[0] if image else None
+    if isinstance(image, dict):
+        image = image.get('url')
+
+    color = node.get('color')
+    category = node.get('category')
+    return _product(
+        name=name,
+        price=price,
+        image_url=urljoin(page_url, image) if image else None,
+        url=urljoin(page_url, node.get('url') or offer_url or page_url),
+        description=strip_html(node.get('description')),
+        category=category if isinstance(category, str) else None,
+        colors=[color] if isinstance(color, str) else None,
+        in_stock=in_stock,
+    )
+
+
+# ===== PAGINATION =====
+
+def _listing_path(path: str) -> str:
+    return _PAGE_PATH.sub('', path).rstrip('/') or '/'
+
+
+def pagination_links(text: str, page_url: str) -> List[str]:
+    """
+    Other pages of the same listing linked from this one: rel="next", numbered
+    pagination (?page=N, /page/N/) and "load more" buttons carrying the next URL
+    """
+    base = urlparse(page_url)
+    listing = _listing_path(base.path)
+    links = []
+    for tag in _LINK_TAG.findall(text):
+        match = _LINK_URL.search(tag)
+        if not match:
+            continue
+        url, _fragment = urldefrag(urljoin(page_url, html.unescape(match.group(1))))
+        parsed = urlparse(url)
+        if parsed.netloc != base.netloc or _listing_path(parsed.path) != listing:
+            continue
+        if _REL_NEXT.search(tag) or _PAGE_PARAM.search('?' + parsed.query) or _PAGE_PATH.search(parsed.path):
+            links.append(url)
+    return links
+
+
+def parse_listing_page(extract: Callable[[str, str], List[dict]], text: str, url: str) -> Tuple[List[dict], List[str]]:
+    """Products and pagination links of one listing page (runs in the parse pool)"""
+    return extract(text, url), pagination_links(text, url)
+
+
+async def listing_pages(first: FetchedPage, extract: Callable[[str, str], List[dict]],
+                        fetch_text: Callable[[str], Awaitable[Optional[str]]],
+                        max_pages: int, concurrency: int) -> AsyncIterator[Tuple[str, List[dict]]]:
+    """
+    (page_url, products) for the first listing page, then for every pagination
+    page discovered along the way, fetching up to `concurrency` pages at a time;
+    products is None for a page that failed to load
+    """
+    queued = {first.url}
+    pending: List[str] = []
+
+    def discover(links: List[str]):
+        for link in links:
+            if link not in queued and len(queued) < max_pages:
+                queued.add(link)
+                pending.append(link)
+
+    async def load(url: str) -> Tuple[str, Optional[Tuple[List[dict], List[str]]]]:
+        text = await fetch_text(url)
+        if text is None:
+            return url, None
+        return url, await run_parse(parse_listing_page, extract, text, url)
+
+    products, links = await run_parse(parse_listing_page, extract, first.text, first.url)
+    discover(links)
+    yield first.url, products
+
+    in_flight = set()
+    try:
+        while pending or in_flight:
+            while pending and len(in_flight) < concurrency:
+                in_flight.add(asyncio.create_task(load(pending.pop(0))))
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                url, parsed = task.result()
+                if parsed is None:
+                    yield url, None
+                    continue
+                products, links = parsed
+                # Queue the next pages before handing products over so fetching continues meanwhile
+                discover(links)
+                yield url, products
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+async def numbered_pages(load_page: Callable[[int], Awaitable[Optional[list]]], first_items: list, page_size: int,
+                         max_pages: int, concurrency: int, total_pages: Optional[int] = None) -> AsyncIterator[Tuple[int, Optional[list]]]:
+    """
+    Pages 2..N of a paginated JSON API, `concurrency` at a time, until a short or
+    empty page; a page that failed to load (load_page gave None) is yielded as
+    None and ends the pagination, since what follows it is unknown
+    """
+    if total_pages is None and len(first_items) < page_size:
+        return
+    last = min(total_pages or max_pages, max_pages)
+    page = 2
+    while page <= last:
+        window = range(page, min(page + concurrency, last + 1))
+        for number, items in zip(window, await asyncio.gather(*(load_page(n) for n in window))):
+            if items is None:
+                yield number, None
+                return
+            if not items:
+                return
+            yield number, items
+            if len(items) < page_size:
+                return
+        page += concurrency
+
+
+# ===== TIERS (async iterators of (page_url, products)) =====
+
+async def shopify_json_pages(url: str, max_pages: int, concurrency: int) -> AsyncIterator[Tuple[str, List[dict]]]:
+    origin = origin_of(url)
+    collection = _COLLECTION.match(urlparse(url).path)
+    endpoint = f"{origin}/collections/{collection.group(1)}/products.json" if collection else f"{origin}/products.json"
+
+    async def load_page(number: int) -> Optional[list]:
+        data = await fetch_json(endpoint, params={'limit': SHOPIFY_PAGE_SIZE, 'page': number})
+        if not isinstance(data, dict) or not isinstance(data.get('products'), list):
+            return None
+        return data['products']
+
+    def products(items: list) -> List[dict]:
+        with span("extract"):
+            return [p for p in (shopify_product(item, origin) for item in items) if p]
+
+    first = await load_page(1)
+    if not first:
+        return
+    yield f"{endpoint}?page=1", products(first)
+    async for number, items in numbered_pages(load_page, first, SHOPIFY_PAGE_SIZE, max_pages, concurrency):
+        yield f"{endpoint}?page={number}", products(items) if items is not None else None
+
+
+async def woocommerce_pages(url: str, max_pages: int, concurrency: int) -> AsyncIterator[Tuple[str, List[dict]]]:
+    origin = origin_of(url)
+
+    def products(items: list) -> List[dict]:
+        with span("extract"):
+            return [p for p in (woocommerce_product(item) for item in items if isinstance(item, dict)) if p]
+
+    for path in WOOCOMMERCE_ENDPOINTS:
+        endpoint = origin + path
+        response = await fetch(endpoint, params={'per_page': WOOCOMMERCE_PAGE_SIZE, 'page': 1})
+        try:
+            first = response.json() if response is not None else None
+        except ValueError:
+            first = None
+        if not isinstance(first, list):
+            continue
+
+        async def load_page(number: int) -> Optional[list]:
+            data = await fetch_json(endpoint, params={'per_page': WOOCOMMERCE_PAGE_SIZE, 'page': number})
+            return data if isinstance(data, list) else None
+
+        total_pages = response.headers.get('x-wp-totalpages')
+        yield f"{endpoint}?page=1", products(first)
+        async for number, items in numbered_pages(
+            load_page, first, WOOCOMMERCE_PAGE_SIZE, max_pages, concurrency,
+            total_pages=int(total_pages) if total_pages and total_pages.isdigit() else None,
+        ):
+            yield f"{endpoint}?page={number}", products(items) if items is not None else None
+        return
+
+
+def json_ld_products(text: str, page_url: str) -> List[dict]:
+    products, seen = [], set()
+    with span("extract"):
+        for block in _JSON_LD.findall(text):
+            try:
+                data = json.loads(block.strip())
+            except ValueError:
+                continue
+            for node in _walk_json_ld(data):
+                product = json_ld_product(node, page_url)
+                if product and product['url'] not in seen:
+                    seen.add(product['url'])
+                    products.append(product)
+    return products
+
+
+def card_products(text: str, page_url: str) -> List[dict]:
+    products, _title = extract_listing(text, page_url, max_products=MAX_CARDS_PER_PAGE)
+    return products
+
+
+async def fetch_rendered_html(url: str) -> str:
+    """The page after JavaScript rendering, via ScrapingBee"""
+    import httpx
+
+    api_key = os.getenv('SCRAPINGBEE_API_KEY')
+    if not api_key:
+        raise Exception("SCRAPINGBEE_API_KEY not set in environment variables")
+
+    logger.info("ScrapingBee scrape started", extra={"url": url})
+    try:
+        with span("fetch"):
+            response = await get_http_client().get(
+                'https://app.scrapingbee.com/api/v1/',
+                params={
+                    'api_key': api_key,
+                    'url': url,
+                    'render_js': 'true',
+                    'wait': 3000,
+                    'premium_proxy': 'false',
+                },
+                timeout=RENDER_TIMEOUT,
+            )
+    except httpx.TimeoutException:
+        raise Exception(f"ScrapingBee request timed out after {RENDER_TIMEOUT} seconds")
+    except httpx.HTTPError as e:
+        raise Exception(f"ScrapingBee request failed: {str(e)}")
+
+    if response.status_code != 200:
+        error_msg = f"ScrapingBee returned status {response.status_code}"
+        if response.status_code == 401:
+            error_msg = "Invalid ScrapingBee API key"
+        elif response.status_code == 429:
+            error_msg = "ScrapingBee rate limit exceeded"
+        raise Exception(error_msg)
+
+    logger.info("ScrapingBee response received", extra={"url": url, "bytes": len(response.content)})
+    # Archived under the page's URL, never the API URL (it carries the API key)
+    archive_response(url, response.status_code, {'content-type': 'text/html', 'x-rendered': 'scrapingbee'}, response.text)
+    return response.text
+
+
+async def fetch_page(url: str) -> Optional[FetchedPage]:
+    return await fetch_html(url, get_http_client())
+
+
+async def _page_text(url: str) -> Optional[str]:
+    page = await fetch_page(url)
+    return page.text if page is not None else None
+
+
+async def _rendered_text(url: str) -> Optional[str]:
+    try:
+        return await fetch_rendered_html(url)
+    except Exception as e:
+        logger.warning("Rendering of listing page %s failed: %s", url, e)
+        return None
+
+
+async def rendered_pages(url: str, max_pages: int, concurrency: int) -> AsyncIterator[Tuple[str, List[dict]]]:
+    # Errors on the first page surface to the caller; later pages are skipped
+    first = FetchedPage(url=url, text=await fetch_rendered_html(url), headers={})
+    async for page in listing_pages(first, card_products, _rendered_text, max_pages, concurrency):
+        yield page
+
+
+async def stream_products(url: str, result: ExtractionResult, max_products: Optional[int] = None,
+                          max_pages: Optional[int] = None, concurrency: Optional[int] = None) -> AsyncIterator[List[dict]]:
+    """
+    Batches of new products (deduplicated by product URL) for a store/listing URL,
+    one batch per listing page as pages complete, from the first tier that finds any.
+    `result` is filled in as the crawl goes: page_title before the first batch,
+    then source, pages, failed_pages and product_count.
+    """
+    settings = get_settings()
+    max_products = max_products or settings.crawl_max_products
+    max_pages = max_pages or settings.crawl_max_listing_pages
+    concurrency = concurrency or settings.crawl_concurrency
+
+    result.page_title = result.page_title or url
+    page = await fetch_page(url)
+    platform = None
+    if page is not None:
+        platform = detect_platform(page)
+        result.page_title = title_from_html(page.text) or url
+
+    tiers: List[tuple] = []
+    # Without the page (blocked or down) both platform APIs are still worth a try
+    if platform in ('shopify', None):
+        tiers.append(('shopify_json', lambda: shopify_json_pages(url, max_pages, concurrency)))
+    if platform in ('woocommerce', None):
+        tiers.append(('woocommerce', lambda: woocommerce_pages(url, max_pages, concurrency)))
+    if page is not None:
+        tiers.append(('json_ld', lambda: listing_pages(page, json_ld_products, _page_text, max_pages, concurrency)))
+        tiers.append(('html', lambda: listing_pages(page, card_products, _page_text, max_pages, concurrency)))
+    if os.getenv('SCRAPINGBEE_API_KEY'):
+        tiers.append(('rendered', lambda: rendered_pages(url, max_pages, concurrency)))
+
+    seen = set()
+    for name, open_tier in tiers:
+        result.attempts.append(name)
+        pages = open_tier()
+        try:
+            async for page_url, products in pages:
+                if products is None:
+                    # Products on a page that didn't load look just like products that were removed
+                    result.failed_pages += 1
+                    continue
+                if result.source is None and not products:
+                    # A tier that finds nothing on its first page isn't paginated through
+                    break
+                result.source = name
+                result.pages += 1
+
+                fresh = []
+                for product in products:
+                    # Cards without their own link all carry the listing URL; tell those apart by name
+                    # (the URL is the product's key in the products table)
+                    if product['url'] == page_url:
+                        product['url'] = f"{page_url}#{product['name']}"
+                    if product['url'] not in seen:
+                        seen.add(product['url'])
+                        fresh.append(product)
+                fresh = fresh[:max_products - result.product_count]
+                result.product_count += len(fresh)
+                if fresh:
+                    yield fresh
+                if result.product_count >= max_products:
+                    result.truncated = True
+                    break
+        finally:
+            await pages.aclose()
+        if result.source is not None:
+            break
+
+    if result.pages >= max_pages:
+        result.truncated = True
+
+    crawl_extractions.inc(source=result.source or 'none')
+    logger.info(
+        "Product extraction finished",
+        extra={
+            "url": url, "platform": platform, "source": result.source, "attempts": result.attempts,
+            "pages": result.pages, "failed_pages": result.failed_pages, "products": result.product_count,
+        }
+    )
+
+
+async def extract_products(url: str, max_products: int = 50, max_pages: Optional[int] = None) -> ExtractionResult:
+    """All products for a store/listing URL collected in memory (see stream_products)"""
+    result = ExtractionResult(page_title=url)
+    async for batch in stream_products(url, result, max_products=max_products, max_pages=max_pages):
+        result.products.extend(batch)
+    return result
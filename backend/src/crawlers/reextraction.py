@@ -0,0 +1,173 @@
+"""
+Re-extraction of products and knowledge-base documents from the crawl archive.
+
+Runs the current extraction code (product_sources, parse_page) over archived
+responses (archive.py) instead of the live sites, so no request is made.
+Records are classified by URL the way the crawlers fetched them: Shopify
+product JSON (<product>.json), Shopify and WooCommerce catalog API pages, and
+HTML pages (products from JSON-LD and cards, page text as a document).
+
+Each domain's most recent crawl (latest_crawl) is split into batches that are extracted in
+worker processes, all domains at once so every core stays busy; batches are
+merged per domain and products are picked with the crawl's tier order.
+Used by scripts/reextract.py.
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from src.crawlers.archive import ArchivedResponse, archived_domains, latest_crawl, read_entry
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+# Listing tiers in the order crawl_website tries them; the first with products wins
+LISTING_TIERS = ('shopify_json', 'woocommerce', 'json_ld', 'html')
+
+
+@dataclass
+class DomainExtraction:
+    domain: str
+    records: int = 0
+    failed: int = 0
+    # Rows in crawl_and_extract's shape, from Shopify product page JSON
+    product_pages: List[dict] = field(default_factory=list)
+    # Tier -> products in product_sources' shape
+    listing: Dict[str, List[dict]] = field(default_factory=dict)
+    # (url, text) for the knowledge base
+    documents: List[Tuple[str, str]] = field(default_factory=list)
+    # The crawl finished and archived every response: only then can products it lacks be marked missing
+    crawl_complete: bool = True
+    # Records of the crawl dropped by the archive writer
+    dropped: int = 0
+
+    def merge(self, other: 'DomainExtraction'):
+        self.records += other.records
+        self.failed += other.failed
+        self.product_pages.extend(other.product_pages)
+        for tier, products in other.listing.items():
+            self.listing.setdefault(tier, []).extend(products)
+        self.documents.extend(other.documents)
+
+    def listing_products(self) -> Tuple[Optional[str], List[dict]]:
+        """(tier, products deduplicated by URL) of the first listing tier that found products"""
+        for tier in LISTING_TIERS:
+            products = self.listing.get(tier)
+            if products:
+                unique = {}
+                for product in products:
+                    unique.setdefault(product['url'], product)
+                return tier, list(unique.values())
+        return None, []
+
+
+def record_kind(record: ArchivedResponse) -> Optional[str]:
+    path = urlparse(record.url).path
+    if path.endswith('/products.json'):
+        return 'shopify_json'
+    if '/products/' in path and path.endswith('.json'):
+        return 'shopify_product'
+    if '/wp-json/wc/' in path:
+        return 'woocommerce'
+    if 'html' in record.content_type:
+        return 'page'
+    return None
+
+
+def _json(record: ArchivedResponse):
+    import json
+
+    try:
+        return json.loads(record.body)
+    except ValueError:
+        # Storefronts without the API often answer with their HTML 404 page and a 200
+        return None
+
+
+def _card_products(text: str, page_url: str) -> List[dict]:
+    from src.crawlers.product_sources import card_products
+
+    products = card_products(text, page_url)
+    for product in products:
+        # Same rule as stream_products: cards without their own link are told apart by name
+        if product['url'] == page_url:
+            product['url'] = f"{page_url}#{product['name']}"
+    return products
+
+
+def extract_record(record: ArchivedResponse, result: DomainExtraction):
+    from src.crawlers.product_sources import (
+        json_ld_products,
+        origin_of,
+        shopify_product,
+        shopify_product_page,
+        woocommerce_product,
+    )
+    from src.crawlers.web_crawler import parse_page
+
+    kind = record_kind(record)
+    if kind == 'shopify_product':
+        data = _json(record)
+        row = shopify_product_page(data, record.url[:-len('.json')]) if data else None
+        if row:
+            result.product_pages.append(row)
+    elif kind == 'shopify_json':
+        data = _json(record)
+        items = data.get('products') if isinstance(data, dict) else None
+        if isinstance(items, list):
+            origin = origin_of(record.url)
+            products = [p for p in (shopify_product(item, origin) for item in items) if p]
+            result.listing.setdefault('shopify_json', []).extend(products)
+    elif kind == 'woocommerce':
+        data = _json(record)
+        if isinstance(data, list):
+            products = [p for p in (woocommerce_product(item) for item in data if isinstance(item, dict)) if p]
+            result.listing.setdefault('woocommerce', []).extend(products)
+    elif kind == 'page':
+        text = record.text
+        result.listing.setdefault('json_ld', []).extend(json_ld_products(text, record.url))
+        result.listing.setdefault('html', []).extend(_card_products(text, record.url))
+        page = parse_page(text, record.url)
+        if page.text:
+            result.documents.append((record.url, page.text))
+
+
+def extract_batch(directory: str, entries: List[dict]) -> DomainExtraction:
+    """Extract one batch of index entries; runs in a worker process, reading the segments itself"""
+    result = DomainExtraction(domain=os.path.basename(directory))
+    for entry in entries:
+        result.records += 1
+        try:
+            extract_record(read_entry(directory, entry), result)
+        except Exception as e:
+            result.failed += 1
+            logger.warning("Re-extraction of %s failed: %s", entry.get('url'), e)
+    return result
+
+
+def reextract(root: str, domains: Optional[List[str]] = None, workers: Optional[int] = None,
+              batch_size: int = BATCH_SIZE) -> Dict[str, DomainExtraction]:
+    """domain -> extraction for the archived domains (all of them by default)"""
+    domains = domains or archived_domains(root)
+    results = {domain: DomainExtraction(domain=domain) for domain in domains}
+
+    batches = []
+    for domain in domains:
+        directory = os.path.join(root, domain)
+        entries, end = latest_crawl(directory)
+        results[domain].dropped = end.get('dropped', 0) if end else 0
+        results[domain].crawl_complete = end is not None and not results[domain].dropped
+        entries = [e for e in entries if e.get('status') == 200]
+        batches += [(directory, entries[i:i + batch_size]) for i in range(0, len(entries), batch_size)]
+
+    # spawn, like the parse pool: workers import only what extraction needs
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=get_context("spawn")) as pool:
+        futures = [pool.submit(extract_batch, directory, entries) for directory, entries in batches]
+        for future in as_completed(futures):
+            batch = future.result()
+            results[batch.domain].merge(batch)
+    return results
@@ -0,0 +1,299 @@
+"""
+Crawl seeding from robots.txt and sitemaps.
+
+Before following links, a crawl reads the site's robots.txt (Disallow/Allow rules
+for our user agent, Crawl-delay, Sitemap lines) and streams its sitemaps, so
+product pages listed there are fetched first instead of being reached through
+navigation, blog and cart pages. Sitemaps are parsed incrementally as they
+download and reading stops once enough URLs have been collected; sitemap indexes
+are followed product sitemaps first.
+
+Async crawls use seed_crawl(); the requests-based crawl_site uses seed_crawl_sync().
+"""
+import logging
+import re
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "LocalBusinessBot/1.0"
+ROBOTS_AGENT = "localbusinessbot"
+SEED_TIMEOUT = 10
+MAX_SITEMAPS = 20
+# The sitemap protocol caps a sitemap at 50MB uncompressed
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+# Longer delays are capped so a crawl still finishes
+MAX_CRAWL_DELAY = 10.0
+
+PRODUCT_URL = re.compile(r"/(?:products?|item|p|shop/[^/]+)/[^/?#]+", re.I)
+
+
+def is_product_url(url: str) -> bool:
+    """Product detail page by URL shape (/products/<handle>, /product/<slug>, ...)"""
+    return bool(PRODUCT_URL.search(urlparse(url).path))
+
+
+# ===== ROBOTS.TXT =====
+
+def _rule_pattern(path: str) -> re.Pattern:
+    """robots.txt path pattern: prefix match, * matches anything, trailing $ anchors"""
+    anchored = path.endswith('$')
+    if anchored:
+        path = path[:-1]
+    return re.compile(".*".join(re.escape(part) for part in path.split('*')) + ('$' if anchored else ''))
+
+
+@dataclass
+class RobotsRules:
+    # (pattern length, allow, compiled pattern); the longest matching pattern wins, Allow on ties
+    rules: List[Tuple[int, bool, re.Pattern]] = field(default_factory=list)
+    crawl_delay: float = 0.0
+    sitemaps: List[str] = field(default_factory=list)
+
+    def allowed(self, url: str) -> bool:
+        parsed = urlparse(url)
+        path = (parsed.path or '/') + (f"?{parsed.query}" if parsed.query else '')
+        best: Optional[Tuple[int, bool]] = None
+        for length, allow, pattern in self.rules:
+            if pattern.match(path) and (best is None or (length, allow) > best):
+                best = (length, allow)
+        return best is None or best[1]
+
+
+def parse_robots(text: str, agent: str = ROBOTS_AGENT) -> RobotsRules:
+    """Rules of the group naming our agent, or of the * group when none does"""
+    groups: dict = {}
+    sitemaps: List[str] = []
+    current: List[str] = []
+    in_rules = False
+
+    for line in text.splitlines():
+        line = line.split('#', 1)[0].strip()
+        if ':' not in line:
+            continue
+        key, value = (part.strip() for part in line.split(':', 1))
+        key = key.lower()
+        if key == 'sitemap':
+            if value:
+                sitemaps.append(value)
+        elif key == 'user-agent':
+            # Consecutive User-agent lines share one group
+            if in_rules:
+                current, in_rules = [], False
+            current.append(value.lower())
+            for name in current:
+                groups.setdefault(name, [])
+        elif key in ('allow', 'disallow', 'crawl-delay') and current:
+            in_rules = True
+            for name in current:
+                groups[name].append((key, value))
+
+    lines = groups.get(agent, groups.get('*', []))
+
+    rules = RobotsRules(sitemaps=sitemaps)
+    for key, value in lines or []:
+        if key == 'crawl-delay':
+            try:
+                rules.crawl_delay = min(max(float(value), 0.0), MAX_CRAWL_DELAY)
+            except ValueError:
+                pass
+        elif value:
+            # An empty Disallow allows everything, so it adds no rule
+            rules.rules.append((len(value), key == 'allow', _rule_pattern(value)))
+    return rules
+
+
+# ===== SITEMAPS =====
+
+@dataclass
+class SitemapEntry:
+    loc: str
+    # "sitemap" for a child of a sitemap index, "url" for a page
+    kind: str
+
+
+class SitemapParser:
+    """
+    Incremental sitemap/sitemap-index parser: feed() bytes as they arrive, get
+    entries back. Gzipped sitemaps (sitemap.xml.gz) are inflated on the fly.
+    """
+
+    def __init__(self):
+        self._xml = XMLPullParser(events=("end",))
+        self._inflate = None
+        self._started = False
+        self.size = 0
+
+    def feed(self, chunk: bytes) -> List[SitemapEntry]:
+        if not self._started and chunk:
+            self._started = True
+            if chunk[:2] == b"\x1f\x8b":
+                self._inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._inflate is not None:
+            chunk = self._inflate.decompress(chunk)
+        self.size += len(chunk)
+        self._xml.feed(chunk)
+        entries = []
+        for _event, element in self._xml.read_events():
+            tag = element.tag.rsplit('}', 1)[-1]
+            if tag in ('url', 'sitemap'):
+                loc = next((child.text for child in element if child.tag.rsplit('}', 1)[-1] == 'loc'), None)
+                if loc and loc.strip():
+                    entries.append(SitemapEntry(loc=loc.strip(), kind=tag))
+                # Drop parsed entries so memory stays flat on large sitemaps
+                element.clear()
+        return entries
+
+
+@dataclass
+class CrawlSeeds:
+    robots: RobotsRules = field(default_factory=RobotsRules)
+    product_urls: List[str] = field(default_factory=list)
+    other_urls: List[str] = field(default_factory=list)
+    sitemaps_read: int = 0
+
+    def ordered(self, start_url: str) -> List[str]:
+        """Product pages first, then the start page, then the rest of the sitemap"""
+        return [*self.product_urls, start_url, *(u for u in self.other_urls if u != start_url)]
+
+
+class _Seeder:
+    """Shared bookkeeping for the async and sync seeders"""
+
+    def __init__(self, start_url: str, limit: int):
+        parsed = urlparse(start_url)
+        self.origin = f"{parsed.scheme}://{parsed.netloc}"
+        self.netloc = parsed.netloc
+        self.limit = limit
+        self.seeds = CrawlSeeds()
+        self.queue: List[str] = []
+        self.queued: set = set()
+        self.seen: set = set()
+
+    def set_robots(self, text: Optional[str]):
+        if text:
+            self.seeds.robots = parse_robots(text)
+        for sitemap in self.seeds.robots.sitemaps or [f"{self.origin}/sitemap.xml"]:
+            self.add_sitemap(urljoin(self.origin + '/', sitemap))
+
+    def add_sitemap(self, url: str):
+        if url not in self.queued and len(self.queued) < MAX_SITEMAPS:
+            self.queued.add(url)
+            self.queue.append(url)
+
+    def next_sitemap(self) -> Optional[str]:
+        if not self.queue or self.done:
+            return None
+        # Product sitemaps of an index (sitemap_products_1.xml, product-sitemap.xml) first
+        self.queue.sort(key=lambda u: 'product' not in u.lower())
+        self.seeds.sitemaps_read += 1
+        return self.queue.pop(0)
+
+    def add_entries(self, entries: Iterable[SitemapEntry]):
+        for entry in entries:
+            if entry.kind == 'sitemap':
+                self.add_sitemap(entry.loc)
+                continue
+            url = entry.loc
+            if url in self.seen or urlparse(url).netloc != self.netloc or not self.seeds.robots.allowed(url):
+                continue
+            self.seen.add(url)
+            if is_product_url(url):
+                if len(self.seeds.product_urls) < self.limit:
+                    self.seeds.product_urls.append(url)
+            elif len(self.seeds.other_urls) < self.limit:
+                self.seeds.other_urls.append(url)
+
+    @property
+    def done(self) -> bool:
+        return len(self.seeds.product_urls) >= self.limit
+
+    def log(self):
+        logger.info(
+            "Crawl seeded",
+            extra={
+                "origin": self.origin, "sitemaps": self.seeds.sitemaps_read, "crawl_delay": self.seeds.robots.crawl_delay,
+                "product_urls": len(self.seeds.product_urls), "other_urls": len(self.seeds.other_urls),
+            }
+        )
+
+
+async def seed_crawl(start_url: str, limit: int) -> CrawlSeeds:
+    """robots.txt rules and up to `limit` product (and other) page URLs from the site's sitemaps"""
+    from src.integrations.clients import get_http_client
+
+    client = get_http_client()
+    headers = {"User-Agent": USER_AGENT}
+    seeder = _Seeder(start_url, limit)
+
+    robots_text = None
+    try:
+        response = await client.get(f"{seeder.origin}/robots.txt", headers=headers, timeout=SEED_TIMEOUT)
+        if response.status_code == 200:
+            robots_text = response.text
+    except Exception as e:
+        logger.debug("robots.txt unavailable for %s: %s", seeder.origin, e)
+    seeder.set_robots(robots_text)
+
+    while (url := seeder.next_sitemap()) is not None:
+        try:
+            async with client.stream("GET", url, headers=headers, timeout=SEED_TIMEOUT) as response:
+                if response.status_code != 200:
+                    continue
+                parser = SitemapParser()
+                async for chunk in response.aiter_bytes():
+                    seeder.add_entries(parser.feed(chunk))
+                    if seeder.done or parser.size > MAX_SITEMAP_BYTES:
+                        break
+        except (ParseError, zlib.error) as e:
+            logger.debug("Unreadable sitemap %s: %s", url, e)
+        except Exception as e:
+            logger.debug("Sitemap fetch failed for %s: %s", url, e)
+
+    seeder.log()
+    return seeder.seeds
+
+
+def seed_crawl_sync(start_url: str, limit: int) -> CrawlSeeds:
+    """seed_crawl() for synchronous crawlers (requests)"""
+    import requests
+
+    headers = {"User-Agent": USER_AGENT}
+    seeder = _Seeder(start_url, limit)
+
+    robots_text = None
+    try:
+        response = requests.get(f"{seeder.origin}/robots.txt", headers=headers, timeout=SEED_TIMEOUT)
+        if response.status_code == 200:
+            robots_text = response.text
+    except Exception as e:
+        logger.debug("robots.txt unavailable for %s: %s", seeder.origin, e)
+    seeder.set_robots(robots_text)
+
+    while (url := seeder.next_sitemap()) is not None:
+        try:
+            with requests.get(url, headers=headers, timeout=SEED_TIMEOUT, stream=True) as response:
+                if response.status_code != 200:
+                    continue
+                parser = SitemapParser()
+                for chunk in response.iter_content(64 * 1024):
+                    seeder.add_entries(parser.feed(chunk))
+                    if seeder.done or parser.size > MAX_SITEMAP_BYTES:
+                        break
+        except (ParseError, zlib.error) as e:
+            logger.debug("Unreadable sitemap %s: %s", url, e)
+        except Exception as e:
+            logger.debug("Sitemap fetch failed for %s: %s", url, e)
+
+    seeder.log()
+    return seeder.seeds
+
+
+def crawl_delay_remaining(robots: RobotsRules, last_fetch: float) -> float:
+    """Seconds still to wait (after a request at time.monotonic() == last_fetch) to honour Crawl-delay"""
+    return max(0.0, robots.crawl_delay - (time.monotonic() - last_fetch))
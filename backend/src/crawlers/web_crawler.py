@@ -1,10 +1,14 @@
 import re
+import time
+from dataclasses import dataclass, field
 from urllib.parse import urljoin, urldefrag, urlparse
 from collections import deque
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
-import requests
-from bs4 import BeautifulSoup
+from src.crawlers.archive import archive_crawl
+from src.crawlers.frontier import should_skip
+from src.crawlers.fetching import fetch_html_sync
+from src.crawlers.seeding import crawl_delay_remaining, seed_crawl_sync
 
 
 def is_same_domain(url: str, base_netloc: str) -> bool:
@@ -21,7 +25,12 @@ def normalize_url(base_url: str, link: str) -> str:
 
 
 def extract_text(html: str) -> str:
-    soup = BeautifulSoup(html, "html.parser")
+    from bs4 import BeautifulSoup
+
+    return _soup_text(BeautifulSoup(html, "html.parser"))
+
+
+def _soup_text(soup) -> str:
     # Remove scripts/styles/nav/footer
     for tag in soup(["script", "style", "noscript"]):
         tag.decompose()
@@ -34,39 +43,84 @@ def extract_text(html: str) -> str:
     return text
 
 
+def page_links(soup, url: str, base_netloc: str) -> List[str]:
+    """Same-domain links on a page, absolute and without fragments"""
+    links = []
+    for a in soup.find_all("a", href=True):
+        href = a.get("href")
+        if not href or href.startswith("mailto:") or href.startswith("tel:"):
+            continue
+        next_url = normalize_url(url, href)
+        if is_same_domain(next_url, base_netloc):
+            links.append(next_url)
+    return links
+
+
+@dataclass
+class ParsedPage:
+    text: str
+    links: List[str] = field(default_factory=list)
+    og_type: Optional[str] = None
+
+
+def parse_page(html: str, url: str, with_text: bool = True) -> ParsedPage:
+    """
+    Text, same-domain links and og:type of a page from a single parse.
+    Module-level and returning plain data so crawls can run it in the parse pool.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    og_type = soup.find("meta", property="og:type")
+    links = page_links(soup, url, urlparse(url).netloc)
+    # Text extraction decomposes script tags, so it runs after the link scan
+    return ParsedPage(
+        text=_soup_text(soup) if with_text else "",
+        links=links,
+        og_type=og_type.get("content") if og_type else None,
+    )
+
+
 def crawl_site(start_url: str, max_pages: int = 50, timeout: int = 10) -> List[Tuple[str, str]]:
+    import requests
+
     parsed = urlparse(start_url)
     base_netloc = parsed.netloc
 
+    # robots.txt rules, and sitemap pages (products first) ahead of link discovery
+    seeds = seed_crawl_sync(start_url, max_pages)
+    robots = seeds.robots
+
     visited: Set[str] = set()
-    queue: deque[str] = deque([start_url])
+    queue: deque[str] = deque(seeds.ordered(start_url))
     results: List[Tuple[str, str]] = []
+    last_fetch = 0.0
 
-    while queue and len(visited) < max_pages:
-        url = queue.popleft()
-        if url in visited:
-            continue
-        visited.add(url)
-
-        try:
-            resp = requests.get(url, timeout=timeout, headers={"User-Agent": "LocalBusinessBot/1.0"})
-            if resp.status_code != 200 or "text/html" not in resp.headers.get("Content-Type", ""):
+    # One session so pages reuse the connection; responses are archived as one crawl
+    with archive_crawl(), requests.Session() as session:
+        while queue and len(visited) < max_pages:
+            url = queue.popleft()
+            if url in visited or not robots.allowed(url):
                 continue
-        except Exception:
-            continue
+            visited.add(url)
 
-        text = extract_text(resp.text)
-        if text:
-            results.append((url, text))
+            delay = crawl_delay_remaining(robots, last_fetch)
+            if delay:
+                time.sleep(delay)
+            last_fetch = time.monotonic()
 
-        soup = BeautifulSoup(resp.text, "html.parser")
-        for a in soup.find_all("a", href=True):
-            href = a.get("href")
-            if not href or href.startswith("mailto:") or href.startswith("tel:"):
+            # Streamed with size and content checks: non-HTML and oversized responses come back as None
+            fetched = fetch_html_sync(url, session, timeout=timeout)
+            if fetched is None:
                 continue
-            next_url = normalize_url(url, href)
-            if is_same_domain(next_url, base_netloc) and next_url not in visited:
-                queue.append(next_url)
+
+            page = parse_page(fetched.text, fetched.url)
+            if page.text:
+                results.append((url, page.text))
+
+            for next_url in page.links:
+                if is_same_domain(next_url, base_netloc) and next_url not in visited and not should_skip(next_url):
+                    queue.append(next_url)
 
     return results
 
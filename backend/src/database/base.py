@@ -1,13 +1,22 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
 from src.config.settings import get_settings
 
 settings = get_settings()
 
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if settings.database_url.startswith("sqlite") else {},
-)
+
+def _engine_options(url: str) -> dict:
+    if not url.startswith("sqlite"):
+        return {}
+    options = {"connect_args": {"check_same_thread": False}}
+    # An in-memory database only exists on its connection, so every session has to share one
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        options["poolclass"] = StaticPool
+    return options
+
+
+engine = create_engine(settings.database_url, **_engine_options(settings.database_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -18,5 +27,3 @@ def get_db():
         yield db
     finally:
         db.close()
-
-
@@ -0,0 +1,361 @@
+"""
+SQLite-backed stand-in for the Supabase client (DATABASE_BACKEND=sqlite).
+
+Implements the part of the supabase-py query builder the app uses, so the API
+can be load tested and profiled on one machine with no network. Rows are kept
+as JSON documents, one SQL table per Supabase table, in the DATABASE_URL engine
+from database/base.py (use DATABASE_URL=sqlite:// for a throwaway in-memory store).
+"""
+import json
+import re
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import text
+
+from src.database.base import engine
+
+# Key Supabase upserts conflict on when no on_conflict is given (the table's primary/unique key)
+PRIMARY_KEYS = {'widget_settings': 'business_id', 'crawl_patterns': 'domain', 'extraction_templates': 'domain'}
+
+# Embedded selects such as businesses.select('*, pricing_tiers(*)') follow these foreign keys;
+# other relations fall back to <singular table name>_id
+FOREIGN_KEYS = {'pricing_tiers': 'tier_id'}
+
+# Columns most queries filter on get an expression index when a table is created
+INDEXED_COLUMNS = ['business_id']
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+_OPERATORS = {'eq': '=', 'neq': '!=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=', 'like': 'LIKE', 'ilike': 'LIKE'}
+
+
+@dataclass
+class APIResponse:
+    """Same shape as supabase-py's response: rows in data, total in count when requested"""
+    data: Any
+    count: Optional[int] = None
+
+
+def _identifier(name: str) -> str:
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid table or column name: {name!r}")
+    return name
+
+
+def _column(name: str) -> str:
+    return f"json_extract(data, '$.{_identifier(name)}')"
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _dumps(row: dict) -> str:
+    return json.dumps(row, default=_json_default)
+
+
+def _coerce(value: str):
+    """Values inside or_() filter strings arrive as text; compare numbers and booleans as such"""
+    lowered = value.lower()
+    if lowered in ('true', 'false'):
+        return lowered == 'true'
+    if lowered == 'null':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _split_top_level(expression: str) -> List[str]:
+    """Split on commas that aren't inside parentheses: '*, pricing_tiers(*)' -> ['*', 'pricing_tiers(*)']"""
+    parts, depth, current = [], 0, ''
+    for char in expression:
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+class LocalQuery:
+    """One chained query, e.g. store.table('products').select('*').eq('business_id', id).limit(100).execute()"""
+
+    def __init__(self, store: "LocalSupabase", table: str):
+        self._store = store
+        self._table = _identifier(table)
+        self._action = 'select'
+        self._columns: Optional[List[str]] = None
+        self._embeds: List[str] = []
+        self._count: Optional[str] = None
+        self._payload: Union[dict, List[dict], None] = None
+        self._on_conflict: Optional[List[str]] = None
+        self._where: List[str] = []
+        self._params: Dict[str, Any] = {}
+        self._order: List[str] = []
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+        self._single = False
+
+    # ----- actions -----
+
+    def select(self, columns: str = '*', count: Optional[str] = None):
+        self._action = 'select'
+        self._count = count
+        parts = _split_top_level(columns)
+        self._columns = None if '*' in parts else []
+        for part in parts:
+            if part == '*':
+                continue
+            match = re.match(r'^(\w+)\((.*)\)$', part)
+            if match:
+                self._embeds.append(_identifier(match.group(1)))
+            elif self._columns is not None:
+                self._columns.append(_identifier(part))
+        return self
+
+    def insert(self, rows: Union[dict, List[dict]]):
+        self._action = 'insert'
+        self._payload = rows
+        return self
+
+    def upsert(self, rows: Union[dict, List[dict]], on_conflict: Optional[str] = None):
+        self._action = 'upsert'
+        self._payload = rows
+        if on_conflict:
+            self._on_conflict = [_identifier(c.strip()) for c in on_conflict.split(',')]
+        return self
+
+    def update(self, values: dict):
+        self._action = 'update'
+        self._payload = values
+        return self
+
+    def delete(self):
+        self._action = 'delete'
+        return self
+
+    # ----- filters -----
+
+    def _param(self, value) -> str:
+        name = f"p{len(self._params)}"
+        self._params[name] = value
+        return f":{name}"
+
+    def _condition(self, column: str, operator: str, value) -> str:
+        if operator == 'eq' and value is None:
+            return f"{_column(column)} IS NULL"
+        if operator == 'in':
+            placeholders = ", ".join(self._param(v) for v in value) or "NULL"
+            return f"{_column(column)} IN ({placeholders})"
+        if operator in ('like', 'ilike'):
+            value = str(value).replace('*', '%')
+        return f"{_column(column)} {_OPERATORS[operator]} {self._param(value)}"
+
+    def _filter(self, column: str, operator: str, value):
+        self._where.append(self._condition(column, operator, value))
+        return self
+
+    def eq(self, column: str, value):
+        return self._filter(column, 'eq', value)
+
+    def neq(self, column: str, value):
+        return self._filter(column, 'neq', value)
+
+    def gt(self, column: str, value):
+        return self._filter(column, 'gt', value)
+
+    def gte(self, column: str, value):
+        return self._filter(column, 'gte', value)
+
+    def lt(self, column: str, value):
+        return self._filter(column, 'lt', value)
+
+    def lte(self, column: str, value):
+        return self._filter(column, 'lte', value)
+
+    def like(self, column: str, pattern: str):
+        return self._filter(column, 'like', pattern)
+
+    def ilike(self, column: str, pattern: str):
+        return self._filter(column, 'ilike', pattern)
+
+    def in_(self, column: str, values: list):
+        return self._filter(column, 'in', list(values))
+
+    def or_(self, filters: str):
+        """PostgREST syntax: 'name.ilike.%shirt%,description.ilike.%shirt%'"""
+        conditions = []
+        for part in _split_top_level(filters):
+            column, operator, value = part.split('.', 2)
+            if operator not in _OPERATORS:
+                raise ValueError(f"Unsupported or_ operator: {operator}")
+            conditions.append(self._condition(column, operator, value if operator in ('like', 'ilike') else _coerce(value)))
+        if conditions:
+            self._where.append("(" + " OR ".join(conditions) + ")")
+        return self
+
+    # ----- modifiers -----
+
+    def order(self, column: str, desc: bool = False):
+        self._order.append(f"{_column(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def range(self, start: int, end: int):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    # ----- execution -----
+
+    def _where_sql(self) -> str:
+        return (" WHERE " + " AND ".join(self._where)) if self._where else ""
+
+    def execute(self) -> APIResponse:
+        for table in [self._table] + self._embeds:
+            self._store.ensure_table(table)
+        with self._store.lock, engine.begin() as conn:
+            if self._action == 'select':
+                return self._execute_select(conn)
+            if self._action == 'insert':
+                return APIResponse(data=self._store.write_rows(conn, self._table, self._payload, conflict=None))
+            if self._action == 'upsert':
+                conflict = self._on_conflict or [self._store.primary_key(self._table)]
+                return APIResponse(data=self._store.write_rows(conn, self._table, self._payload, conflict=conflict))
+            if self._action == 'update':
+                return APIResponse(data=self._execute_update(conn))
+            if self._action == 'delete':
+                return APIResponse(data=self._execute_delete(conn))
+        raise ValueError(f"Unknown action {self._action}")
+
+    def _matching(self, conn) -> List[Tuple[str, dict]]:
+        rows = conn.execute(text(f'SELECT pk, data FROM "{self._table}"{self._where_sql()}'), self._params)
+        return [(pk, json.loads(data)) for pk, data in rows]
+
+    def _execute_select(self, conn) -> APIResponse:
+        sql = f'SELECT data FROM "{self._table}"{self._where_sql()}'
+        if self._order:
+            sql += " ORDER BY " + ", ".join(self._order)
+        if self._limit is not None:
+            sql += f" LIMIT {int(self._limit)}"
+            if self._offset:
+                sql += f" OFFSET {int(self._offset)}"
+        rows = [json.loads(data) for (data,) in conn.execute(text(sql), self._params)]
+
+        count = None
+        if self._count:
+            count = conn.execute(text(f'SELECT COUNT(*) FROM "{self._table}"{self._where_sql()}'), self._params).scalar()
+
+        for relation in self._embeds:
+            self._store.embed(conn, rows, relation)
+        if self._columns is not None:
+            keep = set(self._columns) | set(self._embeds)
+            rows = [{k: v for k, v in row.items() if k in keep} for row in rows]
+
+        if self._single:
+            if len(rows) != 1:
+                raise ValueError(f"Expected a single row from {self._table}, got {len(rows)}")
+            return APIResponse(data=rows[0], count=count)
+        return APIResponse(data=rows, count=count)
+
+    def _execute_update(self, conn) -> List[dict]:
+        updated = []
+        for pk, row in self._matching(conn):
+            row.update(self._payload)
+            conn.execute(text(f'UPDATE "{self._table}" SET data = :data WHERE pk = :pk'), {'data': _dumps(row), 'pk': pk})
+            updated.append(row)
+        return updated
+
+    def _execute_delete(self, conn) -> List[dict]:
+        deleted = self._matching(conn)
+        conn.execute(text(f'DELETE FROM "{self._table}"{self._where_sql()}'), self._params)
+        return [row for _pk, row in deleted]
+
+
+class LocalSupabase:
+    """Drop-in for the supabase-py Client as far as .table(...) queries go"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._tables = set()
+
+    def table(self, name: str) -> LocalQuery:
+        return LocalQuery(self, name)
+
+    from_ = table
+
+    def primary_key(self, table: str) -> str:
+        return PRIMARY_KEYS.get(table, 'id')
+
+    def ensure_table(self, table: str):
+        if table in self._tables:
+            return
+        with self.lock, engine.begin() as conn:
+            conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{table}" (pk TEXT PRIMARY KEY, data TEXT NOT NULL)'))
+            for column in INDEXED_COLUMNS:
+                conn.execute(text(f'CREATE INDEX IF NOT EXISTS "ix_{table}_{column}" ON "{table}" ({_column(column)})'))
+        self._tables.add(table)
+
+    def write_rows(self, conn, table: str, rows: Union[dict, List[dict]], conflict: Optional[List[str]]) -> List[dict]:
+        """Insert rows; with conflict columns, merge into the existing row with the same values instead"""
+        if isinstance(rows, dict):
+            rows = [rows]
+        key = self.primary_key(table)
+        written = []
+        for row in rows:
+            row = dict(row)
+            existing = None
+            if conflict and all(row.get(c) is not None for c in conflict):
+                condition = " AND ".join(f"{_column(c)} = :c{i}" for i, c in enumerate(conflict))
+                params = {f"c{i}": row[c] for i, c in enumerate(conflict)}
+                existing = conn.execute(text(f'SELECT pk, data FROM "{table}" WHERE {condition} LIMIT 1'), params).first()
+
+            if existing is not None:
+                pk, data = existing
+                merged = {**json.loads(data), **row}
+                conn.execute(text(f'UPDATE "{table}" SET data = :data WHERE pk = :pk'), {'data': _dumps(merged), 'pk': pk})
+                written.append(merged)
+                continue
+
+            if row.get(key) is None:
+                row[key] = str(uuid.uuid4())
+            conn.execute(text(f'INSERT INTO "{table}" (pk, data) VALUES (:pk, :data)'), {'pk': str(row[key]), 'data': _dumps(row)})
+            written.append(row)
+        return written
+
+    def embed(self, conn, rows: List[dict], relation: str):
+        """Attach the referenced row of `relation` to each row, like PostgREST resource embedding"""
+        foreign_key = FOREIGN_KEYS.get(relation, relation.rstrip('s') + '_id')
+        ids = {row.get(foreign_key) for row in rows if row.get(foreign_key) is not None}
+        related: Dict[str, dict] = {}
+        if ids:
+            params = {f"i{n}": str(v) for n, v in enumerate(ids)}
+            placeholders = ", ".join(f":{p}" for p in params)
+            for pk, data in conn.execute(text(f'SELECT pk, data FROM "{relation}" WHERE pk IN ({placeholders})'), params):
+                related[pk] = json.loads(data)
+        for row in rows:
+            value = row.get(foreign_key)
+            row[relation] = related.get(str(value)) if value is not None else None
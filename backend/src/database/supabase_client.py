@@ -1,9 +1,26 @@
-from supabase import create_client, Client
 import os
+import threading
 
-def get_supabase_client() -> Client:
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_KEY")
-    if not url or not key:
-        raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
-    return create_client(url, key)
+from src.config.settings import get_settings
+
+_client = None
+_lock = threading.Lock()
+
+def get_supabase_client():
+    """Shared Supabase client, created on first use (the SDK is slow to import)"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                if get_settings().database_backend == "sqlite":
+                    # Offline table store for load tests and local profiling
+                    from src.database.local_store import LocalSupabase
+                    _client = LocalSupabase()
+                else:
+                    url = os.environ.get("SUPABASE_URL")
+                    key = os.environ.get("SUPABASE_KEY")
+                    if not url or not key:
+                        raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
+                    from supabase import create_client
+                    _client = create_client(url, key)
+    return _client
@@ -0,0 +1,103 @@
+"""
+Shared SDK clients.
+Heavy SDKs (anthropic, openai, httpx) are imported on first use so that importing
+the API app stays fast; the app's lifespan hook warms them up after startup.
+"""
+import logging
+import os
+import threading
+from typing import Optional
+
+from src.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_anthropic_client = None
+_async_anthropic_client = None
+_openai_client = None
+_http_client = None
+
+
+def get_anthropic_client():
+    global _anthropic_client
+    if _anthropic_client is None:
+        with _lock:
+            if _anthropic_client is None:
+                settings = get_settings()
+                if settings.llm_backend == 'fake':
+                    from src.integrations.fake_llm import FakeAnthropic
+                    _anthropic_client = FakeAnthropic(latency_ms=settings.fake_llm_latency_ms)
+                else:
+                    import anthropic
+                    _anthropic_client = anthropic.Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+    return _anthropic_client
+
+
+def get_async_anthropic_client():
+    """Async Anthropic client: cancelling an awaiting request closes its HTTP request instead of leaving a thread waiting"""
+    global _async_anthropic_client
+    if _async_anthropic_client is None:
+        with _lock:
+            if _async_anthropic_client is None:
+                settings = get_settings()
+                if settings.llm_backend == 'fake':
+                    from src.integrations.fake_llm import FakeAsyncAnthropic
+                    _async_anthropic_client = FakeAsyncAnthropic(latency_ms=settings.fake_llm_latency_ms)
+                else:
+                    import anthropic
+                    _async_anthropic_client = anthropic.AsyncAnthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+    return _async_anthropic_client
+
+
+def get_openai_client():
+    global _openai_client
+    if _openai_client is None:
+        with _lock:
+            if _openai_client is None:
+                settings = get_settings()
+                if settings.llm_backend == 'fake':
+                    from src.integrations.fake_llm import FakeOpenAI
+                    _openai_client = FakeOpenAI(settings.fake_llm_latency_ms, settings.fake_embedding_latency_ms)
+                else:
+                    from openai import OpenAI
+                    _openai_client = OpenAI()
+    return _openai_client
+
+
+def get_http_client():
+    """Shared async HTTP client (connection pooling across crawls and internal calls)"""
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.AsyncClient(timeout=30, follow_redirects=True)
+    return _http_client
+
+
+async def close_clients():
+    global _http_client, _async_anthropic_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    if _async_anthropic_client is not None:
+        await _async_anthropic_client.close()
+        _async_anthropic_client = None
+
+
+def warm_up(include: Optional[list] = None):
+    """Create the shared clients ahead of the first request that needs them"""
+    from src.database.supabase_client import get_supabase_client
+
+    factories = {
+        'supabase': get_supabase_client,
+        'anthropic': get_anthropic_client,
+        'async_anthropic': get_async_anthropic_client,
+    }
+    for name, factory in factories.items():
+        if include is not None and name not in include:
+            continue
+        try:
+            factory()
+        except Exception as e:
+            # Missing credentials in dev must not keep the app from starting
+            logger.warning("Warm-up of %s client skipped: %s", name, e)
@@ -0,0 +1,174 @@
+"""
+Deterministic offline stand-ins for the Anthropic and OpenAI clients (LLM_BACKEND=fake).
+
+They mirror the response shapes the app reads (message.content[0].text,
+chat.choices[0].message.content, embeddings.data[i].embedding) and sleep for a
+configurable latency, so throughput and latency tests behave like the real
+blocking (or, for FakeAsyncAnthropic, awaitable and cancellable) SDK calls
+without network access or API keys.
+"""
+import asyncio
+import hashlib
+import math
+import re
+import time
+from types import SimpleNamespace
+from typing import List, Union
+
+EMBEDDING_DIMENSIONS = 1536
+
+CANNED_ANSWERS = [
+    "I found some great options that match what you're looking for!",
+    "Here are a few picks from our current stock.",
+    "These should be a good fit for your search.",
+    "Take a look at these matching products.",
+]
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _prompt_text(messages: list) -> str:
+    """Text of the last user message (content may be a string or a list of blocks)"""
+    for message in reversed(messages):
+        if message.get('role') != 'user':
+            continue
+        content = message.get('content', '')
+        if isinstance(content, list):
+            return " ".join(block.get('text', '') for block in content if isinstance(block, dict))
+        return str(content)
+    return ""
+
+
+def fake_answer(prompt: str) -> str:
+    """Same prompt, same answer"""
+    return CANNED_ANSWERS[_digest(prompt) % len(CANNED_ANSWERS)]
+
+
+def fake_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> List[float]:
+    """
+    Hashed bag-of-words vector, L2-normalised: deterministic, and texts sharing
+    words end up close together, so similarity search still returns sensible results
+    """
+    vector = [0.0] * dimensions
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        h = _digest(word)
+        vector[h % dimensions] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def _token_estimate(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _sleep(latency_ms: float):
+    if latency_ms > 0:
+        time.sleep(latency_ms / 1000)
+
+
+def _fake_message(model: str, messages: list) -> SimpleNamespace:
+    prompt = _prompt_text(messages)
+    answer = fake_answer(prompt)
+    return SimpleNamespace(
+        id=f"msg_fake_{_digest(prompt):016x}",
+        model=model,
+        role="assistant",
+        stop_reason="end_turn",
+        content=[SimpleNamespace(type="text", text=answer)],
+        usage=SimpleNamespace(input_tokens=_token_estimate(prompt), output_tokens=_token_estimate(answer)),
+    )
+
+
+class _FakeAnthropicMessages:
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def create(self, model: str, max_tokens: int, messages: list, **kwargs):
+        self.calls += 1
+        _sleep(self.latency_ms)
+        return _fake_message(model, messages)
+
+
+class FakeAnthropic:
+    """Stands in for anthropic.Anthropic"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.messages = _FakeAnthropicMessages(latency_ms)
+
+    def with_options(self, **kwargs) -> "FakeAnthropic":
+        return self
+
+
+class _FakeAsyncAnthropicMessages:
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+        self.calls = 0
+        # Calls cancelled before they answered
+        self.cancelled = 0
+
+    async def create(self, model: str, max_tokens: int, messages: list, **kwargs):
+        self.calls += 1
+        try:
+            if self.latency_ms > 0:
+                await asyncio.sleep(self.latency_ms / 1000)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return _fake_message(model, messages)
+
+
+class FakeAsyncAnthropic:
+    """Stands in for anthropic.AsyncAnthropic"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.messages = _FakeAsyncAnthropicMessages(latency_ms)
+
+    def with_options(self, **kwargs) -> "FakeAsyncAnthropic":
+        return self
+
+    async def close(self):
+        pass
+
+
+class _FakeChatCompletions:
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def create(self, model: str, messages: list, **kwargs):
+        self.calls += 1
+        _sleep(self.latency_ms)
+        answer = fake_answer(_prompt_text(messages))
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, finish_reason="stop", message=SimpleNamespace(role="assistant", content=answer))],
+        )
+
+
+class _FakeEmbeddings:
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def create(self, model: str, input: Union[str, List[str]], **kwargs):
+        self.calls += 1
+        _sleep(self.latency_ms)
+        texts = [input] if isinstance(input, str) else list(input)
+        return SimpleNamespace(
+            model=model,
+            data=[SimpleNamespace(index=i, embedding=fake_embedding(t)) for i, t in enumerate(texts)],
+        )
+
+
+class FakeOpenAI:
+    """Stands in for openai.OpenAI (chat completions and embeddings)"""
+
+    def __init__(self, latency_ms: float = 0.0, embedding_latency_ms: float = 0.0):
+        self.chat = SimpleNamespace(completions=_FakeChatCompletions(latency_ms))
+        self.embeddings = _FakeEmbeddings(embedding_latency_ms)
+
+    def with_options(self, **kwargs) -> "FakeOpenAI":
+        return self
@@ -0,0 +1,159 @@
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from src.config.settings import get_settings
+
+# Token bucket kept in a Redis hash so every worker/replica shares the same state.
+# Uses the Redis clock so instances with skewed clocks still agree.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local refill_per_second = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill_per_second)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry_after = (cost - tokens) / refill_per_second
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill_per_second) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+logger = logging.getLogger(__name__)
+
+REDIS_RETRY_SECONDS = 30
+LOCAL_MAX_BUCKETS = 50000
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    capacity: int
+    per_seconds: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.per_seconds
+
+
+class RateLimiter:
+    """Token-bucket limiter backed by Redis, falling back to per-process buckets when Redis is down"""
+
+    def __init__(self, redis_url: str, prefix: str = "ratelimit"):
+        self.redis_url = redis_url
+        self.prefix = prefix
+        self._redis = None
+        self._script = None
+        self._redis_down_until = 0.0
+        self._lock = threading.Lock()
+        self._local: Dict[str, Tuple[float, float]] = {}
+
+    def _get_redis(self):
+        if time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            try:
+                import redis.asyncio as redis_asyncio
+            except ImportError:
+                self._redis_down_until = float("inf")
+                return None
+            self._redis = redis_asyncio.from_url(self.redis_url, socket_timeout=0.25, socket_connect_timeout=0.25)
+            self._script = self._redis.register_script(TOKEN_BUCKET_LUA)
+        return self._redis
+
+    async def hit(self, key: str, limit: RateLimit, cost: int = 1) -> Tuple[bool, float]:
+        """Take `cost` tokens from the bucket; returns (allowed, retry_after_seconds)"""
+        full_key = f"{self.prefix}:{key}"
+
+        if self._get_redis() is not None:
+            try:
+                allowed, retry_after = await self._script(
+                    keys=[full_key],
+                    args=[limit.capacity, limit.refill_per_second, cost]
+                )
+                return bool(int(allowed)), float(retry_after)
+            except Exception as e:
+                logger.warning("Rate limiter falling back to local buckets: %s", e)
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+        return self._hit_local(full_key, limit, cost)
+
+    def _hit_local(self, key: str, limit: RateLimit, cost: int) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._local.get(key, (float(limit.capacity), now))
+            tokens = min(limit.capacity, tokens + (now - ts) * limit.refill_per_second)
+
+            if tokens >= cost:
+                allowed, retry_after = True, 0.0
+                tokens -= cost
+            else:
+                allowed, retry_after = False, (cost - tokens) / limit.refill_per_second
+
+            if key not in self._local and len(self._local) >= LOCAL_MAX_BUCKETS:
+                self._local.pop(next(iter(self._local)))
+            self._local[key] = (tokens, now)
+
+        return allowed, retry_after
+
+    async def enforce(self, key: str, limit: RateLimit, detail: str = "Too many requests"):
+        """Raise 429 with Retry-After when the bucket for `key` is empty"""
+        if not get_settings().rate_limit_enabled:
+            return
+        allowed, retry_after = await self.hit(key, limit)
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail=detail,
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+
+
+def client_ip(request: Request) -> str:
+    """
+    Client address as the trusted proxies saw it: the X-Forwarded-For entry the
+    outermost of TRUSTED_PROXY_COUNT proxies appended. Entries left of it were
+    sent by the client and can't be trusted.
+    """
+    trusted = get_settings().trusted_proxy_count
+    forwarded = request.headers.get("x-forwarded-for")
+    if trusted > 0 and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()]
+        if hops:
+            return hops[-min(trusted, len(hops))]
+    return request.client.host if request.client else "unknown"
+
+
+def client_key(request: Request, session_id: Optional[str] = None) -> str:
+    """Identify the caller: client IP, narrowed to the widget session if given (session ids are client-chosen)"""
+    key = f"ip:{client_ip(request)}"
+    if session_id:
+        key += f":session:{session_id[:128]}"
+    return key
+
+
+settings = get_settings()
+
+ASK_PER_BUSINESS = RateLimit(capacity=settings.rate_limit_ask_per_business, per_seconds=60)
+ASK_PER_SESSION = RateLimit(capacity=settings.rate_limit_ask_per_session, per_seconds=60)
+ASK_PER_IP = RateLimit(capacity=settings.rate_limit_ask_per_ip, per_seconds=60)
+CRAWL_PER_CALLER = RateLimit(capacity=settings.rate_limit_crawls_per_hour, per_seconds=3600)
+
+rate_limiter = RateLimiter(settings.redis_url)
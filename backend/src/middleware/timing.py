@@ -0,0 +1,98 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from src.services.metrics import http_request_duration, phase_duration
+
+# (phase, seconds) pairs recorded during the current request
+_spans: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar("timing_spans", default=None)
+_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("timing_scope", default=None)
+
+
+def _route_label(scope: Optional[dict]) -> str:
+    """Route template (e.g. /widget/settings/{business_id}) to keep label cardinality bounded"""
+    if scope is None:
+        return "background"
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+@contextmanager
+def span(phase: str):
+    """
+    Time a phase of the current request (or background job):
+
+        with span("db"):
+            supabase.table(...).execute()
+
+    Durations feed the request_phase_duration_seconds histogram and, inside a
+    request, the Server-Timing response header.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(phase, time.perf_counter() - started)
+
+
+def record_span(phase: str, seconds: float):
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((phase, seconds))
+    phase_duration.observe(seconds, route=_route_label(_scope.get()), phase=phase)
+
+
+def server_timing_header(spans: List[Tuple[str, float]], total: float) -> str:
+    """Sum repeated phases (e.g. one fetch per crawled page) into one Server-Timing entry each"""
+    totals: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    for phase, seconds in spans:
+        totals[phase] = totals.get(phase, 0.0) + seconds
+        counts[phase] = counts.get(phase, 0) + 1
+
+    entries = []
+    for phase, seconds in totals.items():
+        entry = f"{phase};dur={seconds * 1000:.1f}"
+        if counts[phase] > 1:
+            entry += f';desc="x{counts[phase]}"'
+        entries.append(entry)
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class TimingMiddleware:
+    """Times every request, adds a Server-Timing header and feeds the /metrics histograms"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        spans: List[Tuple[str, float]] = []
+        spans_token = _spans.set(spans)
+        # The router fills in scope["route"] once it has matched
+        scope_token = _scope.set(scope)
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                header = server_timing_header(spans, time.perf_counter() - started)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=_route_label(scope),
+                status=str(status["code"]),
+            )
+            _spans.reset(spans_token)
+            _scope.reset(scope_token)
@@ -0,0 +1,182 @@
+"""
+Internal product crawl service.
+
+Signup webhooks and the daily recrawl start product crawls (crawl_and_extract)
+through this interface instead of POSTing to the API's own public URL, which
+sent every crawl out through the internet and the load balancer and held a
+second API worker for the length of the crawl. The transport is chosen with
+CRAWL_TRANSPORT:
+
+    queue   - (default) in this process, at most CRAWL_QUEUE_WORKERS crawls at a time
+    inline  - in this process, immediately
+    http    - POST /product-crawl/ on CRAWL_SERVICE_URL (a separate crawl deployment)
+
+    service = get_crawl_service()
+    service.submit(CrawlJob(business_id, url))        # fire and forget
+    result = await service.run(CrawlJob(business_id, url))
+"""
+import asyncio
+import logging
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+from src.config.settings import get_settings
+from src.services.metrics import crawl_jobs
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PAGES = 100
+REMOTE_CRAWL_TIMEOUT = 300.0
+
+
+@dataclass(frozen=True)
+class CrawlJob:
+    business_id: str
+    start_url: str
+    max_pages: int = DEFAULT_MAX_PAGES
+
+
+class CrawlService:
+    transport = "inline"
+
+    def __init__(self):
+        # Keeps fire-and-forget tasks referenced until they finish
+        self._tasks: set = set()
+
+    async def _crawl(self, job: CrawlJob) -> dict:
+        from src.api.routes.product_crawl import crawl_and_extract
+
+        return await crawl_and_extract(job.start_url, job.max_pages, job.business_id)
+
+    async def run(self, job: CrawlJob) -> dict:
+        """Crawl and return crawl_and_extract's summary"""
+        try:
+            result = await self._crawl(job)
+        except Exception:
+            crawl_jobs.inc(transport=self.transport, status="error")
+            raise
+        crawl_jobs.inc(transport=self.transport, status="success")
+        return result
+
+    async def _run_logged(self, job: CrawlJob):
+        try:
+            await self.run(job)
+        except Exception as e:
+            logger.warning("Crawl error for %s: %s", job.business_id, e)
+
+    def submit(self, job: CrawlJob):
+        """Start the crawl without waiting for it; errors are logged"""
+        task = asyncio.create_task(self._run_logged(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        self._tasks.clear()
+
+
+class QueuedCrawlService(CrawlService):
+    """Crawls on a queue drained by a fixed number of worker tasks; a business already queued isn't queued twice"""
+    transport = "queue"
+
+    def __init__(self, workers: int):
+        super().__init__()
+        self.workers = max(1, workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list = []
+        # business_id -> future of its queued or running crawl
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def _start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def _work(self):
+        while True:
+            job, future = await self._queue.get()
+            try:
+                result = await CrawlService.run(self, job)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._pending.pop(job.business_id, None)
+                self._queue.task_done()
+
+    def _enqueue(self, job: CrawlJob) -> asyncio.Future:
+        self._start()
+        future = self._pending.get(job.business_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            # Nobody may await a submitted crawl; don't report its error as never retrieved
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._pending[job.business_id] = future
+            self._queue.put_nowait((job, future))
+        return future
+
+    async def run(self, job: CrawlJob) -> dict:
+        return await asyncio.shield(self._enqueue(job))
+
+    def submit(self, job: CrawlJob):
+        self._enqueue(job)
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        for future in self._pending.values():
+            future.cancel()
+        self._workers, self._pending, self._queue = [], {}, None
+        await super().close()
+
+
+class RemoteCrawlService(CrawlService):
+    """POSTs to the /product-crawl/ endpoint of another deployment"""
+    transport = "http"
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.url = base_url.rstrip('/') + "/product-crawl/"
+
+    async def _crawl(self, job: CrawlJob) -> dict:
+        from src.integrations.clients import get_http_client
+
+        from src.services.recrawl_tokens import crawl_service_token, recrawl_token
+
+        # The crawl deployment shares SECRET_KEY, so this deployment can sign for the business
+        body = {**asdict(job), "recrawl_token": recrawl_token(job.business_id)}
+        headers = {"X-Crawl-Service-Token": crawl_service_token() or ""}
+        response = await get_http_client().post(self.url, json=body, headers=headers, timeout=REMOTE_CRAWL_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+
+_crawl_service: Optional[CrawlService] = None
+
+
+def get_crawl_service() -> CrawlService:
+    global _crawl_service
+    if _crawl_service is None:
+        settings = get_settings()
+        transport = settings.crawl_transport.lower()
+        if transport == "http":
+            if not settings.crawl_service_url:
+                raise RuntimeError("CRAWL_TRANSPORT=http needs CRAWL_SERVICE_URL")
+            _crawl_service = RemoteCrawlService(settings.crawl_service_url)
+        elif transport == "inline":
+            _crawl_service = CrawlService()
+        elif transport == "queue":
+            _crawl_service = QueuedCrawlService(settings.crawl_queue_workers)
+        else:
+            raise RuntimeError(f"Unknown CRAWL_TRANSPORT {settings.crawl_transport!r} (queue, inline or http)")
+    return _crawl_service
+
+
+async def shutdown_crawl_service():
+    global _crawl_service
+    if _crawl_service is not None:
+        await _crawl_service.close()
+        _crawl_service = None
@@ -0,0 +1,174 @@
+"""
+In-process Prometheus-style metrics, rendered in the text exposition format at /metrics.
+"""
+import math
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_registry: List["_Metric"] = []
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(series[-1])}")
+        return lines
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests",
+    ["method", "route", "status"],
+)
+phase_duration = Histogram(
+    "request_phase_duration_seconds",
+    "Time spent in a named phase (db, filter, llm, fetch, parse, ...) of a request or background job",
+    ["route", "phase"],
+)
+crawl_extractions = Counter(
+    "crawl_extractions_total",
+    "Listing crawls by the extraction tier that produced the products (shopify_json, woocommerce, json_ld, html, rendered, none)",
+    ["source"],
+)
+crawl_fetch_aborts = Counter(
+    "crawl_fetch_aborts_total",
+    "Crawler fetches abandoned before or while reading the body (content_type, too_large, binary)",
+    ["reason"],
+)
+crawl_jobs = Counter(
+    "crawl_jobs_total",
+    "Product crawls started through the crawl service, by transport (queue, inline, http) and outcome",
+    ["transport", "status"],
+)
+agent_answers = Counter(
+    "agent_answers_total",
+    "/agent/ask answers by how they were written (llm, template, degraded when no model answered in time, static for no-product replies)",
+    ["source"],
+)
+single_flight_calls = Counter(
+    "single_flight_calls_total",
+    "Coalesced calls by operation: leader ran the work, shared awaited an identical in-flight call",
+    ["operation", "result"],
+)
+llm_calls = Counter(
+    "llm_calls_total",
+    "LLM calls by model and outcome (ok, error, timeout, cancelled when the request went away, hedge for hedged calls started)",
+    ["model", "outcome"],
+)
+degraded_answers = Counter(
+    "degraded_answers_total",
+    "Answers sent with products only because no model answered within the latency budget, by agent and reason",
+    ["agent", "reason"],
+)
+cancelled_requests = Counter(
+    "cancelled_requests_total",
+    "Requests whose work was cancelled before answering: disconnect (client went away), or cancelled by request id because the visitor asked again (superseded), closed the chat (closed) or left the page (left)",
+    ["route", "reason"],
+)
+abandoned_calls = Counter(
+    "abandoned_calls_total",
+    "In-flight catalog fetches and LLM answers cancelled because every request waiting on them was cancelled",
+    ["operation"],
+)
+crawl_archive_records = Counter(
+    "crawl_archive_records_total",
+    "Crawled responses sent to the archive: written, dropped (writer too far behind) or failed",
+    ["result"],
+)
@@ -0,0 +1,166 @@
+"""
+Model routing and latency budgets for LLM answers.
+
+route_model() picks a model tier from the detected intents and the prompt
+size: plain searches with short prompts go to the fast tier, comparisons,
+recommendations and long prompts to the standard tier. complete() then runs
+the call within the request's LatencyBudget:
+
+- every attempt gets the remaining budget as its SDK timeout, without SDK retries
+- if the first call hasn't answered by half of the remaining budget, a hedged
+  call goes to the fast model and whichever answers first wins
+- a call that fails is replaced by the fast model while there is budget left
+- when the budget runs out (or every attempt failed) LLMUnavailable is raised
+  and the caller answers with products only
+- if the caller is cancelled (client gone), every attempt is cancelled with it
+
+call may be a blocking SDK call (run in a thread, which finishes on its own
+when abandoned) or a coroutine function on an async client, whose HTTP
+request is closed when the attempt is abandoned.
+
+    budget = LatencyBudget(get_settings().agent_latency_budget_ms / 1000)
+    route = route_model("anthropic", intents, estimate_tokens(prompt))
+    text = await complete(partial(call, prompt), route, budget)
+"""
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from src.config.settings import get_settings
+from src.services.metrics import llm_calls
+
+logger = logging.getLogger(__name__)
+
+FAST = "fast"
+STANDARD = "standard"
+# Intents that need the stronger model
+STANDARD_INTENTS = {'compare', 'recommend'}
+# Hedge once this share of the remaining budget has passed without an answer
+HEDGE_AFTER_FRACTION = 0.5
+# Don't start an attempt with less time than this left
+MIN_ATTEMPT_SECONDS = 0.25
+
+
+class LLMUnavailable(Exception):
+    """No model answered within the latency budget"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class LatencyBudget:
+    """Deadline for a request, counted from `started` (time.perf_counter()) or now"""
+
+    def __init__(self, seconds: float, started: Optional[float] = None):
+        self.deadline = (started if started is not None else time.perf_counter()) + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.perf_counter())
+
+
+@dataclass(frozen=True)
+class Route:
+    tier: str
+    model: str
+    # Model for hedged and fallback calls
+    fallback: str
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def models(provider: str) -> Dict[str, str]:
+    settings = get_settings()
+    if provider == "openai":
+        return {FAST: settings.openai_fast_model, STANDARD: settings.openai_standard_model}
+    return {FAST: settings.llm_fast_model, STANDARD: settings.llm_standard_model}
+
+
+def route_model(provider: str, intents: List[str], prompt_tokens: int) -> Route:
+    """Model tier for a question: fast for plain searches, standard for compare/recommend or long prompts"""
+    tiers = models(provider)
+    large = prompt_tokens > get_settings().llm_large_prompt_tokens
+    tier = STANDARD if large or STANDARD_INTENTS.intersection(intents) else FAST
+    return Route(tier=tier, model=tiers[tier], fallback=tiers[FAST])
+
+
+def attempt_client(client, timeout: float):
+    """SDK client for one attempt: the remaining budget as its timeout and no SDK retries (complete() falls back)"""
+    return client.with_options(timeout=timeout, max_retries=0)
+
+
+def _drop(task: asyncio.Task):
+    """Abandon an attempt; a blocking call's thread finishes on its own (bounded by the SDK timeout)"""
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+async def complete(call: Callable[[str, float], Union[str, Awaitable[str]]], route: Route,
+                   budget: LatencyBudget) -> str:
+    """
+    Text from call(model, timeout_seconds) within the budget, hedging and
+    falling back to route.fallback
+    """
+    attempts: Dict[asyncio.Task, str] = {}
+    spare = True  # the one hedge/fallback attempt is still unused
+    is_async = inspect.iscoroutinefunction(call)
+
+    def start(model: str):
+        work = call(model, budget.remaining()) if is_async else asyncio.to_thread(call, model, budget.remaining())
+        attempts[asyncio.ensure_future(work)] = model
+
+    if budget.remaining() < MIN_ATTEMPT_SECONDS:
+        raise LLMUnavailable("timeout")
+    start(route.model)
+    try:
+        return await _first_answer(attempts, start, route, budget, spare)
+    except asyncio.CancelledError:
+        for task, model in attempts.items():
+            llm_calls.inc(model=model, outcome="cancelled")
+            _drop(task)
+        raise
+
+
+async def _first_answer(attempts: Dict[asyncio.Task, str], start: Callable[[str], None], route: Route,
+                        budget: LatencyBudget, spare: bool) -> str:
+    hedge_at = time.perf_counter() + budget.remaining() * HEDGE_AFTER_FRACTION
+
+    while attempts:
+        wait_until = hedge_at if spare else budget.deadline
+        done, _ = await asyncio.wait(
+            attempts, timeout=max(0.0, wait_until - time.perf_counter()), return_when=asyncio.FIRST_COMPLETED
+        )
+
+        if not done:
+            if not spare:
+                break  # deadline
+            spare = False
+            if budget.remaining() >= MIN_ATTEMPT_SECONDS:
+                llm_calls.inc(model=route.fallback, outcome="hedge")
+                start(route.fallback)
+            continue
+
+        for task in done:
+            model = attempts.pop(task)
+            if task.exception() is None:
+                llm_calls.inc(model=model, outcome="ok")
+                for other in attempts:
+                    _drop(other)
+                return task.result()
+            llm_calls.inc(model=model, outcome="error")
+            logger.warning("LLM call to %s failed: %s", model, task.exception())
+            if spare and budget.remaining() >= MIN_ATTEMPT_SECONDS:
+                spare = False
+                start(route.fallback)
+
+    reason = "timeout" if attempts else "error"
+    for task, model in attempts.items():
+        llm_calls.inc(model=model, outcome="timeout")
+        _drop(task)
+    attempts.clear()
+    raise LLMUnavailable(reason)
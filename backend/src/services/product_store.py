@@ -0,0 +1,199 @@
+"""
+Product writes keyed on (business_id, url).
+
+Crawls and recrawls write through ProductWriter: each batch is compared with the
+rows already stored for the business, only new and changed rows are sent
+(upserts on business_id,url, which needs a unique index on products(business_id, url)
+in Supabase), chunks are sized by JSON payload and written concurrently, and
+products that are no longer on the site are marked out of stock.
+"""
+import asyncio
+import json
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+from src.database.supabase_client import get_supabase_client
+from src.middleware.timing import span
+from src.services.usage import usage_tracker
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_KEY = "business_id,url"
+MAX_CHUNK_BYTES = 256 * 1024
+MAX_CHUNK_ROWS = 500
+WRITE_CONCURRENCY = 4
+READ_PAGE_SIZE = 1000
+# Out-of-stock updates filter on url=in.(...) in the query string; keep each request's URL well under proxy limits
+MARK_CHUNK_URLS = 50
+MARK_CHUNK_BYTES = 4 * 1024
+
+# Set on insert only, so recrawls don't reset them
+INSERT_ONLY_COLUMNS = ('created_at',)
+# Columns a recrawl compares against the stored row to decide whether to update it
+COMPARED_COLUMNS = ('name', 'price', 'description', 'images', 'in_stock', 'category', 'colors', 'sizes')
+
+
+@dataclass
+class WriteResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    marked_out_of_stock: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def product_row(product: dict, business_id: str) -> dict:
+    """Products table row for an extracted product"""
+    return {
+        'business_id': business_id,
+        'name': product['name'],
+        'price': product['price'],
+        'description': product['description'],
+        'images': [product['image_url']] if product['image_url'] else [],
+        'url': product['url'],
+        'in_stock': product.get('in_stock', True),
+        'category': product.get('category'),
+        'colors': product.get('colors', []),
+        'sizes': product.get('sizes', []),
+        'created_at': datetime.utcnow().isoformat(),
+    }
+
+
+def chunk_rows(rows: List[dict], max_bytes: int = MAX_CHUNK_BYTES, max_rows: int = MAX_CHUNK_ROWS) -> List[List[dict]]:
+    """Split rows into chunks whose JSON payload stays under max_bytes (a larger single row gets its own chunk)"""
+    chunks: List[List[dict]] = []
+    chunk: List[dict] = []
+    size = 0
+    for row in rows:
+        row_size = len(json.dumps(row, default=str)) + 1
+        if chunk and (size + row_size > max_bytes or len(chunk) >= max_rows):
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(row)
+        size += row_size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def chunk_urls(urls: List[str], max_bytes: int = MARK_CHUNK_BYTES, max_urls: int = MARK_CHUNK_URLS) -> List[List[str]]:
+    """Split URLs for in_() filters so each chunk's percent-encoded length stays under max_bytes"""
+    chunks: List[List[str]] = []
+    chunk: List[str] = []
+    size = 0
+    for url in urls:
+        url_size = len(quote(url, safe='')) + 3  # quotes and comma
+        if chunk and (size + url_size > max_bytes or len(chunk) >= max_urls):
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(url)
+        size += url_size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def stored_products(business_id: str) -> Dict[str, dict]:
+    """url -> stored url, in_stock and compared columns for every product of the business"""
+    supabase = get_supabase_client()
+    stored: Dict[str, dict] = {}
+    start = 0
+    while True:
+        with span("db"):
+            rows = supabase.table('products').select(','.join(('url',) + COMPARED_COLUMNS)).eq('business_id', business_id) \
+                .order('url').range(start, start + READ_PAGE_SIZE - 1).execute().data or []
+        for row in rows:
+            if row.get('url'):
+                stored[row['url']] = row
+        if len(rows) < READ_PAGE_SIZE:
+            return stored
+        start += READ_PAGE_SIZE
+
+
+def _changed(row: dict, existing: dict) -> bool:
+    return any(existing.get(k) != row[k] for k in COMPARED_COLUMNS if k in row)
+
+
+class ProductWriter:
+    """
+    Writes one crawl's products for a business:
+
+        writer = ProductWriter(business_id)
+        await writer.write(rows)       # any number of batches
+        result = await writer.finish(mark_missing=crawl_was_complete)
+    """
+
+    def __init__(self, business_id: str, concurrency: int = WRITE_CONCURRENCY):
+        self.business_id = business_id
+        self.result = WriteResult()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._stored: Optional[Dict[str, dict]] = None
+        self._seen: set = set()
+
+    async def _load(self) -> Dict[str, dict]:
+        if self._stored is None:
+            self._stored = await asyncio.to_thread(stored_products, self.business_id)
+        return self._stored
+
+    def _upsert(self, rows: List[dict]):
+        supabase = get_supabase_client()
+        with span("insert"):
+            supabase.table('products').upsert(rows, on_conflict=PRODUCT_KEY).execute()
+
+    async def _write_chunk(self, rows: List[dict]):
+        async with self._semaphore:
+            await asyncio.to_thread(self._upsert, rows)
+
+    async def _upsert_all(self, rows: List[dict]):
+        await asyncio.gather(*(self._write_chunk(chunk) for chunk in chunk_rows(rows)))
+
+    async def write(self, rows: Iterable[dict]):
+        """Insert new products and update changed ones; rows without a url are skipped"""
+        stored = await self._load()
+        new, changed = [], []
+        for row in rows:
+            url = row.get('url')
+            if not url or url in self._seen:
+                continue
+            self._seen.add(url)
+            row = {**row, 'business_id': self.business_id}
+            existing = stored.get(url)
+            if existing is None:
+                new.append(row)
+            elif _changed(row, existing):
+                changed.append({k: v for k, v in row.items() if k not in INSERT_ONLY_COLUMNS})
+            else:
+                self.result.unchanged += 1
+
+        # New and changed rows go in separate upserts so every row in a request has the same columns
+        await asyncio.gather(self._upsert_all(new), self._upsert_all(changed))
+        self.result.inserted += len(new)
+        self.result.updated += len(changed)
+
+    def _mark_out_of_stock(self, urls: List[str]):
+        supabase = get_supabase_client()
+        with span("db"):
+            supabase.table('products').update({'in_stock': False}) \
+                .eq('business_id', self.business_id).in_('url', urls).execute()
+
+    async def finish(self, mark_missing: bool = True) -> WriteResult:
+        """
+        Mark stored products this crawl didn't see as out of stock. Only pass
+        mark_missing=True when the crawl covered the whole catalog.
+        """
+        if mark_missing:
+            stored = await self._load()
+            missing = [url for url, row in stored.items() if url not in self._seen and row.get('in_stock') is not False]
+            for chunk in chunk_urls(missing):
+                await asyncio.to_thread(self._mark_out_of_stock, chunk)
+            self.result.marked_out_of_stock = len(missing)
+
+        if self.result.inserted or self.result.marked_out_of_stock:
+            usage_tracker.invalidate(self.business_id)
+        logger.info("Products written", extra={"business_id": self.business_id, **self.result.as_dict()})
+        return self.result
@@ -0,0 +1,287 @@
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from src.config.settings import get_settings
+from src.middleware.timing import span
+
+logger = logging.getLogger(__name__)
+
+# One directory per business, each holding append-only Parquet part files:
+#   <query_log_dir>/<business_id>/part-<ms>-<rand>.parquet
+_schema = None
+
+
+def get_schema():
+    """Parquet schema of the log; pyarrow is only imported once rows are written or read"""
+    global _schema
+    if _schema is None:
+        import pyarrow as pa
+        _schema = pa.schema([
+            ("timestamp", pa.timestamp("ms", tz="UTC")),
+            ("question", pa.string()),
+            ("normalized_question", pa.string()),
+            ("min_price", pa.float64()),
+            ("max_price", pa.float64()),
+            ("categories", pa.list_(pa.string())),
+            ("colors", pa.list_(pa.string())),
+            ("products_fetched", pa.int32()),
+            ("result_count", pa.int32()),
+            ("latency_ms", pa.float64()),
+            # llm, template or static; null in parts written before it was recorded
+            ("answer_source", pa.string()),
+        ])
+    return _schema
+
+FLUSH_ROWS = 500
+FLUSH_INTERVAL_SECONDS = 30.0
+COMPACT_AFTER_PARTS = 64
+# Under query_log_dir; sanitized business ids can't contain "."
+COMPACTING_DIR = ".compacting"
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace so repeats group together"""
+    text = re.sub(r"[^\w\s$.-]", " ", question.lower())
+    return re.sub(r"\s+", " ", text).strip(" .-")
+
+
+class QueryLog:
+    """Buffers query rows in memory and flushes them as Parquet parts per business"""
+
+    def __init__(self, log_dir: str):
+        self.log_dir = log_dir
+        self._lock = threading.Lock()
+        # Serializes part writes, compaction and scans of the part files
+        self._files_lock = threading.Lock()
+        self._buffers: Dict[str, List[dict]] = {}
+        self._buffered_rows = 0
+        self._last_flush = time.monotonic()
+        self._flush_due = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def record(
+        self,
+        business_id: str,
+        question: str,
+        min_price: float,
+        max_price: float,
+        categories: List[str],
+        colors: List[str],
+        products_fetched: int,
+        result_count: int,
+        latency_ms: float,
+        answer_source: Optional[str] = None,
+    ):
+        row = {
+            "timestamp": datetime.now(timezone.utc),
+            "question": question,
+            "normalized_question": normalize_question(question),
+            "min_price": min_price if min_price > 0 else None,
+            "max_price": max_price if max_price != float("inf") else None,
+            "categories": list(categories),
+            "colors": list(colors),
+            "products_fetched": products_fetched,
+            "result_count": result_count,
+            "latency_ms": round(latency_ms, 3),
+            "answer_source": answer_source,
+        }
+
+        # Only buffered here: record() is called from request handlers, the writing happens on the flusher thread
+        with self._lock:
+            self._buffers.setdefault(business_id, []).append(row)
+            self._buffered_rows += 1
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher, name="query-log-flush", daemon=True)
+                self._flusher.start()
+            if self._buffered_rows >= FLUSH_ROWS:
+                self._flush_due.set()
+
+    def _run_flusher(self):
+        """Flushes every FLUSH_INTERVAL_SECONDS, or as soon as FLUSH_ROWS rows are buffered"""
+        while True:
+            self._flush_due.wait(FLUSH_INTERVAL_SECONDS)
+            self._flush_due.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning("Query log flush failed: %s", e)
+
+    def flush(self, business_id: Optional[str] = None):
+        """Write buffered rows to new part files (all businesses, or just one); blocks, keep it off the event loop"""
+        with self._lock:
+            if business_id is None:
+                pending, self._buffers = self._buffers, {}
+                self._buffered_rows = 0
+                self._last_flush = time.monotonic()
+            else:
+                rows = self._buffers.pop(business_id, [])
+                self._buffered_rows -= len(rows)
+                pending = {business_id: rows} if rows else {}
+
+        with self._files_lock:
+            for bid, rows in pending.items():
+                self._write_part(bid, rows)
+
+    def _business_dir(self, business_id: str) -> str:
+        # business_id comes from the request, never let it escape log_dir
+        safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", business_id)
+        return os.path.join(self.log_dir, safe_id)
+
+    def _write_part(self, business_id: str, rows: List[dict]):
+        if not rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = self._business_dir(business_id)
+        os.makedirs(path, exist_ok=True)
+
+        table = pa.Table.from_pylist(rows, schema=get_schema())
+        part_name = f"part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.parquet"
+        pq.write_table(table, os.path.join(path, part_name), compression="zstd")
+
+        parts = [f for f in os.listdir(path) if f.endswith(".parquet")]
+        if len(parts) > COMPACT_AFTER_PARTS:
+            self._compact(path, parts)
+
+    def _compact(self, path: str, parts: List[str]):
+        """Merge many small part files into one so scans stay cheap"""
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        table = ds.dataset([os.path.join(path, p) for p in parts], schema=get_schema(), format="parquet").to_table()
+        merged_name = f"part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.parquet"
+        # Written next to the business directories, not in one, so scans never see a half-written file
+        tmp_dir = os.path.join(self.log_dir, COMPACTING_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(tmp_dir, merged_name)
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, os.path.join(path, merged_name))
+        for p in parts:
+            os.remove(os.path.join(path, p))
+
+    def load(self, business_id: str, days: int, columns: List[str], only_zero_results: bool = False):
+        """Scan a business's log for the last `days` days, reading only `columns` (blocking)"""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        self.flush(business_id)
+        schema = get_schema()
+
+        path = self._business_dir(business_id)
+        if not os.path.isdir(path):
+            return schema.empty_table().select(columns)
+
+        since = pa.scalar(datetime.now(timezone.utc) - timedelta(days=days), type=schema.field("timestamp").type)
+        condition = ds.field("timestamp") >= since
+        if only_zero_results:
+            condition = condition & (ds.field("result_count") == 0)
+
+        with span("scan"), self._files_lock:
+            dataset = ds.dataset(path, schema=schema, format="parquet")
+            return dataset.to_table(columns=columns, filter=condition)
+
+
+def top_queries(business_id: str, days: int = 30, limit: int = 20) -> List[dict]:
+    table = get_query_log().load(business_id, days, ["normalized_question", "result_count", "latency_ms"])
+    if table.num_rows == 0:
+        return []
+
+    grouped = table.group_by("normalized_question").aggregate([
+        ("normalized_question", "count"),
+        ("result_count", "mean"),
+        ("latency_ms", "mean"),
+    ])
+    grouped = grouped.sort_by([("normalized_question_count", "descending")]).slice(0, limit)
+
+    return [
+        {
+            "query": row["normalized_question"],
+            "count": row["normalized_question_count"],
+            "avg_results": round(row["result_count_mean"], 2),
+            "avg_latency_ms": round(row["latency_ms_mean"], 2),
+        }
+        for row in grouped.to_pylist()
+    ]
+
+
+def zero_result_queries(business_id: str, days: int = 30, limit: int = 20) -> List[dict]:
+    table = get_query_log().load(business_id, days, ["normalized_question", "timestamp"], only_zero_results=True)
+    if table.num_rows == 0:
+        return []
+
+    grouped = table.group_by("normalized_question").aggregate([
+        ("normalized_question", "count"),
+        ("timestamp", "max"),
+    ])
+    grouped = grouped.sort_by([("normalized_question_count", "descending")]).slice(0, limit)
+
+    return [
+        {
+            "query": row["normalized_question"],
+            "count": row["normalized_question_count"],
+            "last_seen": row["timestamp_max"].isoformat(),
+        }
+        for row in grouped.to_pylist()
+    ]
+
+
+def latency_percentiles(business_id: str, days: int = 30) -> dict:
+    import pyarrow.compute as pc
+
+    table = get_query_log().load(business_id, days, ["latency_ms", "result_count"])
+    total = table.num_rows
+    if total == 0:
+        return {"count": 0, "zero_result_rate": 0.0, "latency_ms": {}}
+
+    latency = table.column("latency_ms")
+    quantiles = pc.quantile(latency, q=[0.5, 0.9, 0.95, 0.99]).to_pylist()
+    zero_results = pc.sum(pc.equal(table.column("result_count"), 0)).as_py() or 0
+
+    return {
+        "count": total,
+        "zero_result_rate": round(zero_results / total, 4),
+        "latency_ms": {
+            "mean": round(pc.mean(latency).as_py(), 2),
+            "p50": round(quantiles[0], 2),
+            "p90": round(quantiles[1], 2),
+            "p95": round(quantiles[2], 2),
+            "p99": round(quantiles[3], 2),
+            "max": round(pc.max(latency).as_py(), 2),
+        },
+    }
+
+
+def answer_sources(business_id: str, days: int = 30) -> dict:
+    """How answers were written (llm, template, degraded, static) and the share made without an LLM call"""
+    table = get_query_log().load(business_id, days, ["answer_source"])
+    counts = {
+        row["values"]: row["counts"]
+        for row in table.column("answer_source").value_counts().to_pylist()
+        if row["values"] is not None
+    }
+    recorded = sum(counts.values())
+    # Degraded answers waited on an LLM call that didn't answer in time
+    without_llm = recorded - counts.get("llm", 0) - counts.get("degraded", 0)
+    return {
+        "count": recorded,
+        "sources": counts,
+        "without_llm": without_llm,
+        "without_llm_rate": round(without_llm / recorded, 4) if recorded else 0.0,
+    }
+
+
+_query_log: Optional[QueryLog] = None
+
+
+def get_query_log() -> QueryLog:
+    global _query_log
+    if _query_log is None:
+        _query_log = QueryLog(get_settings().query_log_dir)
+    return _query_log
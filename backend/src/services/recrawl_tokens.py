@@ -0,0 +1,59 @@
+"""
+Recrawl tokens: proof that a caller may overwrite a business's catalog.
+
+The first crawl of a business (POST /api/crawl) returns
+HMAC-SHA256(SECRET_KEY, "recrawl:<business_id>"); recrawls of that business
+(/api/crawl with business_id, /product-crawl/) must send it back. Deployments
+that crawl for each other (CRAWL_TRANSPORT=http) share SECRET_KEY and sign
+their own requests (and send crawl_service_token() as X-Crawl-Service-Token,
+which exempts them from the per-IP crawl limit: every job comes from one
+address). With the default SECRET_KEY anyone can compute a token,
+so none are issued and recrawls are refused.
+"""
+import hashlib
+import hmac
+from typing import Optional
+
+from fastapi import HTTPException
+
+from src.config.settings import get_settings
+
+# settings.secret_key's default, public in the source
+DEFAULT_SECRET_KEY = "dev_secret"
+
+
+def _secret() -> Optional[bytes]:
+    secret = get_settings().secret_key
+    if not secret or secret == DEFAULT_SECRET_KEY:
+        return None
+    return secret.encode('utf-8')
+
+
+def recrawl_token(business_id: str) -> Optional[str]:
+    """The business's recrawl token; None while SECRET_KEY is unset or the default"""
+    secret = _secret()
+    if secret is None:
+        return None
+    return hmac.new(secret, f"recrawl:{business_id}".encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def crawl_service_token() -> Optional[str]:
+    """Signs a deployment's own requests to the crawl deployment (CRAWL_TRANSPORT=http)"""
+    secret = _secret()
+    if secret is None:
+        return None
+    return hmac.new(secret, b"crawl-service", hashlib.sha256).hexdigest()
+
+
+def is_crawl_service(token: Optional[str]) -> bool:
+    expected = crawl_service_token()
+    return bool(expected and token and hmac.compare_digest(token, expected))
+
+
+def check_recrawl_token(business_id: str, token: Optional[str]):
+    """Raise 403 unless token is the business's recrawl token (503 when tokens can't be trusted)"""
+    expected = recrawl_token(business_id)
+    if expected is None:
+        raise HTTPException(status_code=503, detail="Recrawls are disabled until SECRET_KEY is set")
+    if not token or not hmac.compare_digest(token, expected):
+        raise HTTPException(status_code=403, detail="Recrawls need the business's recrawl_token")
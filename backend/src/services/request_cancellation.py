@@ -0,0 +1,103 @@
+"""
+Request-scoped cancellation.
+
+A shopper who closes the widget or asks again no longer reads the answer, but
+the handler would keep running its catalog fetch and LLM call to the end.
+cancellable.run() runs the handler's work in a task that is cancelled when
+
+- the client disconnects (http.disconnect on the ASGI receive channel), or
+- POST /agent/cancel/{request_id} names its request id (the X-Request-ID the
+  widget sent; RequestIdMiddleware reuses it), for proxies that keep the
+  upstream connection open after the browser aborts
+
+Request ids are chosen by clients, so they are scoped to the caller
+(client_key: the client IP): a cancel only reaches requests from the same
+client, and a request reusing an id still in flight for that client is
+rejected with 409 rather than cancelling the first.
+
+    return await cancellable.run(request, "/agent/ask", lambda: answer(req))
+
+Cancellation reaches whatever the work is awaiting: coalesced calls made with
+single_flight.run(..., cancel_abandoned=True) stop once no request waits on
+them, and async SDK calls close their HTTP request. The registry is per
+process; a cancel that reaches another worker finds nothing and the client's
+disconnect still applies.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Tuple, TypeVar
+
+from fastapi import HTTPException, Request
+
+from src.config.logging_config import request_id_var
+from src.middleware.rate_limit import client_key
+from src.services.metrics import cancelled_requests
+
+T = TypeVar('T')
+
+# nginx's "client closed request"; nobody is usually left to read it
+CLIENT_CLOSED_REQUEST = 499
+# Why a client cancels: it asked again, closed the chat, or left the page
+CANCEL_REASONS = ("superseded", "closed", "left")
+
+
+async def _disconnected(request: Request):
+    """Returns when the client goes away; the request body must already have been read"""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+class CancellableRequests:
+    def __init__(self):
+        # (client_key, request_id) -> task running the request's work
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        # (client_key, request_id) -> why it was cancelled through cancel()
+        self._reasons: Dict[Tuple[str, str], str] = {}
+
+    async def run(self, request: Request, route: str, work: Callable[[], Awaitable[T]]) -> T:
+        """work()'s result, or a 499 HTTPException if the client disconnected or the request was cancelled"""
+        key = (client_key(request), request_id_var.get())
+        previous = self._tasks.get(key)
+        if previous is not None and not previous.done():
+            raise HTTPException(status_code=409, detail="A request with this X-Request-ID is already in flight")
+        task = asyncio.ensure_future(work())
+        watcher = asyncio.ensure_future(_disconnected(request))
+        self._tasks[key] = task
+        try:
+            await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if task.done() and not task.cancelled():
+                return task.result()
+            reason = self._reasons.pop(key, None) or "disconnect"
+            task.cancel()
+            # Let the work unwind (its finally blocks, abandoned calls) before answering
+            await asyncio.wait({task})
+            cancelled_requests.inc(route=route, reason=reason)
+            raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Request cancelled")
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            watcher.cancel()
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+                self._reasons.pop(key, None)
+
+    def cancel(self, request: Request, request_id: str, reason: str = "superseded") -> bool:
+        """
+        Cancel the calling client's in-flight request with this id; False if
+        there is none (finished, another client's, or on another worker)
+        """
+        key = (client_key(request), request_id)
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            return False
+        self._reasons[key] = reason
+        task.cancel()
+        return True
+
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+
+cancellable = CancellableRequests()
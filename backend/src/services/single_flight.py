@@ -0,0 +1,85 @@
+"""
+Single-flight coalescing of duplicate concurrent work.
+
+Calls keyed by (business_id, operation, normalized args) that arrive while an
+identical call is in flight await that call's result instead of starting their
+own: two crawl triggers for one store run one crawl, and a burst of the same
+widget question makes one catalog fetch and one LLM call. Nothing is cached;
+the key is forgotten as soon as the call finishes.
+
+    products = await single_flight.run(business_id, "catalog", columns, lambda: fetch(...))
+
+The work runs in its own task, so a caller that is cancelled (client gone)
+doesn't fail the others waiting on it. With cancel_abandoned=True the work is
+cancelled once every caller waiting on it has been cancelled, so nobody pays
+for a catalog fetch or LLM answer that no client will read.
+"""
+import asyncio
+import weakref
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from src.services.metrics import abandoned_calls, single_flight_calls
+
+T = TypeVar('T')
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        # Per event loop (tasks belong to one loop); loop -> {key: flight}
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _Flight]]" = \
+            weakref.WeakKeyDictionary()
+
+    def _tasks(self) -> Dict[Hashable, _Flight]:
+        loop = asyncio.get_running_loop()
+        tasks = self._inflight.get(loop)
+        if tasks is None:
+            tasks = self._inflight[loop] = {}
+        return tasks
+
+    async def run(self, business_id: Optional[str], operation: str, args: Hashable,
+                  fn: Callable[[], Awaitable[T]], cancel_abandoned: bool = False) -> T:
+        """fn()'s result, shared with every concurrent call for the same key"""
+        key = (business_id, operation, args)
+        tasks = self._tasks()
+        flight = tasks.get(key)
+        if flight is None:
+            single_flight_calls.inc(operation=operation, result="leader")
+            flight = tasks[key] = _Flight(asyncio.ensure_future(fn()))
+
+            def done(finished: asyncio.Task, flight: _Flight = flight):
+                if tasks.get(key) is flight:
+                    del tasks[key]
+                # Every caller may have gone; don't log the error as never retrieved
+                if not finished.cancelled():
+                    finished.exception()
+
+            flight.task.add_done_callback(done)
+        else:
+            single_flight_calls.inc(operation=operation, result="shared")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if cancel_abandoned and flight.waiters == 1 and not flight.task.done():
+                # Last caller gone: stop the work, and let a new caller start afresh
+                if tasks.get(key) is flight:
+                    del tasks[key]
+                flight.task.cancel()
+                abandoned_calls.inc(operation=operation)
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def in_flight(self) -> int:
+        return sum(len(tasks) for tasks in self._inflight.values())
+
+
+single_flight = SingleFlight()
+
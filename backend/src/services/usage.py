@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from src.config.settings import get_settings
+from src.database.supabase_client import get_supabase_client
+from src.services.cache import TTLCache
+from src.middleware.timing import span
+
+logger = logging.getLogger(__name__)
+
+TIERS_TTL_SECONDS = 600
+RECONCILE_INTERVAL_SECONDS = 300
+# After a failed reconcile, try Supabase again this soon
+RECONCILE_RETRY_SECONDS = 15
+# Usage entries are keyed by the request's business_id: bounded, and idle ones expire
+USAGE_TTL_SECONDS = 3600
+USAGE_MAX_ENTRIES = 10000
+
+DEFAULT_TIER = {'name': 'Free', 'max_products': 50, 'max_conversations': 100}
+
+# pricing_tiers rarely changes, so the whole table is cached under one key
+_tiers_cache = TTLCache(ttl_seconds=TIERS_TTL_SECONDS, max_entries=1)
+
+
+def list_tiers_cached() -> List[dict]:
+    """All pricing tiers, read from Supabase at most once per TIERS_TTL_SECONDS"""
+    def load():
+        supabase = get_supabase_client()
+        with span("db"):
+            return supabase.table('pricing_tiers').select('*').execute().data or []
+
+    return _tiers_cache.get_or_load('tiers', load)
+
+
+def invalidate_tiers():
+    _tiers_cache.invalidate()
+
+
+def current_month() -> str:
+    return datetime.utcnow().strftime('%Y-%m')
+
+
+@dataclass
+class BusinessUsage:
+    found: bool = True
+    tier_id: Optional[str] = None
+    tier: dict = field(default_factory=lambda: dict(DEFAULT_TIER))
+    products: int = 0
+    conversations: int = 0
+    # businesses.answer_mode ("auto" or "llm"); None uses AGENT_ANSWER_MODE
+    answer_mode: Optional[str] = None
+    month: str = field(default_factory=current_month)
+    reconciled_at: float = 0.0
+
+
+class UsageTracker:
+    """
+    Per-business usage counters kept in memory.
+    Conversations are counted locally as they happen; every RECONCILE_INTERVAL_SECONDS
+    the tier, product count and monthly conversation count are re-read from Supabase.
+    Async handlers call refresh() first so that re-read runs in a thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # business_id -> BusinessUsage; ids that aren't businesses only stay one reconcile interval
+        self._usage = TTLCache(ttl_seconds=USAGE_TTL_SECONDS, max_entries=USAGE_MAX_ENTRIES)
+
+    def _stale(self, usage: Optional[BusinessUsage]) -> bool:
+        return usage is None or time.monotonic() - usage.reconciled_at >= RECONCILE_INTERVAL_SECONDS
+
+    def get(self, business_id: str) -> BusinessUsage:
+        usage = self._usage.get(business_id)
+        if self._stale(usage):
+            usage = self.reconcile(business_id)
+        elif usage.month != current_month():
+            with self._lock:
+                usage.month = current_month()
+                usage.conversations = 0
+        return usage
+
+    async def refresh(self, business_id: str) -> BusinessUsage:
+        """get() for async handlers: a due reconcile runs in a thread, off the event loop"""
+        if self._stale(self._usage.get(business_id)):
+            await asyncio.to_thread(self.reconcile, business_id)
+        usage = self.get(business_id)
+        if usage.tier_id is not None and _tiers_cache.get('tiers') is None:
+            # limits_for() reads the tiers table on a cache miss
+            await asyncio.to_thread(list_tiers_cached)
+        return usage
+
+    def reconcile(self, business_id: str) -> BusinessUsage:
+        """Refresh one business's tier and counts from Supabase (blocking)"""
+        previous = self._usage.get(business_id)
+        supabase = get_supabase_client()
+
+        month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat()
+
+        try:
+            with span("db"):
+                business = supabase.table('businesses').select('*, pricing_tiers(*)').eq('id', business_id).limit(1).execute()
+                products = supabase.table('products').select('id', count='exact').eq('business_id', business_id).execute()
+                conversations = supabase.table('conversation_logs').select('id', count='exact').eq('business_id', business_id).gte('timestamp', month_start).execute()
+        except Exception as e:
+            # Keep serving from the last known counts if Supabase is unavailable, and retry soon
+            logger.warning("Usage reconcile failed for %s: %s", business_id, e)
+            retry_at = time.monotonic() - RECONCILE_INTERVAL_SECONDS + RECONCILE_RETRY_SECONDS
+            with self._lock:
+                if previous is None:
+                    # Nothing known yet: the default tier, not claimed to exist (check-limits answers 404)
+                    previous = BusinessUsage(found=False)
+                    self._usage.set(business_id, previous, ttl_seconds=RECONCILE_INTERVAL_SECONDS)
+                previous.reconciled_at = retry_at
+            return previous
+
+        row = business.data[0] if business.data else {}
+        tier = row.get('pricing_tiers') or {}
+
+        usage = BusinessUsage(
+            found=bool(business.data),
+            tier_id=tier.get('id'),
+            tier={**DEFAULT_TIER, **tier},
+            products=products.count or 0,
+            conversations=conversations.count or 0,
+            answer_mode=row.get('answer_mode'),
+            reconciled_at=time.monotonic(),
+        )
+
+        with self._lock:
+            # Conversations counted here since the last reconcile may not be in the DB yet
+            if previous and previous.month == usage.month:
+                usage.conversations = max(usage.conversations, previous.conversations)
+            self._usage.set(business_id, usage, ttl_seconds=None if usage.found else RECONCILE_INTERVAL_SECONDS)
+
+        return usage
+
+    def limits_for(self, usage: BusinessUsage) -> dict:
+        """Tier limits, preferring the cached pricing_tiers row so edits apply without a reconcile"""
+        tier = usage.tier
+        if usage.tier_id is not None:
+            for cached in list_tiers_cached():
+                if cached.get('id') == usage.tier_id:
+                    tier = {**DEFAULT_TIER, **cached}
+                    break
+        return tier
+
+    def answer_mode(self, business_id: str) -> str:
+        """How /agent/ask writes this business's answers ("auto" or "llm")"""
+        return self.get(business_id).answer_mode or get_settings().agent_answer_mode
+
+    def record_conversation(self, business_id: str):
+        usage = self.get(business_id)
+        with self._lock:
+            usage.conversations += 1
+
+    def enforce_conversation_limit(self, business_id: str):
+        """Raise 429 if the business has used up its monthly conversations"""
+        usage = self.get(business_id)
+        max_conversations = self.limits_for(usage).get('max_conversations', DEFAULT_TIER['max_conversations'])
+        if usage.conversations >= max_conversations:
+            raise HTTPException(
+                status_code=429,
+                detail="Monthly conversation limit reached for this plan"
+            )
+
+    def invalidate(self, business_id: Optional[str] = None):
+        with self._lock:
+            if business_id is None:
+                self._usage.invalidate()
+            else:
+                self._usage.invalidate(business_id)
+
+
+usage_tracker = UsageTracker()
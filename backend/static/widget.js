@@ -3,6 +3,28 @@
   const script = document.currentScript || document.querySelector('script[data-business-id]');
   const businessId = script ? script.getAttribute('data-business-id') : null;
   
+  function randomId() {
+    return Date.now().toString(36) + Math.random().toString(36).slice(2, 10);
+  }
+  
+  // Per-tab visitor session, used by the API for per-visitor rate limits
+  let sessionId = null;
+  try {
+    sessionId = sessionStorage.getItem('ai-chat-session');
+    if (!sessionId) {
+      sessionId = randomId();
+      sessionStorage.setItem('ai-chat-session', sessionId);
+    }
+  } catch (e) {
+    sessionId = randomId();
+  }
+  
+  // Same origin the script was served from
+  const apiBase = (script && script.src) ? new URL(script.src).origin : 'https://web-production-902d.up.railway.app';
+  let primaryColor = '#FF6B35';
+  // primaryColor is written into style attributes, so only plain hex and rgb()/rgba() colors are taken
+  const COLOR = /^(#[0-9a-f]{3,8}|rgba?\(\s*\d{1,3}%?\s*(,\s*\d{1,3}%?\s*){2}(,\s*(0|1|0?\.\d+)\s*)?\))$/i;
+  
   const bubble = document.createElement('div');
   bubble.id = 'ai-chat-bubble';
   bubble.innerHTML = '💬';
@@ -16,9 +38,53 @@
   document.body.appendChild(bubble);
   document.body.appendChild(chatWindow);
   
+  function applySettings(settings) {
+    if (!settings) return;
+    if (settings.primary_color && COLOR.test(settings.primary_color)) {
+      primaryColor = settings.primary_color;
+      bubble.style.background = primaryColor;
+      chatWindow.firstChild.style.background = primaryColor;
+    }
+    if (settings.bubble_icon) {
+      bubble.textContent = settings.bubble_icon;
+    }
+    if (settings.position === 'bottom-left') {
+      bubble.style.right = 'auto';
+      bubble.style.left = '20px';
+      chatWindow.style.right = 'auto';
+      chatWindow.style.left = '20px';
+    }
+  }
+  
+  // Settings are inlined when the script is requested with ?business_id=..., otherwise fetched
+  if (window.__AI_WIDGET_SETTINGS__) {
+    applySettings(window.__AI_WIDGET_SETTINGS__);
+  } else if (businessId) {
+    fetch(apiBase + '/widget/settings/' + encodeURIComponent(businessId))
+      .then(function(r) { return r.ok ? r.json() : null; })
+      .then(applySettings)
+      .catch(function() {});
+  }
+  
+  // Question being answered ({id, controller}); asking again, closing the chat or leaving the page cancels it
+  let pending = null;
+  
+  // reason: superseded (asked again), closed (chat closed) or left (page hidden for good)
+  function cancelPending(reason) {
+    if (!pending) return;
+    pending.controller.abort();
+    // Proxies may keep the server working after the browser aborts; cancel by request id too
+    fetch(apiBase + '/agent/cancel/' + pending.id + '?reason=' + reason, {method: 'POST', keepalive: true})
+      .catch(function() {});
+    pending = null;
+  }
+  
   bubble.onclick = function() {
-    chatWindow.style.display = chatWindow.style.display === 'none' ? 'flex' : 'none';
+    const closing = chatWindow.style.display !== 'none';
+    chatWindow.style.display = closing ? 'none' : 'flex';
+    if (closing) cancelPending('closed');
   };
+  window.addEventListener('pagehide', function() { cancelPending('left'); });
   
   const input = document.getElementById('chat-input');
   const messages = document.getElementById('chat-messages');
@@ -26,7 +92,7 @@
   input.addEventListener('keypress', async function(e) {
     if (e.key === 'Enter' && input.value.trim()) {
       const question = input.value.trim();
-      messages.innerHTML += '<div style="margin:8px 0;text-align:right;"><span style="background:#FF6B35;color:white;padding:8px 12px;border-radius:12px;display:inline-block;">' + question + '</span></div>';
+      messages.innerHTML += '<div style="margin:8px 0;text-align:right;"><span style="background:' + primaryColor + ';color:white;padding:8px 12px;border-radius:12px;display:inline-block;">' + question + '</span></div>';
       input.value = '';
       
       const typingId = 'typing-' + Date.now();
@@ -35,17 +101,22 @@
       
       try {
         // Pass business_id to agent
-        const requestBody = {question: question, k: 5};
+        const requestBody = {question: question, k: 5, session_id: sessionId};
         if (businessId) {
           requestBody.business_id = businessId;
         }
         
-        const response = await fetch('https://web-production-902d.up.railway.app/agent/ask', {
+        cancelPending('superseded');
+        const request = {id: randomId(), controller: new AbortController()};
+        pending = request;
+        const response = await fetch(apiBase + '/agent/ask', {
           method: 'POST',
-          headers: {'Content-Type': 'application/json'},
-          body: JSON.stringify(requestBody)
+          headers: {'Content-Type': 'application/json', 'X-Request-ID': request.id},
+          body: JSON.stringify(requestBody),
+          signal: request.controller.signal
         });
         const data = await response.json();
+        if (pending === request) pending = null;
         
         document.getElementById(typingId).remove();
         
@@ -56,7 +127,7 @@
           data.products.forEach(p => {
             if (p.url) {
               const stockText = p.in_stock === false ? ' (Out of Stock)' : '';
-              productLinks += '<li style="margin:4px 0;color:#1a1a1a;"><a href="' + p.url + '" target="_blank" style="color:#FF6B35;text-decoration:none;">' + p.name + ' - $' + p.price + stockText + '</a></li>';
+              productLinks += '<li style="margin:4px 0;color:#1a1a1a;"><a href="' + p.url + '" target="_blank" style="color:' + primaryColor + ';text-decoration:none;">' + p.name + ' - $' + p.price + stockText + '</a></li>';
             }
           });
           productLinks += '</ul></div></div>';
@@ -65,6 +136,8 @@
       } catch(err) {
         const typingElem = document.getElementById(typingId);
         if (typingElem) typingElem.remove();
+        // Superseded by a newer question or the chat was closed
+        if (err.name === 'AbortError') return;
         
         messages.innerHTML += '<div style="margin:8px 0;"><span style="background:#f0f0f0;color:#1a1a1a;padding:8px 12px;border-radius:12px;display:inline-block;">Error: ' + err.message + '</span></div>';
       }
@@ -0,0 +1,18 @@
+"""
+Tests run offline against the local stand-ins: the SQLite table store
+(src/database/local_store.py) and the fake LLM (src/integrations/fake_llm.py).
+
+Settings are read when src modules are first imported, so this runs before any test module.
+"""
+import os
+import tempfile
+
+os.environ.setdefault('DATABASE_BACKEND', 'sqlite')
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('LLM_BACKEND', 'fake')
+os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+os.environ.setdefault('WARM_UP_CLIENTS', 'false')
+os.environ.setdefault('PARSE_WORKERS', '0')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('QUERY_LOG_DIR', os.path.join(tempfile.gettempdir(), 'test_query_logs'))
+os.environ.setdefault('CRAWL_ARCHIVE_DIR', '')
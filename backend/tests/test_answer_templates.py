@@ -0,0 +1,21 @@
+from src.agents.answer_templates import is_simple_lookup
+
+NO_FILTERS = (0, float('inf'), [], [])
+
+
+def test_search_with_filters_is_simple():
+    assert is_simple_lookup(['search'], (0, float('inf'), ['shirt'], []))
+    assert is_simple_lookup(['search'], (0, float('inf'), [], ['black']))
+    assert is_simple_lookup(['search'], (0, 50.0, [], []))
+    assert is_simple_lookup(['search'], (20.0, float('inf'), [], []))
+
+
+def test_search_without_filters_is_not_simple():
+    assert not is_simple_lookup(['search'], NO_FILTERS)
+
+
+def test_other_intents_are_not_simple():
+    filters = (0, float('inf'), ['shirt'], ['black'])
+    assert not is_simple_lookup(['compare'], filters)
+    assert not is_simple_lookup(['search', 'recommend'], filters)
+    assert not is_simple_lookup([], filters)
@@ -0,0 +1,53 @@
+import pytest
+
+from src.crawlers.fetching import SNIFF_BYTES, BodyReader, FetchAborted
+
+PAGE = '<html><head><title>Café</title></head><body>' + 'x' * 3000 + '</body></html>'
+
+
+def read(body: bytes, headers: dict, max_bytes: int = 1024 * 1024, chunk_size: int = 500) -> str:
+    reader = BodyReader(headers, max_bytes)
+    for start in range(0, len(body), chunk_size):
+        reader.feed(body[start:start + chunk_size])
+    return reader.text()
+
+
+def test_decodes_utf8_across_chunks():
+    assert read(PAGE.encode('utf-8'), {'content-type': 'text/html'}, chunk_size=7) == PAGE
+
+
+def test_charset_from_content_type():
+    assert read(PAGE.encode('latin-1'), {'content-type': 'text/html; charset=ISO-8859-1'}) == PAGE
+
+
+def test_charset_from_meta():
+    page = '<html><head><meta charset="windows-1252"><title>Café</title></head></html>'
+    assert read(page.encode('cp1252'), {}) == page
+
+
+def test_short_body():
+    assert read(b'<p>hi</p>', {'content-type': 'text/html'}) == '<p>hi</p>'
+    assert len(b'<p>hi</p>') < SNIFF_BYTES
+
+
+def test_size_cap():
+    with pytest.raises(FetchAborted) as raised:
+        read(PAGE.encode('utf-8'), {}, max_bytes=1000)
+    assert raised.value.reason == 'too_large'
+
+
+@pytest.mark.parametrize('head', [b'\x89PNG\r\n\x1a\n', b'%PDF-1.7\n', b'<html>\x00\x00'])
+def test_binary_sniff(head):
+    with pytest.raises(FetchAborted) as raised:
+        read(head + b'x' * 3000, {'content-type': 'text/html'})
+    assert raised.value.reason == 'binary'
+
+
+def test_binary_sniff_on_short_body():
+    with pytest.raises(FetchAborted):
+        read(b'GIF89a' + b'\x00' * 10, {})
+
+
+@pytest.mark.parametrize('encoding', ['utf-16', 'utf-16-le', 'utf-32'])
+def test_utf16_and_utf32_are_not_binary(encoding):
+    assert read(PAGE.encode(encoding), {'content-type': f'text/html; charset={encoding}'}) == PAGE
@@ -0,0 +1,44 @@
+from src.crawlers.frontier import Frontier, canonical_url, should_skip
+
+
+def test_canonical_url_drops_fragment_and_facets():
+    url = 'https://shop.example/collections/all?utm_source=x&page=2&sort_by=price&filter.v.color=red#top'
+    assert canonical_url(url) == 'https://shop.example/collections/all?page=2'
+
+
+def test_canonical_url_sorts_parameters():
+    assert canonical_url('https://shop.example/search?b=2&a=1') == 'https://shop.example/search?a=1&b=2'
+    assert canonical_url('https://shop.example/products/a?ref=home') == 'https://shop.example/products/a'
+
+
+def test_should_skip():
+    assert should_skip('https://shop.example/images/photo.JPG')
+    assert should_skip('https://shop.example/cart')
+    assert should_skip('https://shop.example/account/orders')
+    assert should_skip('https://shop.example/files/catalog.pdf')
+    assert not should_skip('https://shop.example/products/cart-tote')
+    assert not should_skip('https://shop.example/products/v1.2-tee')
+    assert not should_skip('https://shop.example/collections/shirts')
+
+
+def test_frontier_orders_product_pages_first():
+    frontier = Frontier('https://shop.example/', patterns={})
+    assert frontier.push('https://shop.example/about')
+    assert frontier.push('https://shop.example/collections/all')
+    assert frontier.push('https://shop.example/products/a#reviews')
+    assert not frontier.push('https://shop.example/products/a')
+    assert not frontier.push('https://elsewhere.example/products/b')
+    assert not frontier.push('https://shop.example/cart')
+    assert [frontier.pop()[0] for _ in range(len(frontier))] == [
+        'https://shop.example/products/a', 'https://shop.example/collections/all', 'https://shop.example/about',
+    ]
+    assert frontier.product_urls == {'https://shop.example/products/a'}
+
+
+def test_frontier_learned_patterns():
+    frontier = Frontier('https://shop.example/', patterns={'/catalogue/*': 3})
+    frontier.push('https://shop.example/collections/all')
+    frontier.push('https://shop.example/catalogue/blue-mug')
+    assert frontier.pop()[0] == 'https://shop.example/catalogue/blue-mug'
+    assert frontier.matches_learned('https://shop.example/catalogue/blue-mug/')
+    assert not frontier.matches_learned('https://shop.example/catalogue/mugs/blue-mug')
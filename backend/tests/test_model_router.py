@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+
+from src.services.model_router import LatencyBudget, LLMUnavailable, Route, complete
+
+ROUTE = Route(tier='standard', model='standard-model', fallback='fast-model')
+
+
+def make_call(delays, errors=()):
+    """Async call(model, timeout) answering with the model name after delays[model] seconds"""
+    calls = []
+
+    async def call(model, timeout):
+        calls.append(model)
+        await asyncio.sleep(delays[model])
+        if model in errors:
+            raise RuntimeError(f'{model} failed')
+        return model
+
+    return call, calls
+
+
+def test_first_model_answers():
+    call, calls = make_call({'standard-model': 0.01, 'fast-model': 0.01})
+    assert asyncio.run(complete(call, ROUTE, LatencyBudget(2))) == 'standard-model'
+    assert calls == ['standard-model']
+
+
+def test_slow_call_is_hedged():
+    call, calls = make_call({'standard-model': 5, 'fast-model': 0.01})
+    started = time.perf_counter()
+    assert asyncio.run(complete(call, ROUTE, LatencyBudget(1))) == 'fast-model'
+    assert calls == ['standard-model', 'fast-model']
+    assert time.perf_counter() - started < 1
+
+
+def test_failed_call_uses_the_spare_attempt():
+    call, calls = make_call({'standard-model': 0.01, 'fast-model': 0.01}, errors={'standard-model'})
+    assert asyncio.run(complete(call, ROUTE, LatencyBudget(2))) == 'fast-model'
+    assert calls == ['standard-model', 'fast-model']
+
+
+def test_only_one_spare_attempt():
+    call, calls = make_call({'standard-model': 0.01, 'fast-model': 0.01}, errors={'standard-model', 'fast-model'})
+    with pytest.raises(LLMUnavailable) as raised:
+        asyncio.run(complete(call, ROUTE, LatencyBudget(2)))
+    assert raised.value.reason == 'error'
+    assert calls == ['standard-model', 'fast-model']
+
+
+def test_budget_runs_out():
+    call, calls = make_call({'standard-model': 5, 'fast-model': 5})
+    started = time.perf_counter()
+    with pytest.raises(LLMUnavailable) as raised:
+        asyncio.run(complete(call, ROUTE, LatencyBudget(0.6)))
+    assert raised.value.reason == 'timeout'
+    assert time.perf_counter() - started < 1.5
+
+
+def test_no_attempt_without_budget():
+    call, calls = make_call({'standard-model': 0.01, 'fast-model': 0.01})
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(complete(call, ROUTE, LatencyBudget(0.1)))
+    assert calls == []
+
+
+def test_blocking_call_runs_in_a_thread():
+    def call(model, timeout):
+        time.sleep(0.01)
+        return f'{model} within {timeout:.0f}s'
+
+    assert asyncio.run(complete(call, ROUTE, LatencyBudget(2))) == 'standard-model within 2s'
+
+
+def test_cancelling_the_caller_cancels_attempts():
+    cancelled = []
+
+    async def call(model, timeout):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+
+    async def scenario():
+        request = asyncio.ensure_future(complete(call, ROUTE, LatencyBudget(2)))
+        await asyncio.sleep(0.05)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert cancelled == ['standard-model']
@@ -0,0 +1,36 @@
+from src.crawlers import product_extraction
+from src.crawlers.product_extraction import ExtractionTemplate, extract_listing, stored_template
+from src.database.supabase_client import get_supabase_client
+
+CARD = ('<div class="product-card"><h3 class="product-name">Tee {i}</h3>'
+        '<span class="price">${i}.00</span><a href="/products/tee-{i}">View</a></div>')
+LISTING = '<html><head><title>Shirts</title></head><body>{}</body></html>'.format(
+    ''.join(CARD.format(i=i) for i in range(1, 9))
+)
+
+
+def test_template_is_stored_per_domain():
+    products, title = extract_listing(LISTING, 'https://templates.example/collections/shirts')
+    assert title == 'Shirts'
+    assert [p['name'] for p in products] == [f'Tee {i}' for i in range(1, 9)]
+
+    # Another worker (or this one after a restart) starts from the stored template
+    product_extraction._templates.invalidate()
+    assert stored_template('templates.example') == ExtractionTemplate(
+        container='div.product-card', name='h3.product-name', price='.price', description='',
+    )
+
+
+def test_template_is_forgotten_when_markup_changes():
+    get_supabase_client().table('extraction_templates').upsert({
+        'domain': 'changed.example',
+        'template': {'container': 'div.product-card', 'name': 'h2.gone', 'price': '.gone', 'description': ''},
+        'updated_at': '2999-01-01T00:00:00+00:00',
+    }).execute()
+    product_extraction._templates.invalidate()
+
+    products, _title = extract_listing(LISTING + LISTING, 'https://changed.example/collections/shirts', max_products=16)
+    # Cards fall back to the full selector lists, then the stale template is dropped
+    assert len(products) == 16
+    product_extraction._templates.invalidate()
+    assert stored_template('changed.example') is None
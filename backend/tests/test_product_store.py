@@ -0,0 +1,41 @@
+import json
+from urllib.parse import quote
+
+from src.services.product_store import chunk_rows, chunk_urls
+
+
+def test_chunk_rows_by_bytes():
+    rows = [{'url': f'https://shop.example/products/{i}', 'description': 'x' * 100} for i in range(50)]
+    chunks = chunk_rows(rows, max_bytes=1000)
+    assert [row for chunk in chunks for row in chunk] == rows
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(json.dumps(chunk)) <= 1000
+
+
+def test_chunk_rows_by_count():
+    rows = [{'url': str(i)} for i in range(7)]
+    assert [len(chunk) for chunk in chunk_rows(rows, max_rows=3)] == [3, 3, 1]
+
+
+def test_chunk_rows_oversized_row_alone():
+    rows = [{'url': 'a'}, {'url': 'b', 'description': 'x' * 5000}, {'url': 'c'}]
+    assert chunk_rows(rows, max_bytes=1000) == [[rows[0]], [rows[1]], [rows[2]]]
+
+
+def test_chunk_rows_empty():
+    assert chunk_rows([]) == []
+
+
+def test_chunk_urls_encoded_length():
+    urls = [f'https://shop.example/products/é-{i}?variant={i}' for i in range(200)]
+    chunks = chunk_urls(urls, max_bytes=1024, max_urls=1000)
+    assert [url for chunk in chunks for url in chunk] == urls
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert sum(len(quote(url, safe='')) + 3 for url in chunk) <= 1024
+
+
+def test_chunk_urls_by_count():
+    urls = [f'/p/{i}' for i in range(120)]
+    assert [len(chunk) for chunk in chunk_urls(urls, max_urls=50)] == [50, 50, 20]
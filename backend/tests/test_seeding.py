@@ -0,0 +1,77 @@
+import gzip
+
+from src.crawlers.seeding import SitemapEntry, SitemapParser, parse_robots
+
+ROBOTS = """
+User-agent: *
+Disallow: /
+
+User-agent: LocalBusinessBot
+User-agent: OtherBot
+Disallow: /cart
+Disallow: /*?sort=
+Allow: /cart/shared$
+Crawl-delay: 60  # capped
+
+Sitemap: https://shop.example/sitemap.xml
+"""
+
+SITEMAP = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc> https://shop.example/products/a </loc></url>
+  <url><loc>https://shop.example/products/b</loc><lastmod>2024-01-01</lastmod></url>
+  <url><loc></loc></url>
+</urlset>
+"""
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://shop.example/sitemap_products_1.xml</loc></sitemap>
+</sitemapindex>
+"""
+
+
+def test_robots_uses_our_group():
+    rules = parse_robots(ROBOTS)
+    assert rules.allowed('https://shop.example/products/a')
+    assert not rules.allowed('https://shop.example/cart/add')
+    assert not rules.allowed('https://shop.example/collections/all?sort=price')
+    assert rules.crawl_delay == 10.0
+    assert rules.sitemaps == ['https://shop.example/sitemap.xml']
+
+
+def test_robots_longest_match_wins():
+    rules = parse_robots(ROBOTS)
+    assert rules.allowed('https://shop.example/cart/shared')
+    assert not rules.allowed('https://shop.example/cart/shared/more')
+
+
+def test_robots_falls_back_to_star_group():
+    rules = parse_robots(ROBOTS, agent='somebot')
+    assert not rules.allowed('https://shop.example/products/a')
+
+
+def test_robots_empty_disallow_allows_everything():
+    rules = parse_robots("User-agent: *\nDisallow:\n")
+    assert rules.rules == []
+    assert rules.allowed('https://shop.example/anything')
+
+
+def test_sitemap_parsed_incrementally():
+    parser = SitemapParser()
+    entries = []
+    for start in range(0, len(SITEMAP), 7):
+        entries += parser.feed(SITEMAP[start:start + 7])
+    assert entries == [
+        SitemapEntry(loc='https://shop.example/products/a', kind='url'),
+        SitemapEntry(loc='https://shop.example/products/b', kind='url'),
+    ]
+    assert parser.size == len(SITEMAP)
+
+
+def test_sitemap_gzip_and_index():
+    parser = SitemapParser()
+    body = gzip.compress(SITEMAP_INDEX)
+    entries = parser.feed(body[:10]) + parser.feed(body[10:])
+    assert entries == [SitemapEntry(loc='https://shop.example/sitemap_products_1.xml', kind='sitemap')]
+    assert parser.size == len(SITEMAP_INDEX)
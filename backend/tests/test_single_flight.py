@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from src.services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    async def scenario():
+        flights = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(flights.run('b1', 'catalog', ('name',), fetch) for _ in range(5)))
+        other = await flights.run('b2', 'catalog', ('name',), fetch)
+        return results, other, flights.in_flight()
+
+    results, other, in_flight = asyncio.run(scenario())
+    assert results == [1] * 5
+    assert other == 2
+    assert in_flight == 0
+
+
+def test_errors_reach_every_caller():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError('down')
+
+        return await asyncio.gather(*(flights.run('b1', 'catalog', (), fail) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return 'done'
+
+        first = asyncio.ensure_future(flights.run('b1', 'ask', 'q', fetch, cancel_abandoned=True))
+        second = asyncio.ensure_future(flights.run('b1', 'ask', 'q', fetch, cancel_abandoned=True))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return first, await second
+
+    first, second = asyncio.run(scenario())
+    assert first.cancelled()
+    assert second == 'done'
+
+
+def test_abandoned_work_is_cancelled():
+    async def scenario():
+        flights = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def fetch():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.ensure_future(flights.run('b1', 'ask', 'q', fetch, cancel_abandoned=True))
+                   for _ in range(2)]
+        await started.wait()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+        # The key is free again: a new caller starts fresh work
+        async def fresh():
+            return 'fresh'
+
+        return flights.in_flight(), await flights.run('b1', 'ask', 'q', fresh, cancel_abandoned=True)
+
+    assert asyncio.run(scenario()) == (0, 'fresh')
+
+
+def test_work_outlives_cancelled_callers_by_default():
+    async def scenario():
+        flights = SingleFlight()
+        finished = asyncio.Event()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            finished.set()
+            return 'done'
+
+        caller = asyncio.ensure_future(flights.run('b1', 'catalog', (), fetch))
+        await asyncio.sleep(0)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.wait_for(finished.wait(), 1)
+
+    asyncio.run(scenario())